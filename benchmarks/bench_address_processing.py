@@ -0,0 +1,85 @@
+"""Benchmark process_address_dataframe against the original row-wise version.
+
+Usage:
+    python benchmarks/bench_address_processing.py [n_rows]
+
+Builds a synthetic DataFrame of scraped-style addresses (with missing
+values, messy separators and non-breaking spaces), checks both
+implementations give identical output, and prints the time each takes.
+"""
+
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from planning_scraper.geolocator import (  # noqa: E402
+    Address, extract_postcode, parse_address, clean_address, process_address_dataframe
+)
+
+
+STREETS = ["High Street", "Station Road", "Church Lane", "Victoria Road", "Mill Lane"]
+AREAS = ["Stratford", "Peckham", "Brixton", "Forest Gate", "Camberwell"]
+POSTCODES = ["E13 0AG", "se15 4st", "SW2 1RW", "E7 9AB", "SE5 8QZ", "EC1A1BB"]
+
+
+def process_rowwise(df, address_column="address"):
+    """The original .apply-based process_address_dataframe, for comparison."""
+    df["postcode"] = df[address_column].apply(
+        lambda x: extract_postcode(str(x)) if pd.notna(x) else None
+    )
+    parsed = df[address_column].apply(
+        lambda x: parse_address(str(x)) if pd.notna(x) else Address("")
+    )
+    df["street"] = parsed.apply(lambda x: x.street)
+    df["city"] = parsed.apply(lambda x: x.city)
+    df["cleaned_address"] = df[address_column].apply(
+        lambda x: clean_address(str(x)) if pd.notna(x) else ""
+    )
+    return df
+
+
+def make_addresses(n_rows, seed=0):
+    """Generate n_rows synthetic addresses, about 2% missing."""
+    rng = random.Random(seed)
+    addresses = []
+    for _ in range(n_rows):
+        if rng.random() < 0.02:
+            addresses.append(None)
+            continue
+        # Scraped HTML often has non-breaking spaces (&nbsp;) and other
+        # Unicode whitespace that \s must match
+        space = rng.choice([" ", " ", " ", "\xa0", "\x0b", "\x1f"])
+        parts = [f"{rng.randint(1, 300)}{space}{rng.choice(STREETS)}", rng.choice(AREAS), "London"]
+        if rng.random() < 0.9:
+            parts.append(rng.choice(POSTCODES))
+        separator = rng.choice([", ", ",", " ,  ", "\n", ",\n", ", , ", ",\xa0", "\xa0,\xa0"])
+        addresses.append(separator.join(parts))
+    return pd.DataFrame({"address": addresses})
+
+
+def main(n_rows=1_000_000):
+    df = make_addresses(n_rows)
+    print(f"Benchmarking {n_rows:,} addresses")
+
+    start = time.perf_counter()
+    expected = process_rowwise(df.copy())
+    rowwise_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = process_address_dataframe(df.copy())
+    vectorised_time = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(result, expected)
+
+    print(f"row-wise:   {rowwise_time:8.2f} s ({n_rows / rowwise_time:12,.0f} rows/s)")
+    print(f"vectorised: {vectorised_time:8.2f} s ({n_rows / vectorised_time:12,.0f} rows/s)")
+    print(f"speed-up:   {rowwise_time / vectorised_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,151 @@
+"""End-to-end throughput benchmark against the local Idox stand-in.
+
+Usage:
+    python benchmarks/bench_end_to_end.py [--latency 0.02] [--rate-limit-every 100]
+                                          [--error-rate 0.01] [--json results.json]
+
+Starts benchmarks/idox_server.py on a free port and times:
+
+    get_postcode_page          searches and result pages per second
+    scrape_app_details         applications per second
+    scrape_comments            comments per second
+    process_address_dataframe  addresses per second
+
+Requests are paced by a HostRateLimiter set far above any real site's
+rate, so the numbers measure the scraper and not the polite pauses.
+Use --json to save the results and compare them between commits.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from idox_server import IdoxStandIn  # noqa: E402
+from planning_scraper.fetcher import HttpFetcher  # noqa: E402
+from planning_scraper.geolocator import process_address_dataframe  # noqa: E402
+from planning_scraper.scheduler import HostRateLimiter  # noqa: E402
+from planning_scraper.scraper import (  # noqa: E402
+    get_postcode_page, scrape_app_details, scrape_comments, open_client
+)
+
+
+class Timing:
+    """Times one benchmark stage and the stand-in requests it made."""
+
+    def __init__(self, name, site=None):
+        self.name = name
+        self.site = site
+        self.items = 0
+
+    def __enter__(self):
+        self._requests = self.site.stats["requests"] if self.site else 0
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._start
+        self.requests = (self.site.stats["requests"] if self.site else 0) - self._requests
+
+    def result(self):
+        return {
+            "stage": self.name,
+            "items": self.items,
+            "seconds": round(self.seconds, 4),
+            "items_per_second": round(self.items / self.seconds, 2) if self.seconds else None,
+            "requests": self.requests,
+            "requests_per_second": round(self.requests / self.seconds, 2) if self.seconds else None,
+        }
+
+
+def run(args):
+    site = IdoxStandIn(
+        apps_per_postcode=args.apps_per_postcode, comments_per_app=args.comments_per_app,
+        latency=args.latency, rate_limit_every=args.rate_limit_every,
+        error_rate=args.error_rate, retry_after=1
+    ).start()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        urls_csv = os.path.join(tmp, "councils.csv")
+        with open(urls_csv, "w") as f:
+            f.write(f"council,url\nstandin,{site.url}\n")
+
+        limiter = HostRateLimiter(rate=args.rate, burst=1)
+        client = open_client(args.engine, args.os_type) if args.engine == "selenium" else HttpFetcher()
+        try:
+            postcodes = site.postcodes[:args.postcodes]
+            urls = []
+            with Timing("get_postcode_page", site) as timing:
+                for postcode in postcodes:
+                    urls.extend(get_postcode_page("standin", postcode, urls_csv=urls_csv,
+                                                  driver=client, limiter=limiter))
+                timing.items = len(postcodes)
+            results.append(timing.result())
+
+            with Timing("scrape_app_details", site) as timing:
+                data = scrape_app_details(urls, driver=client, limiter=limiter)
+                timing.items = sum(pd.notna(reference) for reference in data["reference"])
+            results.append(timing.result())
+
+            with Timing("scrape_comments", site) as timing:
+                for url in urls:
+                    key_val = url.rsplit("keyVal=", 1)[-1]
+                    timing.items += scrape_comments(client, "standin", key_val, url,
+                                                    limiter=limiter)
+            results.append(timing.result())
+        finally:
+            client.quit()
+            site.stop()
+
+    addresses = pd.DataFrame({"address": data["address"]})
+    addresses = addresses.sample(args.addresses, replace=True, random_state=0, ignore_index=True)
+    with Timing("process_address_dataframe") as timing:
+        process_address_dataframe(addresses)
+        timing.items = len(addresses)
+    results.append(timing.result())
+
+    return results, dict(site.stats)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--postcodes", type=int, default=8, help="postcodes to search")
+    parser.add_argument("--apps-per-postcode", type=int, default=25)
+    parser.add_argument("--comments-per-app", type=int, default=5)
+    parser.add_argument("--addresses", type=int, default=200_000,
+                        help="rows for the process_address_dataframe stage")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added per response")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="send a 429 every N requests")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 500 responses")
+    parser.add_argument("--rate", type=float, default=1000.0, help="limiter requests per second")
+    parser.add_argument("--engine", choices=("http", "selenium"), default="http")
+    parser.add_argument("--os-type", choices=("mac", "linux"), default="linux")
+    parser.add_argument("--json", default=None, help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+    results, stats = run(args)
+
+    print(f"{'stage':28} {'items':>8} {'seconds':>9} {'items/s':>10} {'requests':>9} {'req/s':>9}")
+    for r in results:
+        print(f"{r['stage']:28} {r['items']:8} {r['seconds']:9.2f} "
+              f"{r['items_per_second']:10,.1f} {r['requests']:9} {r['requests_per_second']:9,.1f}")
+    print(f"Stand-in served {stats['requests']} requests ({stats['bytes_sent'] / 1e6:.1f} MB), "
+          f"{stats['rate_limited']} x 429, {stats['errors']} x 500")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results, "server": stats}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark the start-up cost of importing planning_scraper.
+
+Usage:
+    python benchmarks/bench_import_time.py [repeats]
+
+Each snippet runs in a fresh interpreter, repeatedly, and the median wall
+time is reported after subtracting the cost of starting Python itself.
+Also lists which heavy dependencies each snippet ended up importing.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+HEAVY_MODULES = ["numpy", "pandas", "selenium", "requests", "lxml", "pyarrow"]
+
+SNIPPETS = {
+    "python (baseline)": "pass",
+    "import planning_scraper": "import planning_scraper",
+    "from ... import extract_postcode": "from planning_scraper import extract_postcode",
+    "from ... import process_address_dataframe": "from planning_scraper import process_address_dataframe",
+    "from ... import get_postcode_page": "from planning_scraper import get_postcode_page",
+}
+
+
+def run(snippet):
+    """Run snippet in a fresh interpreter; return (seconds, heavy modules loaded)."""
+    code = (
+        f"{snippet}\n"
+        "import sys\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, check=True,
+        capture_output=True, text=True
+    ).stdout
+    return time.perf_counter() - start, output.strip()
+
+
+def main(repeats=10):
+    baseline = None
+    print(f"{'snippet':45} {'median ms':>10}  heavy modules loaded")
+    for name, snippet in SNIPPETS.items():
+        run(snippet)  # warm the filesystem and bytecode caches
+        timings = []
+        for _ in range(repeats):
+            seconds, loaded = run(snippet)
+            timings.append(seconds)
+        median = statistics.median(timings)
+        if baseline is None:
+            baseline = median
+            print(f"{name:45} {median * 1000:10.1f}")
+        else:
+            print(f"{name:45} {(median - baseline) * 1000:10.1f}  {loaded or '-'}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,474 @@
+"""Local stand-in for an Idox planning site.
+
+Serves a deterministic, generated set of applications through realistic
+Idox markup (templates in benchmarks/fixtures/): the simple search form,
+paged search results with a results-per-page setting and result count,
+summary and details tabs, and paged neighbourComments. Latency, 429
+responses and server errors can be injected to see how the scraper
+copes.
+
+Usage:
+    python benchmarks/idox_server.py --port 8000 --latency 0.05 --rate-limit-every 50
+
+or from Python:
+
+    >>> with IdoxStandIn(apps_per_postcode=30) as site:
+    ...     urls = get_postcode_page("standin", site.postcodes[0], engine="http", ...)
+"""
+
+import argparse
+import hashlib
+import html
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from string import Template
+from urllib.parse import urlparse, parse_qs
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+BASE_PATH = "/online-applications"
+CSRF_TOKEN = "3f9a2c4e-standin"
+PAGE_SIZES = (10, 20, 50, 100)
+COMMENTS_PER_PAGE = 10
+
+TOO_MANY_RESULTS = "Too many results found. Please enter some more parameters."
+NO_RESULTS = "No results found."
+
+APP_TYPES = [
+    ("FUL", "Full Planning Permission"),
+    ("HH", "Householder"),
+    ("LBC", "Listed Building Consent"),
+    ("PA", "Prior Approval"),
+    ("LDC", "Lawful Development Certificate"),
+]
+DECISIONS = ["Grant Permission", "Approve with Conditions", "Refuse Permission", "Withdrawn"]
+STREETS = ["High Street", "Station Road", "Church Lane", "Victoria Road", "Mill Lane",
+           "Barking Road", "Green Street", "Romford Road", "Plashet Grove", "Katherine Road"]
+PROPOSALS = [
+    "Erection of a single storey rear extension.",
+    "Loft conversion with rear dormer and front rooflights.",
+    "Change of use from retail (Class E) to residential (Class C3).",
+    "Replacement of timber windows with double glazed uPVC windows.",
+    "Demolition of existing garage and erection of a two storey dwelling.",
+]
+STANCES = ["Objects", "Supports", "Neutral"]
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return Template(f.read())
+
+
+def idox_date(day):
+    """Format a date the way Idox shows it, e.g. "Mon 02 Jan 2023"."""
+    return day.strftime("%a %d %b %Y")
+
+
+def default_postcodes(sectors=4, per_sector=5, outward="E13"):
+    """Generate postcodes in a few sectors of one postcode district."""
+    return [
+        f"{outward} {sector}{chr(65 + unit)}{chr(65 + (unit * 7 + sector) % 26)}"
+        for sector in range(sectors) for unit in range(per_sector)
+    ]
+
+
+def make_applications(postcodes, apps_per_postcode=25, comments_per_app=5, seed=0):
+    """Generate a deterministic set of applications spread over postcodes.
+
+    Returns:
+        List of application dicts, each with key_val, reference, postcode,
+        address, dates, status/decision fields and a comment count
+    """
+    rng = random.Random(seed)
+    applications = []
+    for postcode in postcodes:
+        for _ in range(apps_per_postcode):
+            code, app_type = rng.choice(APP_TYPES)
+            validated = date(2020, 1, 1) + timedelta(days=rng.randrange(5 * 365))
+            decided = rng.random() < 0.8
+            applications.append({
+                "key_val": "".join(rng.choice("ABCDEFGHJKLMNPQRSTUVWXYZ0123456789") for _ in range(13)),
+                "reference": f"{validated:%y}/{len(applications) + 1:05d}/{code}",
+                "postcode": postcode,
+                "address": f"{rng.randint(1, 300)} {rng.choice(STREETS)}, London {postcode}",
+                "description": rng.choice(PROPOSALS),
+                "app_type": app_type,
+                "date_received": validated - timedelta(days=rng.randint(1, 14)),
+                "date_validated": validated,
+                "decided": decided,
+                "decision": rng.choice(DECISIONS) if decided else None,
+                "decision_date": validated + timedelta(days=rng.randint(20, 120)) if decided else None,
+                "expected_decision_level": rng.choice(["Delegated", "Committee"]),
+                "case_officer": f"Officer {rng.randint(1, 40)}",
+                "ward": f"{postcode.split()[0]} Ward",
+                "applicant": f"Applicant {rng.randint(1, 10000)}",
+                "comment_count": rng.randint(0, 2 * comments_per_app),
+            })
+    return applications
+
+
+class IdoxStandIn:
+    """Threaded local HTTP server imitating an Idox planning site.
+
+    Args:
+        apps_per_postcode: Applications generated for each postcode
+        comments_per_app: Average number of comments per application
+        postcodes: Postcodes to generate applications for (default:
+            default_postcodes())
+        latency: Seconds added to every response, or a (min, max) range
+        rate_limit_every: Answer every Nth request with a 429 (0 = never)
+        retry_after: Retry-After seconds sent with 429s
+        error_rate: Fraction of requests answered with a 500
+        max_results: Searches matching more applications than this get
+            Idox's "Too many results" message (None = no cap)
+        council: Council name shown in page titles
+        seed: Random seed for the data and for error injection
+        host, port: Address to listen on (port 0 picks a free port)
+    """
+
+    def __init__(self, apps_per_postcode=25, comments_per_app=5, postcodes=None,
+                 latency=0.0, rate_limit_every=0, retry_after=1, error_rate=0.0,
+                 max_results=None, council="Stand-in", seed=0, host="127.0.0.1", port=0):
+        self.postcodes = list(postcodes or default_postcodes())
+        self.applications = make_applications(self.postcodes, apps_per_postcode,
+                                              comments_per_app, seed)
+        self.by_key = {app["key_val"]: app for app in self.applications}
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.max_results = max_results
+        self.council = council
+        self.stats = {"requests": 0, "bytes_sent": 0, "rate_limited": 0, "errors": 0}
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._templates = {
+            name: load_fixture(f"{name}.html")
+            for name in ("search", "results", "result_item", "no_results",
+                         "summary", "details", "comments", "comment_item")
+        }
+
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.standin = self
+        self._thread = None
+
+    @property
+    def url(self):
+        """The site's online-applications URL, as used in the council registry."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{BASE_PATH}"
+
+    def start(self):
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def search(self, query):
+        """Return the applications a simple search for query finds."""
+        needle = "".join(query.upper().split())
+        if not needle:
+            return []
+        return [
+            app for app in self.applications
+            if needle in "".join(app["address"].upper().split()) or needle == app["reference"]
+        ]
+
+    def injected_failure(self):
+        """Decide whether this request gets a 429 or 500. Returns a status or None."""
+        with self._lock:
+            self.stats["requests"] += 1
+            count = self.stats["requests"]
+            if self.rate_limit_every and count % self.rate_limit_every == 0:
+                self.stats["rate_limited"] += 1
+                return 429
+            if self.error_rate and self._rng.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return 500
+        return None
+
+    def delay(self):
+        latency = self.latency
+        if isinstance(latency, (tuple, list)):
+            latency = random.uniform(*latency)
+        if latency:
+            time.sleep(latency)
+
+    # Page rendering
+
+    def render_search(self):
+        return self._templates["search"].substitute(council=self.council, csrf=CSRF_TOKEN)
+
+    def render_message(self, message):
+        return self._templates["no_results"].substitute(council=self.council, message=message)
+
+    def new_session(self, matches, page_size):
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._sessions[session_id] = {"matches": matches, "page_size": page_size}
+        return session_id
+
+    def session(self, session_id):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def render_results(self, session, page):
+        matches, page_size = session["matches"], session["page_size"]
+        total = len(matches)
+        last_page = max(1, -(-total // page_size))
+        page = min(max(1, page), last_page)
+        first = (page - 1) * page_size
+
+        items = "".join(
+            self._templates["result_item"].substitute(
+                key_val=app["key_val"],
+                description=html.escape(app["description"]),
+                address=html.escape(app["address"]),
+                reference=app["reference"],
+                date_validated=idox_date(app["date_validated"]),
+                status="Decided" if app["decided"] else "Awaiting decision",
+            )
+            for app in matches[first:first + page_size]
+        )
+        pager = f"{BASE_PATH}/pagedSearchResults.do?action=page&amp;searchCriteria.page="
+        return self._templates["results"].substitute(
+            council=self.council,
+            csrf=CSRF_TOKEN,
+            page_size_options="".join(
+                f'<option value="{size}"{" selected" if size == page_size else ""}>{size}</option>'
+                for size in PAGE_SIZES
+            ),
+            first=first + 1,
+            last=min(first + page_size, total),
+            total=total,
+            previous_link=f'<a href="{pager}{page - 1}" class="previous">Previous</a>' if page > 1 else "",
+            next_link=f'<a href="{pager}{page + 1}" class="next">Next</a>' if page < last_page else "",
+            items=items,
+        )
+
+    def render_summary(self, app):
+        decision_rows = ""
+        if app["decided"]:
+            decision_rows = (
+                f'      <tr><th scope="row">Decision</th><td>{app["decision"]}</td></tr>\n'
+                f'      <tr><th scope="row">Decision Issued Date</th>'
+                f'<td>{idox_date(app["decision_date"])}</td></tr>'
+            )
+        return self._templates["summary"].substitute(
+            council=self.council,
+            key_val=app["key_val"],
+            comment_count=app["comment_count"],
+            reference=app["reference"],
+            date_received=idox_date(app["date_received"]),
+            date_validated=idox_date(app["date_validated"]),
+            address=html.escape(app["address"]),
+            description=html.escape(app["description"]),
+            status="Decided" if app["decided"] else "Awaiting decision",
+            decision_rows=decision_rows,
+        )
+
+    def render_details(self, app):
+        return self._templates["details"].substitute(
+            council=self.council,
+            app_type=app["app_type"],
+            expected_decision_level=app["expected_decision_level"],
+            actual_decision_level=app["expected_decision_level"] if app["decided"] else "",
+            case_officer=app["case_officer"],
+            ward=app["ward"],
+            applicant=app["applicant"],
+        )
+
+    def render_comments(self, app, page):
+        count = app["comment_count"]
+        first = (max(1, page) - 1) * COMMENTS_PER_PAGE
+        rng = random.Random(app["key_val"])
+        comments = []
+        # Newest first, as Idox lists them
+        day = app["date_validated"] + timedelta(days=40)
+        for i in range(count):
+            day -= timedelta(days=rng.randint(0, 3))
+            comments.append(self._templates["comment_item"].substitute(
+                date=idox_date(day),
+                address=f"{rng.randint(1, 300)} {rng.choice(STREETS)}, London {app['postcode']}",
+                stance=rng.choice(STANCES),
+                text=f"Comment {count - i} on {app['reference']}: I {rng.choice(['object to', 'support', 'have concerns about'])} this proposal.",
+            ))
+
+        url = (f"{BASE_PATH}/applicationDetails.do?activeTab=neighbourComments"
+               f"&amp;keyVal={app['key_val']}&amp;neighbourCommentsPager.page={page + 1}")
+        return self._templates["comments"].substitute(
+            council=self.council,
+            comment_count=count,
+            items="".join(comments[first:first + COMMENTS_PER_PAGE]),
+            next_link=f'<a href="{url}" class="next">Next</a>' if first + COMMENTS_PER_PAGE < count else "",
+        )
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; without this, keep-alive
+    # responses stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.handle_request({})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8")
+        form = {key: values[0] for key, values in parse_qs(body).items()}
+        self.handle_request(form)
+
+    def handle_request(self, form):
+        site = self.server.standin
+        site.delay()
+
+        failure = site.injected_failure()
+        if failure == 429:
+            return self.send(429, site.render_message("Too Many Requests"),
+                             {"Retry-After": str(site.retry_after)})
+        if failure == 500:
+            return self.send(500, site.render_message("Internal Server Error"))
+
+        parsed = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        params = {**query, **form}
+        path = parsed.path.rstrip("/")
+
+        if path in (BASE_PATH, f"{BASE_PATH}/search.do"):
+            return self.send(200, site.render_search())
+
+        if path == f"{BASE_PATH}/simpleSearchResults.do" and self.command == "POST":
+            return self.simple_search(site, params)
+
+        if path == f"{BASE_PATH}/pagedSearchResults.do":
+            session = site.session(self.session_id())
+            if session is None:
+                return self.send(200, site.render_search())
+            if params.get("searchCriteria.resultsPerPage", "").isdigit():
+                session["page_size"] = _page_size(params["searchCriteria.resultsPerPage"])
+            page = int(params.get("searchCriteria.page", "1") or 1)
+            return self.send(200, site.render_results(session, page))
+
+        if path == f"{BASE_PATH}/applicationDetails.do":
+            app = site.by_key.get(params.get("keyVal"))
+            tab = params.get("activeTab")
+            if app is None:
+                return self.send(404, site.render_message("Application not found"))
+            if tab == "summary":
+                return self.send(200, site.render_summary(app), conditional=True)
+            if tab == "details":
+                return self.send(200, site.render_details(app), conditional=True)
+            if tab == "neighbourComments":
+                page = int(params.get("neighbourCommentsPager.page", "1") or 1)
+                return self.send(200, site.render_comments(app, page))
+
+        self.send(404, site.render_message("Page not found"))
+
+    def simple_search(self, site, params):
+        if params.get("_csrf") != CSRF_TOKEN:
+            return self.send(403, site.render_message("Invalid CSRF token"))
+
+        matches = site.search(params.get("searchCriteria.simpleSearchString", ""))
+        if site.max_results is not None and len(matches) > site.max_results:
+            return self.send(200, site.render_message(TOO_MANY_RESULTS))
+        if not matches:
+            return self.send(200, site.render_message(NO_RESULTS))
+
+        page_size = _page_size(params.get("searchCriteria.resultsPerPage"))
+        session_id = site.new_session(matches, page_size)
+        self.send(200, site.render_results(site.session(session_id), 1),
+                  {"Set-Cookie": f"JSESSIONID={session_id}; Path={BASE_PATH}"})
+
+    def session_id(self):
+        for part in (self.headers.get("Cookie") or "").split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == "JSESSIONID":
+                return value
+        return None
+
+    def send(self, status, body, headers=None, conditional=False):
+        data = body.encode("utf-8")
+        headers = dict(headers or {})
+
+        if conditional and status == 200:
+            etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+            headers["ETag"] = etag
+            if self.headers.get("If-None-Match") == etag:
+                status, data = 304, b""
+
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html;charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+        site = self.server.standin
+        with site._lock:
+            site.stats["bytes_sent"] += len(data)
+
+
+def _page_size(value):
+    """Return the requested results page size if Idox offers it, else the default."""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return PAGE_SIZES[0]
+    return size if size in PAGE_SIZES else PAGE_SIZES[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a local stand-in Idox site.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--apps-per-postcode", type=int, default=25)
+    parser.add_argument("--comments-per-app", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added per response")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="send a 429 every N requests")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 500 responses")
+    parser.add_argument("--max-results", type=int, default=None, help="search result cap")
+    args = parser.parse_args(argv)
+
+    site = IdoxStandIn(
+        apps_per_postcode=args.apps_per_postcode, comments_per_app=args.comments_per_app,
+        latency=args.latency, rate_limit_every=args.rate_limit_every,
+        retry_after=args.retry_after, error_rate=args.error_rate,
+        max_results=args.max_results, host=args.host, port=args.port
+    )
+    print(f"Serving {len(site.applications)} applications at {site.url}")
+    print(f"Postcodes: {', '.join(site.postcodes)}")
+    try:
+        site.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
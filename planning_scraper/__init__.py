@@ -1,30 +1,101 @@
 """Lightweight planning application scraper for London boroughs.
 
 A simple module for scraping planning application data from council websites.
+
+Submodules are imported lazily, on first use of one of their names, so
+e.g. ``from planning_scraper import extract_postcode`` doesn't load
+selenium, pandas or numpy.
 """
 
-from .scraper import (
-    get_postcode_page,
-    scrape_app_details,
-    scrape_comments
-)
-from .geolocator import (
-    extract_postcode,
-    parse_address,
-    clean_address,
-    process_address_dataframe
-)
-from .driver import setup_driver
+import importlib
+from typing import TYPE_CHECKING
 
 __version__ = "1.0.0"
 
-__all__ = [
-    "get_postcode_page",
-    "scrape_app_details",
-    "scrape_comments",
-    "extract_postcode",
-    "parse_address",
-    "clean_address",
-    "process_address_dataframe",
-    "setup_driver",
-]
+# Public name -> submodule that defines it
+_EXPORTS = {
+    "get_postcode_page": "scraper",
+    "search_area": "scraper",
+    "scrape_app_details": "scraper",
+    "iter_app_details": "scraper",
+    "iter_app_batches": "scraper",
+    "scrape_comments": "scraper",
+    "RefreshScheduler": "refresh",
+    "Application": "records",
+    "applications_frame": "records",
+    "extract_postcode": "address",
+    "parse_address": "address",
+    "clean_address": "address",
+    "process_address_dataframe": "geolocator",
+    "cluster_addresses": "geolocator",
+    "build_postcode_index": "geolocator",
+    "PostcodeIndex": "geolocator",
+    "haversine": "geolocator",
+    "pairwise_distances": "geolocator",
+    "SpatialIndex": "geolocator",
+    "setup_driver": "driver",
+    "DriverPool": "driver",
+    "HttpFetcher": "fetcher",
+    "PageCache": "cache",
+    "CrawlJournal": "journal",
+    "CsvSink": "sinks",
+    "ParquetSink": "sinks",
+    "SqliteCommentSink": "sinks",
+    "ParquetCommentSink": "sinks",
+    "HostRateLimiter": "scheduler",
+    "AdaptiveRateLimiter": "scheduler",
+    "SqliteRateLimiter": "scheduler",
+    "crawl_councils": "scheduler",
+    "SqliteWorkQueue": "workqueue",
+    "MemoryWorkQueue": "workqueue",
+    "run_worker": "workqueue",
+}
+
+_SUBMODULES = {
+    "address", "cache", "cli", "driver", "fetcher", "geolocator", "journal",
+    "metrics", "records", "refresh", "registry", "scheduler", "scraper", "sinks", "utils", "workqueue",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    """Import the submodule behind a public name the first time it is used."""
+    if name in _EXPORTS:
+        module = importlib.import_module(f".{_EXPORTS[name]}", __name__)
+        value = getattr(module, name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    # Cache on the package so later lookups skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | _SUBMODULES)
+
+
+if TYPE_CHECKING:
+    from .scraper import (
+        get_postcode_page, search_area, scrape_app_details, iter_app_details,
+        iter_app_batches, scrape_comments
+    )
+    from .refresh import RefreshScheduler
+    from .records import Application, applications_frame
+    from .address import extract_postcode, parse_address, clean_address
+    from .geolocator import (
+        process_address_dataframe, cluster_addresses, build_postcode_index,
+        PostcodeIndex, haversine, pairwise_distances, SpatialIndex
+    )
+    from .driver import setup_driver, DriverPool
+    from .fetcher import HttpFetcher
+    from .cache import PageCache
+    from .journal import CrawlJournal
+    from .sinks import CsvSink, ParquetSink, SqliteCommentSink, ParquetCommentSink
+    from .scheduler import (
+        HostRateLimiter, AdaptiveRateLimiter, SqliteRateLimiter, crawl_councils
+    )
+    from .workqueue import SqliteWorkQueue, MemoryWorkQueue, run_worker
@@ -0,0 +1,192 @@
+"""Lightweight UK address helpers.
+
+Only uses the standard library, so importing these (e.g. in short-lived
+jobs that just extract postcodes) doesn't pull in pandas or numpy.
+geolocator re-exports everything here.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class Address:
+    """Structured address data."""
+    full_address: str
+    street: Optional[str] = None
+    city: Optional[str] = None
+    postcode: Optional[str] = None
+    
+    def __str__(self):
+        return self.full_address
+
+
+# UK postcode regex
+POSTCODE_PATTERN = re.compile(
+    r'([A-Z]{1,2}[0-9][A-Z0-9]?\s?[0-9][A-Z]{2})',
+    re.IGNORECASE
+)
+
+# Postcode districts ("E13") and sectors ("E13 0"), for area searches
+POSTCODE_DISTRICT_PATTERN = re.compile(r'[A-Z]{1,2}[0-9][A-Z0-9]?')
+POSTCODE_SECTOR_PATTERN = re.compile(r'([A-Z]{1,2}[0-9][A-Z0-9]?) ([0-9])')
+
+
+def extract_postcode(address):
+    """Extract UK postcode from address string.
+    
+    Args:
+        address: Full address string
+        
+    Returns:
+        Formatted postcode or None
+        
+    Example:
+        >>> extract_postcode("123 Main St, London SW1A 1AA")
+        'SW1A 1AA'
+    """
+    if not address:
+        return None
+    
+    match = POSTCODE_PATTERN.search(address)
+    if match:
+        postcode = match.group(1).upper()
+        postcode = "".join(postcode.split())
+        if len(postcode) >= 4:
+            return f"{postcode[:-3]} {postcode[-3:]}"
+        return postcode
+    
+    return None
+
+
+def clean_address(address):
+    """Clean and standardize address string.
+    
+    Args:
+        address: Raw address string
+        
+    Returns:
+        Cleaned address string
+    """
+    if not address:
+        return ""
+    
+    # Remove extra whitespace
+    cleaned = re.sub(r'\s+', ' ', address.strip())
+    
+    # Standardize separators
+    cleaned = re.sub(r'\s*,\s*', ', ', cleaned)
+    
+    # Remove trailing/leading commas
+    cleaned = cleaned.strip(', ')
+    
+    return cleaned
+
+
+def parse_address(address_string):
+    """Parse an address string into components.
+    
+    Args:
+        address_string: Full address string
+        
+    Returns:
+        Address object with parsed components
+    """
+    if not address_string:
+        return Address(full_address="")
+    
+    cleaned = address_string.strip()
+    postcode = extract_postcode(cleaned)
+    
+    # Split into parts
+    parts = re.split(r'[,\n]+', cleaned)
+    parts = [p.strip() for p in parts if p.strip()]
+    
+    street = parts[0] if len(parts) > 0 else None
+    city = parts[-2] if len(parts) > 2 else None
+    
+    return Address(
+        full_address=cleaned,
+        street=street,
+        city=city,
+        postcode=postcode
+    )
+
+
+def validate_postcode(postcode):
+    """Validate UK postcode format.
+    
+    Args:
+        postcode: Postcode string
+        
+    Returns:
+        True if valid, False otherwise
+    """
+    if not postcode:
+        return False
+    return bool(POSTCODE_PATTERN.match(postcode.strip()))
+
+
+def normalise_postcode_area(area):
+    """Normalise a full postcode, postcode sector or postcode district.
+    
+    Sectors need the space between the district and the sector digit,
+    otherwise e.g. "E13" would be ambiguous.
+    
+    Args:
+        area: Postcode, sector or district string
+        
+    Returns:
+        Upper-case area with single spacing, or None if it is none of these
+        
+    Example:
+        >>> normalise_postcode_area("e130ag")
+        'E13 0AG'
+        >>> normalise_postcode_area(" e13  0 ")
+        'E13 0'
+    """
+    if not area:
+        return None
+    
+    area = " ".join(str(area).upper().split())
+    compact = area.replace(" ", "")
+    if POSTCODE_PATTERN.fullmatch(compact):
+        return f"{compact[:-3]} {compact[-3:]}"
+    if POSTCODE_DISTRICT_PATTERN.fullmatch(area):
+        return area
+    if POSTCODE_SECTOR_PATTERN.fullmatch(area):
+        return area
+    return None
+
+
+def postcode_area_level(area):
+    """Return "postcode", "sector" or "district" for a normalised area, else None."""
+    if not area:
+        return None
+    if " " not in area:
+        return "district" if POSTCODE_DISTRICT_PATTERN.fullmatch(area) else None
+    if POSTCODE_SECTOR_PATTERN.fullmatch(area):
+        return "sector"
+    if POSTCODE_PATTERN.fullmatch(area.replace(" ", "")):
+        return "postcode"
+    return None
+
+
+def parent_postcode_area(area):
+    """Return the next coarser area of a normalised one.
+    
+    Example:
+        >>> parent_postcode_area("E13 0AG")
+        'E13 0'
+        >>> parent_postcode_area("E13 0")
+        'E13'
+        >>> parent_postcode_area("E13") is None
+        True
+    """
+    level = postcode_area_level(area)
+    if level == "postcode":
+        return area[:-2]
+    if level == "sector":
+        return area.split(" ")[0]
+    return None
@@ -0,0 +1,157 @@
+"""Persistent on-disk cache for Idox pages.
+
+Page bodies are stored once per distinct content (named by the SHA-256 of
+the body) and a small JSON index entry per URL points at them, along with
+the ETag/Last-Modified validators needed to revalidate the page cheaply.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+
+
+DAY = 24 * 60 * 60
+
+# Time-to-live in seconds per Idox tab (the activeTab query parameter)
+DEFAULT_TTLS = {
+    "summary": 7 * DAY,
+    "details": 7 * DAY,
+    "neighbourComments": 1 * DAY,
+}
+
+
+class PageCache:
+    """Content-addressed page cache keyed by URL.
+
+    Layout under `directory`::
+
+        index/ab/<sha256(url)>.json     URL, fetch time, validators, body hash
+        objects/cd/<sha256(body)>.gz    gzipped page body
+
+    Args:
+        directory: Cache root directory (created if missing)
+        ttl: Default time-to-live in seconds
+        ttls: Optional dict of Idox tab -> TTL overrides (see DEFAULT_TTLS)
+        keep_decided: Never refetch summary/details pages of applications
+            that already have a decision
+    """
+
+    def __init__(self, directory="data/cache", ttl=DAY, ttls=None, keep_decided=True):
+        self.directory = directory
+        self.ttl = ttl
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.keep_decided = keep_decided
+
+    def lookup(self, url):
+        """Return the index entry for a URL, or None if it is not cached."""
+        try:
+            with open(self._index_path(url)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry):
+        """Check whether an entry can be used without contacting the server."""
+        if entry.get("final"):
+            return True
+        return time.time() - entry["fetched_at"] < self.ttl_for(entry["url"])
+
+    def has_fresh(self, url):
+        """Check whether a URL can be served from the cache without a request."""
+        entry = self.lookup(url)
+        return entry is not None and self.is_fresh(entry) and self.read(entry) is not None
+
+    def ttl_for(self, url):
+        """Return the TTL for a URL based on its Idox tab."""
+        tab = parse_qs(urlparse(url).query).get("activeTab", [None])[0]
+        return self.ttls.get(tab, self.ttl)
+
+    def read(self, entry):
+        """Return the cached body bytes for an entry, or None if missing."""
+        try:
+            with gzip.open(self._object_path(entry["body"]), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def validators(self, entry):
+        """Return conditional request headers for revalidating an entry."""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url, body, headers=None):
+        """Cache a page body and its validators.
+
+        Args:
+            url: Page URL
+            body: Page body (bytes or str)
+            headers: Optional response headers (for ETag and Last-Modified)
+        """
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        headers = headers or {}
+
+        digest = hashlib.sha256(body).hexdigest()
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            self._write(object_path, gzip.compress(body))
+
+        previous = self.lookup(url) or {}
+        self._write_entry({
+            "url": url,
+            "fetched_at": time.time(),
+            "body": digest,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "final": previous.get("final", False) and previous.get("body") == digest,
+        })
+
+    def touch(self, url):
+        """Mark a cached entry as just revalidated (e.g. after a 304)."""
+        entry = self.lookup(url)
+        if entry is not None:
+            entry["fetched_at"] = time.time()
+            self._write_entry(entry)
+
+    def evict(self, url):
+        """Forget a URL, e.g. after its cached page turned out to be an error page.
+
+        The body object is left in place, as other URLs may share it.
+        """
+        try:
+            os.remove(self._index_path(url))
+        except FileNotFoundError:
+            pass
+
+    def mark_final(self, url):
+        """Pin a cached entry so it is never refetched."""
+        entry = self.lookup(url)
+        if entry is not None and not entry.get("final"):
+            entry["final"] = True
+            self._write_entry(entry)
+
+    def _index_path(self, url):
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, "index", digest[:2], f"{digest}.json")
+
+    def _object_path(self, digest):
+        return os.path.join(self.directory, "objects", digest[:2], f"{digest}.gz")
+
+    def _write_entry(self, entry):
+        self._write(self._index_path(entry["url"]), json.dumps(entry).encode("utf-8"))
+
+    def _write(self, path, data):
+        """Write a file atomically so concurrent readers never see partial data."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
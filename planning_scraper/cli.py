@@ -0,0 +1,474 @@
+"""Command-line batch runner.
+
+Runs postcode searches, application detail scrapes or comment scrapes
+from a job file across several worker processes, each with its own
+browser or HTTP session, writing results as they arrive:
+
+    python -m planning_scraper search jobs.csv -o urls.csv -w 4
+    python -m planning_scraper details urls.csv -o applications.parquet -w 4
+    python -m planning_scraper comments urls.csv -o comments.db -w 4
+
+Job files are CSVs with a header row:
+
+    search      council,postcode
+    details     url (other columns are ignored)
+    comments    url, plus optional council and app_id columns
+
+A plain list of URLs (one per line, no header) also works for details and
+comments.
+"""
+
+import argparse
+import csv
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+
+COMMANDS = ("search", "details", "comments")
+
+# Seconds between metrics snapshots sent from workers to the parent
+METRICS_INTERVAL = 30
+
+REQUIRED_COLUMNS = {
+    "search": ("council", "postcode"),
+    "details": ("url",),
+    "comments": ("url",),
+}
+
+
+def read_jobs(path, command):
+    """Read a job file into a list of dicts.
+
+    Args:
+        path: CSV file with a header row, or a plain list of URLs
+        command: "search", "details" or "comments"
+
+    Returns:
+        List of job dicts, in file order
+
+    Raises:
+        ValueError: If a required column is missing
+    """
+    with open(path, newline="") as f:
+        lines = [line for line in f.read().splitlines() if line.strip()]
+
+    if lines and lines[0].strip().lower().startswith("http"):
+        jobs = [{"url": line.strip()} for line in lines]
+    else:
+        jobs = [
+            {key.strip(): (value or "").strip() for key, value in row.items() if key}
+            for row in csv.DictReader(lines)
+        ]
+
+    missing = [c for c in REQUIRED_COLUMNS[command] if jobs and c not in jobs[0]]
+    if missing:
+        raise ValueError(f"Job file {path} is missing column(s): {', '.join(missing)}")
+    return jobs
+
+
+def job_host(command, job, urls_csv=None):
+    """Return the site a job will hit, used to keep each site on one worker."""
+    from .registry import get_council
+    from .scheduler import host_key
+
+    if command == "search":
+        return host_key(get_council(job["council"], urls_csv).url)
+    return host_key(job["url"])
+
+
+def assign_jobs(jobs, workers, hosts=None):
+    """Split jobs between workers.
+
+    With hosts given, all jobs for a host go to the same worker (largest
+    hosts first, each to the least loaded worker), so every site is still
+    crawled at a single worker's polite rate. Otherwise jobs are dealt
+    out round-robin.
+
+    Args:
+        jobs: List of jobs
+        workers: Number of workers
+        hosts: Optional list of host keys, one per job
+
+    Returns:
+        List (one per worker) of lists of (job index, job)
+    """
+    shards = [[] for _ in range(workers)]
+    if hosts is None:
+        for index, job in enumerate(jobs):
+            shards[index % workers].append((index, job))
+        return shards
+
+    by_host = {}
+    for index, (job, host) in enumerate(zip(jobs, hosts)):
+        by_host.setdefault(host, []).append((index, job))
+
+    for host_jobs in sorted(by_host.values(), key=len, reverse=True):
+        min(shards, key=len).extend(host_jobs)
+    return [shard for shard in shards if shard]
+
+
+class Progress:
+    """Live jobs/s, rows and ETA line for a batch run.
+
+    Redraws one line in place on a terminal; otherwise prints a line
+    every `interval` seconds.
+
+    Args:
+        total: Number of jobs
+        stream: Output stream (default: stderr)
+        interval: Seconds between lines when not on a terminal
+    """
+
+    def __init__(self, total, stream=None, interval=10.0):
+        self.total = total
+        self.stream = stream or sys.stderr
+        self.interval = interval
+        self.done = 0
+        self.failed = 0
+        self.rows = 0
+        self._start = time.monotonic()
+        self._shown = 0.0
+        self._live = self.stream.isatty()
+
+    def update(self, rows=0, failed=False):
+        """Record one finished job."""
+        self.done += 1
+        self.rows += rows
+        self.failed += failed
+        self.show()
+
+    def show(self, final=False):
+        now = time.monotonic()
+        if not final and now - self._shown < (0.5 if self._live else self.interval):
+            return
+        self._shown = now
+
+        elapsed = now - self._start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = (self.total - self.done) / rate if rate > 0 else None
+        line = (
+            f"[{self.done}/{self.total}] {rate:.2f} jobs/s, "
+            f"{self.rows} rows ({self.rows / elapsed if elapsed > 0 else 0:.1f}/s), "
+            f"{self.failed} failed, elapsed {_format_duration(elapsed)}, "
+            f"ETA {_format_duration(remaining)}"
+        )
+        if self._live:
+            self.stream.write(f"\r{line}\033[K" + ("\n" if final else ""))
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+
+def _format_duration(seconds):
+    if seconds is None:
+        return "?"
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def open_output(command, path):
+    """Open the sink for a command's output, chosen by file extension."""
+    from .sinks import (
+        CsvSink, ParquetSink, SqliteCommentSink, ParquetCommentSink
+    )
+
+    extension = os.path.splitext(path)[1].lower()
+    if command == "comments":
+        if extension in (".db", ".sqlite", ".sqlite3"):
+            return SqliteCommentSink(path)
+        if extension == ".parquet":
+            return ParquetCommentSink(path)
+    elif extension == ".parquet":
+        return ParquetSink(path, batch_size=500, flush_interval=60)
+
+    if extension == ".csv":
+        return CsvSink(path, batch_size=100, flush_interval=30)
+    raise ValueError(f"Unsupported output file type for {command}: {path}")
+
+
+class _CommentCollector:
+    """comments_saver that keeps comments so the worker can send them back.
+
+    It also stands in for the output sink's crawl tracking: `complete` is
+    whether the sink recorded the application's last crawl as reaching
+    the oldest comment, and `crawl_complete` whether this crawl did.
+    """
+
+    def __init__(self, complete=False):
+        self.records = []
+        self.complete = complete
+        self.crawl_complete = False
+
+    def comment_crawl_complete(self, app_id):
+        return self.complete
+
+    def mark_comment_crawl(self, app_id, complete):
+        self.crawl_complete = complete
+
+    def insert_comment(self, council, comment_id, app_id, address, stance, date, comment_text):
+        self.records.append({
+            "council": council, "comment_id": comment_id, "app_id": app_id,
+            "address": address, "stance": stance, "date": date,
+            "comment_text": comment_text,
+        })
+
+
+def _run_job(command, job, client, options, limiter, cache, journal):
+    """Run one job in a worker.
+
+    Returns:
+        Tuple of (records to write, failed)
+    """
+    from .scraper import get_postcode_page, iter_app_details, scrape_comments
+    from .utils import is_missing
+
+    if command == "search":
+        urls = get_postcode_page(job["council"], job["postcode"], urls_csv=options.urls_csv,
+                                 driver=client, limiter=limiter, journal=journal)
+        records = [
+            {"council": job["council"], "postcode": job["postcode"], "url": url}
+            for url in urls
+        ]
+        return records, False
+
+    if command == "details":
+        row = next(iter_app_details([job["url"]], max_retries=options.max_retries,
+                                    driver=client, limiter=limiter, cache=cache,
+                                    journal=journal))
+        return [row], is_missing(row["reference"])
+
+    # An interrupted crawl counts as failed; run() records it with the sink
+    collector = _CommentCollector(job.get("crawl_complete", False))
+    scrape_comments(client, job.get("council") or "", comment_job_app_id(job),
+                    job["url"], comments_saver=collector, limiter=limiter, cache=cache,
+                    known_ids=job.get("known_ids"))
+    return collector.records, not collector.crawl_complete
+
+
+def comment_job_app_id(job):
+    """Return a comments job's app_id: its app_id column, else the URL's keyVal."""
+    from .scraper import application_key
+
+    return job.get("app_id") or application_key(job["url"])
+
+
+def _worker(worker_id, command, shard, options, results):
+    """Worker process: run a shard of jobs with one client, sending results back.
+
+    Messages put on `results`:
+        ("result", job index, records, failed, error or None)
+        ("metrics", worker_id, snapshot)   every METRICS_INTERVAL seconds
+        ("done", worker_id, snapshot)      when the shard is finished
+    """
+    from .cache import PageCache
+    from .journal import CrawlJournal
+    from .metrics import metrics
+    from .registry import get_registry
+    from .scheduler import HostRateLimiter
+    from .scraper import open_client
+
+    logging.basicConfig(
+        level=logging.INFO if options.verbose else logging.WARNING,
+        format=f"%(asctime)s worker {worker_id} %(levelname)s %(name)s: %(message)s"
+    )
+    metrics.reset()
+    last_snapshot = time.monotonic()
+
+    client = open_client(options.engine, options.os_type)
+    limiter = HostRateLimiter(rate=options.rate, rates=get_registry(options.urls_csv).rates())
+    cache = PageCache(options.cache) if options.cache else None
+    journal = CrawlJournal(options.journal) if options.journal else None
+    try:
+        for index, job in shard:
+            try:
+                records, failed = _run_job(command, job, client, options,
+                                           limiter, cache, journal)
+                results.put(("result", index, records, failed, None))
+            except Exception as e:
+                results.put(("result", index, [], True, f"{type(e).__name__}: {e}"))
+
+            if time.monotonic() - last_snapshot >= METRICS_INTERVAL:
+                last_snapshot = time.monotonic()
+                results.put(("metrics", worker_id, metrics.snapshot()))
+    finally:
+        client.quit()
+        if journal is not None:
+            journal.close()
+        results.put(("done", worker_id, metrics.snapshot()))
+
+
+def metrics_exporters(options):
+    """Build the exporters asked for on the command line."""
+    from .metrics import JsonLinesExporter, PrometheusExporter
+
+    exporters = []
+    if options.metrics_jsonl:
+        exporters.append(JsonLinesExporter(options.metrics_jsonl))
+    if options.metrics_prom:
+        exporters.append(PrometheusExporter(options.metrics_prom))
+    return exporters
+
+
+def merge_snapshots(snapshots, started_at, elapsed):
+    """Combine the latest metrics snapshot from each worker into one."""
+    from .metrics import Metrics
+
+    combined = Metrics()
+    for snapshot in snapshots:
+        combined.merge(snapshot)
+    snapshot = combined.snapshot()
+    snapshot["started_at"] = started_at
+    snapshot["elapsed"] = elapsed
+    return snapshot
+
+
+def run(command, jobs, options):
+    """Run jobs across worker processes and write their output.
+
+    Args:
+        command: "search", "details" or "comments"
+        jobs: List of job dicts (see read_jobs)
+        options: Parsed command-line options
+
+    Returns:
+        Progress with the final counts
+    """
+    from .metrics import SummaryExporter
+
+    progress = Progress(len(jobs))
+    sink = open_output(command, options.output)
+    exporters = metrics_exporters(options)
+    started_at = time.time()
+    worker_metrics = {}
+
+    def export_metrics(*extra_exporters):
+        snapshot = merge_snapshots(worker_metrics.values(), started_at,
+                                   time.time() - started_at)
+        for exporter in exporters + list(extra_exporters):
+            exporter.export(snapshot)
+
+    try:
+        tracks_crawls = command == "comments" and hasattr(sink, "mark_comment_crawl")
+        if command == "comments" and hasattr(sink, "known_comment_ids"):
+            # Workers only fetch comments newer than those already saved
+            for job in jobs:
+                job["app_id"] = comment_job_app_id(job)
+                job["known_ids"] = sink.known_comment_ids(job["app_id"])
+                if tracks_crawls:
+                    job["crawl_complete"] = sink.comment_crawl_complete(job["app_id"])
+
+        hosts = None if options.split_hosts else [
+            job_host(command, job, options.urls_csv) for job in jobs
+        ]
+        shards = assign_jobs(jobs, max(1, options.workers), hosts)
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=_worker,
+                                    args=(worker_id, command, shard, options, results),
+                                    daemon=True)
+            for worker_id, shard in enumerate(shards)
+        ]
+        for process in processes:
+            process.start()
+
+        running = len(processes)
+        while running:
+            try:
+                message = results.get(timeout=1)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    print("All workers exited early", file=sys.stderr)
+                    break
+                progress.show()
+                continue
+
+            kind = message[0]
+            if kind in ("metrics", "done"):
+                _, worker_id, snapshot = message
+                worker_metrics[worker_id] = snapshot
+                running -= kind == "done"
+                export_metrics()
+                continue
+
+            _, index, records, failed, error = message
+            if error:
+                print(f"\nJob {index + 1} failed: {error}", file=sys.stderr)
+            for record in records:
+                sink.write(record)
+            if tracks_crawls:
+                sink.mark_comment_crawl(comment_job_app_id(jobs[index]), complete=not failed)
+            progress.update(len(records), failed)
+
+        for process in processes:
+            process.join()
+    finally:
+        sink.close()
+        progress.show(final=True)
+        export_metrics(SummaryExporter())
+
+    return progress
+
+
+def build_parser():
+    from .scheduler import DEFAULT_RATE
+
+    parser = argparse.ArgumentParser(
+        prog="python -m planning_scraper",
+        description="Run planning_scraper jobs in parallel worker processes."
+    )
+    parser.add_argument("command", choices=COMMANDS,
+                        help="search postcodes, scrape application details, or scrape comments")
+    parser.add_argument("jobs", help="job file (CSV with a header row, or a list of URLs)")
+    parser.add_argument("-o", "--output", required=True,
+                        help="output file: .csv or .parquet (comments: also .db for SQLite)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument("--engine", choices=("http", "selenium"), default="http",
+                        help="page engine (default: http)")
+    parser.add_argument("--os-type", choices=("mac", "linux"), default="linux",
+                        help="OS type for the selenium engine (default: linux)")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help="requests per second per site, unless the council "
+                             "registry sets one (default: %(default).3f)")
+    parser.add_argument("--split-hosts", action="store_true",
+                        help="spread one site's jobs over all workers; the site then "
+                             "sees up to workers x rate requests per second")
+    parser.add_argument("--urls-csv", default=None,
+                        help="council registry CSV (default: data/input/example_urls.csv)")
+    parser.add_argument("--max-retries", type=int, default=3,
+                        help="attempts per application URL (default: 3)")
+    parser.add_argument("--cache", default=None, help="PageCache directory")
+    parser.add_argument("--journal", default=None,
+                        help="CrawlJournal database, so an interrupted run can resume")
+    parser.add_argument("--metrics-jsonl", default=None,
+                        help="append metrics snapshots to this JSON lines file")
+    parser.add_argument("--metrics-prom", default=None,
+                        help="keep this file updated with metrics in Prometheus text format")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="log the workers' per-page progress")
+    return parser
+
+
+def main(argv=None):
+    """Entry point for python -m planning_scraper."""
+    options = build_parser().parse_args(argv)
+
+    try:
+        jobs = read_jobs(options.jobs, options.command)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    if not jobs:
+        print("No jobs to run", file=sys.stderr)
+        return 0
+
+    print(f"Running {len(jobs)} {options.command} jobs with up to "
+          f"{options.workers} workers -> {options.output}", file=sys.stderr)
+    progress = run(options.command, jobs, options)
+    return 1 if progress.done < progress.total else 0
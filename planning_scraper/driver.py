@@ -1,52 +1,126 @@
+import logging
 import random
+import threading
+from collections import deque
+from contextlib import contextmanager
+
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 
 
-def setup_driver(os_type="mac", headless=True):
+logger = logging.getLogger(__name__)
+
+
+# Requests Chrome never makes when resources are blocked: Idox pages are
+# read from the HTML alone, so images, fonts, stylesheets and analytics
+# are wasted bandwidth and page-load time.
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.css",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*hotjar.com*", "*clarity.ms*", "*siteimprove*", "*cookiebot*",
+]
+
+# Chrome content settings: 2 = block. Chrome has no content setting for
+# stylesheets or fonts; BLOCKED_URL_PATTERNS covers those.
+BLOCKING_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.notifications": 2,
+}
+
+# Bytes received for the current page and its subresources
+PAGE_BYTES_SCRIPT = """
+var total = 0;
+var entries = performance.getEntriesByType("navigation")
+    .concat(performance.getEntriesByType("resource"));
+for (var i = 0; i < entries.length; i++) {
+    total += entries[i].transferSize || 0;
+}
+return total;
+"""
+
+
+def setup_driver(os_type="mac", headless=True, block_resources=True,
+                 page_load_strategy="eager"):
     """Set up and return a configured Chrome WebDriver.
     
     Args:
         os_type: "mac" or "linux"
         headless: Run browser in headless mode # this avoids opening a visible browser window
+        block_resources: Block images, fonts, CSS and analytics (see
+            BLOCKED_URL_PATTERNS) through DevTools network blocking, plus
+            the images content setting
+        page_load_strategy: "eager" returns from get() once the HTML is
+            parsed, without waiting for the load event; "normal" waits
+            for every subresource
         
     Returns:
         Configured Chrome WebDriver instance
     """
+    options = Options()
+    options.add_argument("--no-sandbox")
+    options.page_load_strategy = page_load_strategy
+    if block_resources:
+        options.add_experimental_option("prefs", BLOCKING_PREFS)
+    
     if os_type == "mac":
-        options = Options()
-        options.add_argument("--no-sandbox")
         if headless:
             options.add_argument("--headless")
-        options.add_argument("--disable-images")
-        options.add_argument("--disable-plugins")
-        options.add_argument("--disable-javascript")
         service = webdriver.ChromeService()
-        
-        return webdriver.Chrome(service=service, options=options)
     
     elif os_type == "linux":
         CHROMEDRIVER_PATH = "/usr/bin/chromedriver"
         CHROME_BINARY_PATH = "/usr/bin/chromium"
         
-        options = Options()
         options.binary_location = CHROME_BINARY_PATH
-        options.add_argument("--no-sandbox")
         options.add_argument("--disable-dev-shm-usage")
         if headless:
             options.add_argument("--headless=new")
-        options.add_argument("--remote-debugging-port=9230")
-        options.add_argument("--disable-images")
-        options.add_argument("--disable-plugins")
-        options.add_argument("--disable-javascript")
         service = Service(CHROMEDRIVER_PATH)
-        
-        return webdriver.Chrome(service=service, options=options)
     
     else:
         raise ValueError(f"Unsupported os_type: {os_type}")
+    
+    driver = webdriver.Chrome(service=service, options=options)
+    if block_resources:
+        block_urls(driver, BLOCKED_URL_PATTERNS)
+    return driver
+
+
+def block_urls(driver, patterns):
+    """Stop a Chrome driver from requesting URLs matching any pattern.
+    
+    Uses DevTools network blocking, so blocked requests never leave the
+    browser. Patterns use * as a wildcard.
+    
+    Args:
+        driver: Chrome WebDriver instance
+        patterns: List of URL patterns
+    """
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns)})
+
+
+def page_bytes(driver):
+    """Return the bytes transferred for the driver's current page.
+    
+    Sums the transfer sizes the browser reports for the document and its
+    subresources. Cross-origin resources without Timing-Allow-Origin
+    report 0.
+    
+    Args:
+        driver: WebDriver instance
+        
+    Returns:
+        Bytes as an int, or None if the browser didn't report them
+    """
+    try:
+        return int(driver.execute_script(PAGE_BYTES_SCRIPT))
+    except Exception:
+        return None
 
 
 def get_wait(driver, timeout=10):
@@ -71,3 +145,225 @@ def random_sleep(min_seconds=2, max_seconds=5):
     """
     import time
     time.sleep(random.uniform(min_seconds, max_seconds))
+
+
+class PooledDriver:
+    """WebDriver wrapper that counts page loads for a DriverPool.
+    
+    Every attribute other than get() is passed through to the wrapped
+    driver, so a PooledDriver can be used anywhere a WebDriver is.
+    """
+    
+    def __init__(self, driver):
+        self.driver = driver
+        self.page_loads = 0
+    
+    def get(self, url):
+        self.page_loads += 1
+        return self.driver.get(url)
+    
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+
+def driver_memory_mb(driver):
+    """Return resident memory of a driver's browser processes in MB.
+    
+    Sums chromedriver and all of its child processes (Chrome renderers etc).
+    
+    Args:
+        driver: WebDriver or PooledDriver instance
+        
+    Returns:
+        Memory in MB, or None if psutil is not installed or the process is gone
+    """
+    try:
+        import psutil
+    except ImportError:
+        _warn_no_psutil()
+        return None
+    
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        processes = [process] + process.children(recursive=True)
+    except (AttributeError, psutil.Error):
+        return None
+    
+    total = 0
+    for proc in processes:
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            pass
+    return total / (1024 * 1024)
+
+
+_psutil_warned = False
+
+
+def _warn_no_psutil():
+    """Log once that driver memory can't be measured without psutil."""
+    global _psutil_warned
+    if not _psutil_warned:
+        _psutil_warned = True
+        logger.warning("psutil is not installed, so drivers are not recycled on memory "
+                       "(max_memory_mb is ignored): pip install psutil")
+
+
+class DriverPool:
+    """Pool of warm Chrome WebDrivers that are reused across scraping calls.
+    
+    Drivers are started lazily up to max_size, health-checked on lease and
+    recycled (quit and replaced) after max_page_loads page loads or once
+    their browser memory exceeds max_memory_mb.
+    
+    Example:
+        >>> pool = DriverPool(max_size=2, os_type="linux")
+        >>> with pool.lease() as driver:
+        ...     urls = get_postcode_page("newham", "E13 0AG", driver=driver)
+        >>> pool.close()
+    
+    Args:
+        max_size: Maximum number of drivers alive at once
+        os_type: "mac" or "linux", passed to setup_driver
+        headless: Run browsers in headless mode
+        max_page_loads: Recycle a driver after this many page loads
+        max_memory_mb: Recycle a driver above this memory (needs psutil)
+    """
+    
+    def __init__(self, max_size=2, os_type="mac", headless=True,
+                 max_page_loads=500, max_memory_mb=1024):
+        self.max_size = max_size
+        self.os_type = os_type
+        self.headless = headless
+        self.max_page_loads = max_page_loads
+        self.max_memory_mb = max_memory_mb
+        if max_memory_mb is not None:
+            try:
+                import psutil  # noqa: F401
+            except ImportError:
+                _warn_no_psutil()
+        
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+        self._available = threading.Condition()
+    
+    def acquire(self, timeout=None):
+        """Lease a healthy driver, starting one if the pool has room.
+        
+        Args:
+            timeout: Seconds to wait for a free driver (None waits forever)
+            
+        Returns:
+            PooledDriver instance; hand it back with release()
+            
+        Raises:
+            TimeoutError: If no driver became free within timeout
+        """
+        while True:
+            with self._available:
+                if self._closed:
+                    raise RuntimeError("DriverPool is closed")
+                if self._idle:
+                    driver = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                    driver = None
+                elif not self._available.wait(timeout):
+                    raise TimeoutError("No driver available in DriverPool")
+                else:
+                    continue
+            
+            if driver is None:
+                try:
+                    return PooledDriver(setup_driver(self.os_type, self.headless))
+                except Exception:
+                    self._discard(None)
+                    raise
+            
+            if self._is_healthy(driver):
+                return driver
+            self._discard(driver)
+    
+    def release(self, driver, discard=False):
+        """Return a leased driver to the pool.
+        
+        Args:
+            driver: PooledDriver from acquire()
+            discard: Quit the driver instead of reusing it (e.g. after a crash)
+        """
+        if discard or self._closed or self._needs_recycle(driver):
+            self._discard(driver)
+            return
+        
+        with self._available:
+            self._idle.append(driver)
+            self._available.notify()
+    
+    @contextmanager
+    def lease(self, timeout=None):
+        """Context manager that acquires a driver and always releases it.
+        
+        A driver whose block raised a WebDriverException is discarded.
+        """
+        from selenium.common.exceptions import WebDriverException
+        
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        except WebDriverException:
+            self.release(driver, discard=True)
+            raise
+        except BaseException:
+            self.release(driver)
+            raise
+        else:
+            self.release(driver)
+    
+    def close(self):
+        """Quit all idle drivers; leased drivers are quit when released."""
+        with self._available:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._available.notify_all()
+        
+        for driver in idle:
+            self._discard(driver)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def _is_healthy(self, driver):
+        """Check the browser still responds to WebDriver commands."""
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+    
+    def _needs_recycle(self, driver):
+        """Check whether a driver has reached its page-load or memory limit."""
+        if driver.page_loads >= self.max_page_loads:
+            return True
+        if self.max_memory_mb is not None:
+            memory = driver_memory_mb(driver)
+            if memory is not None and memory > self.max_memory_mb:
+                return True
+        return False
+    
+    def _discard(self, driver):
+        """Quit a driver and free its slot in the pool."""
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        
+        with self._available:
+            self._size -= 1
+            self._available.notify()
@@ -0,0 +1,380 @@
+"""Browserless HTTP engine for Idox planning pages.
+
+Idox summary, details, search results and comment pages are plain
+server-rendered HTML, so they can be fetched over a pooled keep-alive
+``requests`` session and parsed with lxml instead of driving Chrome.
+"""
+
+import re
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from lxml import html as lxml_html
+
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-GB,en;q=0.9",
+}
+
+def _class_xpath(class_name):
+    """Return an XPath predicate matching elements with a CSS class."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+SEARCH_INPUT_XPATH = "//input[@id='simpleSearchString']"
+SUMMARY_LINK_XPATH = f"//a[{_class_xpath('summaryLink')}]"
+NEXT_LINK_XPATH = "//a[normalize-space()='Next' or contains(@aria-label, 'Next')]"
+RESULTS_COUNT_XPATH = f"//*[{_class_xpath('showing')}]"
+# Address of a search result, relative to its summary link
+RESULT_ADDRESS_XPATH = f"ancestor::li[1]//*[{_class_xpath('address')}]"
+# Comments list or its pager: present on a comments page even past the
+# last comment, but not on error or maintenance pages
+COMMENTS_LIST_XPATH = f"//*[@id='comments' or {_class_xpath('pager')}]"
+
+# Total in Idox's "Showing 1-10 of 123" results counter
+RESULTS_COUNT_PATTERN = re.compile(r'\bof\s+([\d,]+)')
+
+
+class FetchError(Exception):
+    """Raised when a page cannot be fetched (non-2xx status or network error)."""
+
+    def __init__(self, message, status_code=None, response=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = response
+
+
+class RateLimitError(FetchError):
+    """Raised on HTTP 429 or when a page shows a rate-limit message.
+    
+    Attributes:
+        retry_after: Seconds the server asked us to wait, or None
+    """
+
+    def __init__(self, message, status_code=None, response=None, retry_after=None):
+        super().__init__(message, status_code, response)
+        self.retry_after = retry_after
+
+
+class TooManyResultsError(Exception):
+    """Raised when a search matches more applications than the site will list."""
+
+
+class IncompleteSearchError(FetchError):
+    """Raised when paging through search results stopped before the last page.
+    
+    Attributes:
+        results: (URL, address) pairs collected before paging stopped
+        total: Number of results the search said it matched, or None
+    """
+
+    def __init__(self, message, results, total=None):
+        super().__init__(message)
+        self.results = results
+        self.total = total
+
+    @property
+    def urls(self):
+        """Application URLs collected before paging stopped."""
+        return [url for url, _ in self.results]
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds.
+
+    Returns:
+        Seconds to wait (>= 0), or None if value is missing or malformed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpFetcher:
+    """Fetch and parse Idox pages over a pooled keep-alive HTTP session.
+
+    The session's cookie jar carries the Idox search session between the
+    search form, the results pages and the pager links.
+
+    Args:
+        pool_size: Number of keep-alive connections kept per host
+        timeout: Request timeout in seconds
+        headers: Extra headers merged over DEFAULT_HEADERS
+    """
+
+    def __init__(self, pool_size=10, timeout=30, headers=None):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        if headers:
+            self.session.headers.update(headers)
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method, url, **kwargs):
+        """Send a request and return the response.
+
+        Raises:
+            RateLimitError: On HTTP 429
+            FetchError: On network errors or other non-2xx responses
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException as e:
+            raise FetchError(f"Request to {url} failed: {e}") from e
+
+        if response.status_code == 429:
+            raise RateLimitError(
+                f"429 Too Many Requests for {url}",
+                status_code=429,
+                response=response,
+                retry_after=parse_retry_after(response.headers.get("Retry-After"))
+            )
+        if response.status_code >= 400:
+            raise FetchError(
+                f"{response.status_code} {response.reason} for {url}",
+                status_code=response.status_code,
+                response=response
+            )
+        return response
+
+    def get_page(self, url, **kwargs):
+        """GET a URL and return the parsed lxml document."""
+        return parse_page(self.request("GET", url, **kwargs))
+
+    def search_postcode(self, base_url, postcode, search_input_xpath=SEARCH_INPUT_XPATH,
+                        extra_fields=None):
+        """Submit the Idox simple search form for a postcode.
+
+        Args:
+            base_url: Council's online-applications URL
+            postcode: Postcode to search
+            search_input_xpath: XPath of the search box
+            extra_fields: Optional dict of extra form fields to submit
+                (e.g. the results page size)
+
+        Returns:
+            Parsed first page of search results
+        """
+        form, field = search_form(self.get_page(base_url), search_input_xpath)
+        return self.submit_form(form, {field: postcode, **(extra_fields or {})})
+
+    def submit_form(self, form, fields=None):
+        """Submit an lxml form with its current values, overridden by fields.
+
+        Returns:
+            Parsed response page
+        """
+        return parse_page(self.form_request(form, fields))
+
+    def form_request(self, form, fields=None):
+        """Submit an lxml form (see submit_form) and return the raw response."""
+        values = {
+            field.get("name"): field.get("value") or ""
+            for field in form.xpath(".//input[@name]")
+            if field.get("type") not in ("submit", "button", "checkbox", "radio")
+        }
+        for select in form.xpath(".//select[@name]"):
+            selected = select.xpath(".//option[@selected]") or select.xpath(".//option")
+            if selected:
+                values[select.get("name")] = selected[0].get("value") or ""
+        values.update(fields or {})
+
+        action = form_url(form)
+        method = (form.get("method") or "post").upper()
+        if method == "GET":
+            return self.request("GET", action, params=values)
+        return self.request("POST", action, data=values)
+
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
+
+    # Mirror WebDriver so callers can shut down either engine the same way
+    quit = close
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def search_form(page, search_input_xpath=SEARCH_INPUT_XPATH):
+    """Find the simple search form on an Idox search page.
+
+    Returns:
+        (form, name of its search box field)
+
+    Raises:
+        FetchError: If the page has no such form
+    """
+    search_boxes = page.xpath(search_input_xpath)
+    forms = list(search_boxes[0].iterancestors("form")) if search_boxes else []
+    if not forms:
+        raise FetchError(f"No simple search form found at {page.base_url}")
+    return forms[0], search_boxes[0].get("name")
+
+
+def form_url(form):
+    """Return the absolute URL an lxml form submits to."""
+    return urljoin(form.base_url or "", form.get("action") or "")
+
+
+def parse_page(response):
+    """Parse a response into an lxml document with absolute links."""
+    return parse_html(response.content, response.url)
+
+
+def parse_html(body, url):
+    """Parse an HTML body fetched from url into an lxml document with absolute links."""
+    page = lxml_html.fromstring(body, base_url=url)
+    page.make_links_absolute(url)
+    return page
+
+
+# Elements whose boundaries separate words, as in a browser's rendered
+# text (WebElement.text)
+TEXT_BREAK_TAGS = frozenset({
+    "br", "p", "div", "li", "ul", "ol", "dl", "dt", "dd", "table", "tr", "td", "th",
+    "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "hr",
+})
+
+
+def element_text(element):
+    """Return an element's text with whitespace collapsed.
+    
+    Line breaks and block elements separate words, so "I object.<br>Too
+    tall." reads "I object. Too tall." as it does in selenium.
+    """
+    if len(element) == 0:
+        return " ".join((element.text or "").split())
+    return " ".join("".join(_text_parts(element)).split())
+
+
+def _text_parts(element):
+    """Yield an element's text pieces in document order, with breaks as spaces."""
+    breaks = element.tag in TEXT_BREAK_TAGS
+    if breaks:
+        yield " "
+    if element.text and isinstance(element.tag, str):
+        yield element.text
+    for child in element:
+        if isinstance(child.tag, str):
+            yield from _text_parts(child)
+        if child.tail:
+            yield child.tail
+    if breaks:
+        yield " "
+
+
+def summary_links(page, xpath=SUMMARY_LINK_XPATH):
+    """Return all application summary URLs on a search results page."""
+    return [link.get("href") for link in page.xpath(xpath)]
+
+
+def summary_results(page, xpath=SUMMARY_LINK_XPATH, address_xpath=RESULT_ADDRESS_XPATH):
+    """Return (summary URL, address) for every result on a search results page.
+
+    Args:
+        page: Parsed search results page
+        xpath: XPath of the result links
+        address_xpath: XPath of a result's address, relative to its link
+
+    Returns:
+        List of (URL, address) pairs; address is None if a result shows none
+    """
+    results = []
+    for link in page.xpath(xpath):
+        addresses = link.xpath(address_xpath)
+        results.append((link.get("href"), element_text(addresses[0]) if addresses else None))
+    return results
+
+
+def next_page_url(page, xpath=NEXT_LINK_XPATH):
+    """Return the URL of the next results page, or None on the last page."""
+    links = page.xpath(xpath)
+    if not links:
+        return None
+    link = links[0]
+    if "disabled" in (link.get("class") or "").lower():
+        return None
+    return link.get("href")
+
+
+def parse_results_count(text):
+    """Return the total from a "Showing 1-10 of 123" results counter, or None."""
+    match = RESULTS_COUNT_PATTERN.search(text or "")
+    return int(match.group(1).replace(",", "")) if match else None
+
+
+def results_count(page, xpath=RESULTS_COUNT_XPATH):
+    """Return the number of results a search results page says it matched, or None."""
+    counters = page.xpath(xpath)
+    return parse_results_count(element_text(counters[0])) if counters else None
+
+
+def page_size_options(page, param):
+    """Return the results-per-page choices on a results page.
+
+    Args:
+        page: Parsed search results page
+        param: Name of the results-per-page select (e.g.
+            "searchCriteria.resultsPerPage")
+
+    Returns:
+        (sizes, selected): sorted list of offered sizes and the selected
+        one (None if not marked); ([], None) if the page has no selector
+    """
+    selects = page.xpath(f"//select[@name='{param}']")
+    if not selects:
+        return [], None
+    sizes, selected = [], None
+    for option in selects[0].xpath(".//option"):
+        value = (option.get("value") or "").strip()
+        if value.isdigit():
+            sizes.append(int(value))
+            if option.get("selected") is not None:
+                selected = int(value)
+    return sorted(sizes), selected
+
+
+def parse_comments(page):
+    """Extract comments from a neighbourComments page.
+
+    Returns:
+        List of dicts with address, stance, date and text keys
+    """
+    comments = []
+    for comment in page.xpath(f"//*[{_class_xpath('comment')}]"):
+        date = _first_text(comment, './/h3[contains(text(), "Comment submitted date:")]')
+        comments.append({
+            "text": _first_text(comment, f".//*[{_class_xpath('comment-text')}]"),
+            "address": _first_text(comment, f".//*[{_class_xpath('consultationAddress')}]"),
+            "stance": _first_text(comment, f".//*[{_class_xpath('consultationStance')}]").strip("()"),
+            "date": date.replace("Comment submitted date:", "").strip(),
+        })
+    return comments
+
+
+def _first_text(element, xpath, default="None"):
+    """Return the text of the first match for xpath under element."""
+    found = element.xpath(xpath)
+    return element_text(found[0]) if found else default
@@ -1,180 +1,405 @@
+import logging
 import re
+import time
+import numpy as np
 import pandas as pd
-from dataclasses import dataclass
-from typing import Optional
 
+from .address import (
+    Address, POSTCODE_PATTERN, extract_postcode, clean_address,
+    parse_address, validate_postcode
+)
+from .metrics import metrics
+
+# The address helpers live in address.py (no pandas/numpy) and are
+# re-exported here, where they were first defined
+__all__ = [
+    "Address", "extract_postcode", "parse_address", "clean_address", "validate_postcode",
+    "process_address_dataframe", "deduplicate_addresses", "cluster_addresses",
+    "haversine", "pairwise_distances", "calculate_distance", "SpatialIndex",
+    "normalise_postcodes", "build_postcode_index", "PostcodeIndex",
+]
 
-@dataclass
-class Address:
-    """Structured address data."""
-    full_address: str
-    street: Optional[str] = None
-    city: Optional[str] = None
-    postcode: Optional[str] = None
-    
-    def __str__(self):
-        return self.full_address
 
+logger = logging.getLogger(__name__)
 
-# UK postcode regex
-POSTCODE_PATTERN = re.compile(
-    r'([A-Z]{1,2}[0-9][A-Z0-9]?\s?[0-9][A-Z]{2})',
-    re.IGNORECASE
+
+# Every character Python's re counts as \s (and str.strip() removes), i.e.
+# every c with c.isspace(). process_address_dataframe spells whitespace out
+# with these rather than \s, because the pyarrow regex engine behind
+# pandas' default string dtype (from pandas 3) only counts ASCII
+# whitespace, so e.g. the non-breaking spaces common in scraped HTML would
+# be left in.
+WHITESPACE_CHARS = (
+    "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680"
+    "\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a"
+    "\u2028\u2029\u202f\u205f\u3000"
 )
+WHITESPACE = f"[{WHITESPACE_CHARS}]"
+POSTCODE_REGEX = POSTCODE_PATTERN.pattern.replace(r'\s', WHITESPACE)
+
+# Used by process_address_dataframe to split addresses into parts. The
+# separator is a Unicode noncharacter: not whitespace, and not expected in
+# any real address.
+ADDRESS_PART_SEPARATOR = "\uffff"
+ADDRESS_STREET_PATTERN = re.compile('^([^\uffff]+)')
+ADDRESS_CITY_PATTERN = re.compile('\uffff([^\uffff]*)\uffff[^\uffff]*$')
 
 
-def extract_postcode(address):
-    """Extract UK postcode from address string.
+def process_address_dataframe(df, address_column='address', inplace=True):
+    """Process addresses in a DataFrame.
+    
+    Vectorised with pandas string methods: each address is read once and
+    gives the same results as extract_postcode, parse_address and
+    clean_address applied row by row.
     
     Args:
-        address: Full address string
+        df: DataFrame with address data
+        address_column: Name of column containing addresses
+        inplace: Add the columns to df itself (default). If False, df is
+            left untouched and a copy with the new columns is returned.
         
     Returns:
-        Formatted postcode or None
-        
-    Example:
-        >>> extract_postcode("123 Main St, London SW1A 1AA")
-        'SW1A 1AA'
+        DataFrame with additional columns: postcode, street, city, cleaned_address
     """
-    if not address:
-        return None
+    if address_column not in df.columns:
+        logger.warning("Column '%s' not found", address_column)
+        return df
+    
+    if not inplace:
+        df = df.copy()
+    
+    logger.info("Processing %d addresses...", len(df))
+    start = time.perf_counter()
+    
+    present = df[address_column].notna()
+    addresses = df[address_column].astype(str).where(present, "")
+    stripped = addresses.str.strip(WHITESPACE_CHARS)
+    
+    # Extract postcodes, formatted as "OUTWARD INWARD". Upper-casing first
+    # lets the regex run without IGNORECASE, which is much faster.
+    postcode = addresses.str.upper().str.extract(POSTCODE_REGEX, expand=False)
+    postcode = postcode.str.replace(WHITESPACE, "", regex=True)
+    postcode = postcode.str[:-3] + " " + postcode.str[-3:]
+    
+    # Parse addresses: join each run of separators (and blank parts between
+    # them) into one marker, then take the first and second-to-last parts
+    parts = stripped.str.replace(f'{WHITESPACE}*[,\n][{WHITESPACE_CHARS},]*',
+                                 ADDRESS_PART_SEPARATOR, regex=True)
+    parts = parts.str.strip(ADDRESS_PART_SEPARATOR)
+    street = parts.str.extract(ADDRESS_STREET_PATTERN, expand=False)
+    city = parts.str.extract(ADDRESS_CITY_PATTERN, expand=False)
     
-    match = POSTCODE_PATTERN.search(address)
-    if match:
-        postcode = match.group(1).upper()
-        postcode = postcode.replace(" ", "")
-        if len(postcode) >= 4:
-            return f"{postcode[:-3]} {postcode[-3:]}"
-        return postcode
+    # Clean addresses
+    cleaned = stripped.str.replace(f'{WHITESPACE}+', ' ', regex=True)
+    cleaned = cleaned.str.replace(f'{WHITESPACE}*,{WHITESPACE}*', ', ', regex=True).str.strip(', ')
     
-    return None
+    df['postcode'] = _as_python_strings(postcode)
+    df['street'] = _as_python_strings(street)
+    df['city'] = _as_python_strings(city)
+    df['cleaned_address'] = _as_python_strings(cleaned)
+    
+    metrics.observe("address_processing_seconds", time.perf_counter() - start)
+    metrics.inc("rows_total", len(df), kind="address")
+    
+    valid_postcodes = df['postcode'].notna().sum()
+    logger.info("Extracted %d/%d valid postcodes", valid_postcodes, len(df))
+    
+    return df
 
 
-def clean_address(address):
-    """Clean and standardize address string.
+def _as_python_strings(series):
+    """Give a string Series the dtype and missing values that .apply would.
+    
+    Missing values become None and the dtype is re-inferred, whether the
+    input used object or pyarrow-backed strings.
+    """
+    series = series.astype(object)
+    return series.where(series.notna(), None).infer_objects()
+
+
+def deduplicate_addresses(addresses):
+    """Remove duplicate addresses.
     
     Args:
-        address: Raw address string
+        addresses: List of address strings
         
     Returns:
-        Cleaned address string
+        List of unique addresses
     """
-    if not address:
-        return ""
-    
-    # Remove extra whitespace
-    cleaned = re.sub(r'\s+', ' ', address.strip())
-    
-    # Standardize separators
-    cleaned = re.sub(r'\s*,\s*', ', ', cleaned)
+    seen = set()
+    unique = []
     
-    # Remove trailing/leading commas
-    cleaned = cleaned.strip(', ')
+    for addr in addresses:
+        cleaned = clean_address(addr)
+        if cleaned and cleaned.lower() not in seen:
+            seen.add(cleaned.lower())
+            unique.append(addr)
     
-    return cleaned
+    return unique
+
 
+# Used by cluster_addresses to normalise address tokens
+ADDRESS_ABBREVIATIONS = {
+    "st": "street", "rd": "road", "ave": "avenue", "av": "avenue",
+    "ln": "lane", "dr": "drive", "cl": "close", "ct": "court",
+    "cres": "crescent", "gdns": "gardens", "gr": "grove", "pl": "place",
+    "sq": "square", "tce": "terrace", "terr": "terrace", "pk": "park",
+    "hse": "house", "bldg": "building", "est": "estate",
+}
+ADDRESS_STOP_WORDS = {"flat", "apartment", "apt", "unit", "the", "and", "of", "no"}
+ADDRESS_NUMBER_PATTERN = re.compile(r'\b[a-z]*\d[a-z0-9]*\b')
+ADDRESS_WORD_PATTERN = re.compile(r'\b[a-z]+\b')
 
-def parse_address(address_string):
-    """Parse an address string into components.
+
+def cluster_addresses(addresses, threshold=0.6, max_block_size=1000):
+    """Group addresses that refer to the same property.
+    
+    Addresses are blocked on their postcode and house/flat numbers, so
+    "Flat 1, 2 High St" and "1/2 High Street" land in the same block while
+    "2 High St" does not. Within a block, addresses whose street/name words
+    have a Jaccard similarity of at least `threshold` (after expanding
+    abbreviations such as "St" -> "street") share a cluster. Blocks are
+    small, so the work stays near-linear in the number of addresses.
+    
+    Addresses without a postcode are only clustered with addresses that
+    have the same numbers and words.
     
     Args:
-        address_string: Full address string
+        addresses: List or Series of address strings
+        threshold: Minimum word Jaccard similarity to merge two addresses
+        max_block_size: Blocks larger than this (rare) only merge addresses
+            with identical words, to bound the pairwise comparisons
         
     Returns:
-        Address object with parsed components
+        NumPy array of cluster IDs aligned with `addresses` (-1 for missing
+        or empty addresses)
     """
-    if not address_string:
-        return Address(full_address="")
+    addresses = pd.Series(addresses, dtype=object).reset_index(drop=True)
+    present = addresses.notna()
+    upper = addresses.astype(str).where(present, "").str.upper()
     
-    cleaned = address_string.strip()
-    postcode = extract_postcode(cleaned)
+    # Postcode as the blocking key, then removed from the text to compare
+    postcode = upper.str.extract(POSTCODE_REGEX, expand=False)
+    postcode = postcode.str.replace(" ", "", regex=False).fillna("")
+    text = upper.str.replace(POSTCODE_REGEX, " ", regex=True).str.lower()
+    text = text.str.replace(r'[^a-z0-9]+', ' ', regex=True).str.strip()
     
-    # Split into parts
-    parts = re.split(r'[,\n]+', cleaned)
-    parts = [p.strip() for p in parts if p.strip()]
+    # Exact duplicates after normalisation are only tokenised once
+    codes, uniques = pd.factorize(postcode + "|" + text)
     
-    street = parts[0] if len(parts) > 0 else None
-    city = parts[-2] if len(parts) > 2 else None
+    blocks = {}
+    words = []
+    for i, key in enumerate(uniques):
+        code, _, body = key.partition("|")
+        numbers = tuple(ADDRESS_NUMBER_PATTERN.findall(body))
+        word_set = frozenset(
+            ADDRESS_ABBREVIATIONS.get(t, t) for t in ADDRESS_WORD_PATTERN.findall(body)
+            if t not in ADDRESS_STOP_WORDS
+        )
+        words.append(word_set)
+        block = (code, numbers) if code else (code, numbers, word_set)
+        blocks.setdefault(block, []).append(i)
     
-    return Address(
-        full_address=cleaned,
-        street=street,
-        city=city,
-        postcode=postcode
-    )
+    parent = np.arange(len(uniques))
+    
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    for members in blocks.values():
+        if len(members) == 1:
+            continue
+        if len(members) > max_block_size:
+            same_words = {}
+            for i in members:
+                parent[i] = find(same_words.setdefault(words[i], i))
+            continue
+        for a_pos, a in enumerate(members):
+            for b in members[a_pos + 1:]:
+                union = len(words[a] | words[b])
+                similarity = len(words[a] & words[b]) / union if union else 1.0
+                if similarity >= threshold:
+                    root_a, root_b = find(a), find(b)
+                    if root_a != root_b:
+                        parent[max(root_a, root_b)] = min(root_a, root_b)
+    
+    roots = np.array([find(i) for i in range(len(uniques))], dtype=np.int64)
+    cluster_ids = pd.factorize(roots[codes])[0]
+    
+    # Missing and empty addresses are not clustered
+    empty = (~present | (text == "")).to_numpy()
+    cluster_ids[empty] = -1
+    if empty.any():
+        cluster_ids[~empty] = pd.factorize(cluster_ids[~empty])[0]
+    return cluster_ids
+
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = EARTH_RADIUS_KM * np.pi / 180
 
 
-def validate_postcode(postcode):
-    """Validate UK postcode format.
+def haversine(lat1, lon1, lat2, lon2):
+    """Vectorised haversine distance using NumPy broadcasting.
+    
+    Arguments can be scalars or arrays of any broadcastable shapes, e.g.
+    one site against many applications (one-to-many).
     
     Args:
-        postcode: Postcode string
+        lat1, lon1: First point(s) coordinates in degrees
+        lat2, lon2: Second point(s) coordinates in degrees
         
     Returns:
-        True if valid, False otherwise
+        Distance(s) in kilometers
     """
-    if not postcode:
-        return False
-    return bool(POSTCODE_PATTERN.match(postcode.strip()))
+    lat1, lon1, lat2, lon2 = (
+        np.radians(np.asarray(value, dtype=float)) for value in (lat1, lon1, lat2, lon2)
+    )
+    
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
 
 
-def process_address_dataframe(df, address_column='address'):
-    """Process addresses in a DataFrame.
+def pairwise_distances(lats1, lons1, lats2=None, lons2=None):
+    """Distance matrix between two sets of points (or one set and itself).
     
     Args:
-        df: DataFrame with address data
-        address_column: Name of column containing addresses
+        lats1, lons1: Arrays of n points
+        lats2, lons2: Arrays of m points (default: the first set)
         
     Returns:
-        DataFrame with additional columns: postcode, street, city, cleaned_address
+        (n, m) array of distances in kilometers
     """
-    if address_column not in df.columns:
-        print(f"Column '{address_column}' not found")
-        return df
+    if lats2 is None:
+        lats2, lons2 = lats1, lons1
     
-    print(f"Processing {len(df)} addresses...")
-    
-    # Extract postcodes
-    df['postcode'] = df[address_column].apply(
-        lambda x: extract_postcode(str(x)) if pd.notna(x) else None
+    return haversine(
+        np.asarray(lats1, dtype=float)[:, None], np.asarray(lons1, dtype=float)[:, None],
+        np.asarray(lats2, dtype=float)[None, :], np.asarray(lons2, dtype=float)[None, :]
     )
+
+
+class SpatialIndex:
+    """Grid index over points for fast radius and nearest-neighbour queries.
     
-    # Parse addresses
-    parsed = df[address_column].apply(
-        lambda x: parse_address(str(x)) if pd.notna(x) else Address("")
-    )
+    Points are bucketed into square cells of about cell_size_km and sorted by
+    cell, so a query only measures distances to points in the cells its
+    search area overlaps. Longitude wrap-around at +/-180 is not handled,
+    which is fine for UK data.
     
-    df['street'] = parsed.apply(lambda x: x.street)
-    df['city'] = parsed.apply(lambda x: x.city)
-    df['cleaned_address'] = df[address_column].apply(
-        lambda x: clean_address(str(x)) if pd.notna(x) else ""
-    )
+    Example:
+        >>> index = SpatialIndex.from_dataframe(applications)
+        >>> labels, distances = index.query_radius(51.5413, 0.0088, 0.5)
+        >>> applications.loc[labels]
     
-    valid_postcodes = df['postcode'].notna().sum()
-    print(f"Extracted {valid_postcodes}/{len(df)} valid postcodes")
+    Args:
+        lats, lons: Arrays of point coordinates in degrees
+        labels: Optional array of labels returned by queries (default: positions)
+        cell_size_km: Grid cell size; roughly the typical query radius works well
+    """
     
-    return df
-
-
-def deduplicate_addresses(addresses):
-    """Remove duplicate addresses.
+    def __init__(self, lats, lons, labels=None, cell_size_km=0.5):
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        labels = np.arange(len(lats)) if labels is None else np.asarray(labels)
+        
+        valid = np.isfinite(lats) & np.isfinite(lons)
+        lats, lons, labels = lats[valid], lons[valid], labels[valid]
+        
+        self.cell_size_km = cell_size_km
+        self._lat0 = lats.min() if len(lats) else 0.0
+        self._lon0 = lons.min() if len(lons) else 0.0
+        
+        # Size cells in degrees so they are at least cell_size_km wide
+        # everywhere, including at the highest latitude in the data
+        max_abs_lat = np.abs(lats).max() if len(lats) else 0.0
+        self._dlat = cell_size_km / KM_PER_DEGREE
+        self._dlon = cell_size_km / (KM_PER_DEGREE * max(np.cos(np.radians(max_abs_lat)), 1e-6))
+        
+        rows, cols = self._cell(lats, lons)
+        self._n_rows = int(rows.max()) + 1 if len(rows) else 1
+        self._n_cols = int(cols.max()) + 1 if len(cols) else 1
+        
+        cells = rows * self._n_cols + cols
+        order = np.argsort(cells, kind="stable")
+        self._cells = cells[order]
+        self.lats = lats[order]
+        self.lons = lons[order]
+        self.labels = labels[order]
     
-    Args:
-        addresses: List of address strings
+    @classmethod
+    def from_dataframe(cls, df, lat_column='lat', lon_column='lon', cell_size_km=0.5):
+        """Index a geocoded DataFrame; queries return its index labels.
         
-    Returns:
-        List of unique addresses
-    """
-    seen = set()
-    unique = []
+        Rows with missing coordinates are left out.
+        """
+        return cls(df[lat_column].to_numpy(), df[lon_column].to_numpy(),
+                   labels=df.index.to_numpy(), cell_size_km=cell_size_km)
     
-    for addr in addresses:
-        cleaned = clean_address(addr)
-        if cleaned and cleaned.lower() not in seen:
-            seen.add(cleaned.lower())
-            unique.append(addr)
+    def __len__(self):
+        return len(self.labels)
     
-    return unique
+    def query_radius(self, lat, lon, radius_km):
+        """Find all points within radius_km of (lat, lon).
+        
+        Returns:
+            Tuple of (labels, distances_km), sorted nearest first
+        """
+        candidates = self._candidates(lat, lon, radius_km)
+        distances = haversine(lat, lon, self.lats[candidates], self.lons[candidates])
+        
+        within = distances <= radius_km
+        candidates, distances = candidates[within], distances[within]
+        
+        order = np.argsort(distances, kind="stable")
+        return self.labels[candidates[order]], distances[order]
+    
+    def query_knn(self, lat, lon, k):
+        """Find the k points nearest to (lat, lon).
+        
+        Returns:
+            Tuple of (labels, distances_km), sorted nearest first
+        """
+        k = min(k, len(self))
+        if k == 0:
+            return self.labels[:0], np.empty(0)
+        
+        # Widen the search until it holds k points; anything outside the
+        # radius is further away than everything inside it
+        radius = self.cell_size_km
+        while True:
+            labels, distances = self.query_radius(lat, lon, radius)
+            if len(labels) >= k:
+                return labels[:k], distances[:k]
+            radius *= 2
+    
+    def _cell(self, lats, lons):
+        rows = np.floor((lats - self._lat0) / self._dlat).astype(np.int64)
+        cols = np.floor((lons - self._lon0) / self._dlon).astype(np.int64)
+        return rows, cols
+    
+    def _candidates(self, lat, lon, radius_km):
+        """Positions of points in every cell overlapping the query's bounding box."""
+        dlat = radius_km / KM_PER_DEGREE
+        edge_lat = min(abs(lat) + dlat, 89.9)
+        dlon = radius_km / (KM_PER_DEGREE * np.cos(np.radians(edge_lat)))
+        
+        (row0, row1), (col0, col1) = self._cell(
+            np.array([lat - dlat, lat + dlat]), np.array([lon - dlon, lon + dlon])
+        )
+        row0, row1 = max(row0, 0), min(row1, self._n_rows - 1)
+        col0, col1 = max(col0, 0), min(col1, self._n_cols - 1)
+        if row0 > row1 or col0 > col1:
+            return np.empty(0, dtype=np.int64)
+        
+        # Within one grid row the overlapping cells are a contiguous run of
+        # cell ids, so each row is a single slice of the sorted points
+        rows = np.arange(row0, row1 + 1)
+        starts = np.searchsorted(self._cells, rows * self._n_cols + col0, side="left")
+        ends = np.searchsorted(self._cells, rows * self._n_cols + col1, side="right")
+        
+        return np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
 
 
 def calculate_distance(lat1, lon1, lat2, lon2):
@@ -203,3 +428,160 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     c = 2 * atan2(sqrt(a), sqrt(1-a))
     
     return R * c
+
+
+# Binary postcode index layout: 8-byte magic, uint64 count, then sorted
+# postcode keys (7 ASCII bytes, no space), then float32 lats, then float32 lons
+POSTCODE_INDEX_MAGIC = b"PCIDX1\0\0"
+POSTCODE_KEY_DTYPE = np.dtype("S7")
+
+
+def normalise_postcodes(postcodes):
+    """Normalise postcodes to index keys (upper case, no spaces).
+    
+    Args:
+        postcodes: Iterable or Series of postcode strings (None allowed)
+        
+    Returns:
+        NumPy array of 7-byte keys; b"" where a value can't be a postcode
+    """
+    keys = pd.Series(postcodes, dtype=object).astype(str).str.upper()
+    keys = keys.str.replace(f'{WHITESPACE}+', '', regex=True)
+    keys = keys.where(keys.str.fullmatch(r'[A-Z0-9]{5,7}'), "")
+    return keys.to_numpy(dtype=POSTCODE_KEY_DTYPE)
+
+
+def build_postcode_index(csv_path, index_path, postcode_column="pcds",
+                         lat_column="lat", lon_column="long", chunksize=500000):
+    """Build a binary postcode index from an ONSPD-style CSV.
+    
+    Postcodes without real coordinates (ONSPD uses 99.999999 for these)
+    are skipped. The CSV is read in chunks, so the full file never has
+    to fit in memory as a DataFrame.
+    
+    Args:
+        csv_path: Path to the postcode CSV (e.g. ONSPD_*.csv)
+        index_path: Path to write the index to
+        postcode_column: Column holding the postcode
+        lat_column: Column holding latitude
+        lon_column: Column holding longitude
+        chunksize: Rows read from the CSV at a time
+        
+    Returns:
+        Number of postcodes in the index
+    """
+    keys, lats, lons = [], [], []
+    
+    for chunk in pd.read_csv(csv_path, usecols=[postcode_column, lat_column, lon_column],
+                             dtype={postcode_column: str}, chunksize=chunksize):
+        valid = chunk[lat_column].between(-90, 90) & chunk[lon_column].between(-180, 180)
+        chunk = chunk[valid]
+        chunk_keys = normalise_postcodes(chunk[postcode_column])
+        has_key = chunk_keys != b""
+        keys.append(chunk_keys[has_key])
+        lats.append(chunk[lat_column].to_numpy(dtype=np.float32)[has_key])
+        lons.append(chunk[lon_column].to_numpy(dtype=np.float32)[has_key])
+    
+    keys = np.concatenate(keys) if keys else np.array([], dtype=POSTCODE_KEY_DTYPE)
+    lats = np.concatenate(lats) if lats else np.array([], dtype=np.float32)
+    lons = np.concatenate(lons) if lons else np.array([], dtype=np.float32)
+    
+    order = np.argsort(keys, kind="stable")
+    keys, lats, lons = keys[order], lats[order], lons[order]
+    
+    # Keep the first row for any postcode listed twice
+    unique = np.ones(len(keys), dtype=bool)
+    unique[1:] = keys[1:] != keys[:-1]
+    keys, lats, lons = keys[unique], lats[unique], lons[unique]
+    
+    with open(index_path, "wb") as f:
+        f.write(POSTCODE_INDEX_MAGIC)
+        f.write(np.uint64(len(keys)).tobytes())
+        f.write(keys.tobytes())
+        f.write(lats.astype("<f4").tobytes())
+        f.write(lons.astype("<f4").tobytes())
+    
+    logger.info("Indexed %d postcodes to %s", len(keys), index_path)
+    return len(keys)
+
+
+class PostcodeIndex:
+    """Offline postcode -> latitude/longitude lookup.
+    
+    The index file built by build_postcode_index is memory-mapped, so
+    opening it is instant and only the pages touched by lookups are read.
+    Lookups are vectorised binary searches (O(log n) per postcode).
+    
+    Example:
+        >>> index = PostcodeIndex("data/postcodes.idx")
+        >>> index.geocode_dataframe(df)  # adds lat and lon columns
+    
+    Args:
+        path: Index file built by build_postcode_index
+    """
+    
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            header = f.read(16)
+        if header[:8] != POSTCODE_INDEX_MAGIC:
+            raise ValueError(f"{path} is not a postcode index")
+        
+        count = int(np.frombuffer(header[8:], dtype="<u8")[0])
+        key_bytes = count * POSTCODE_KEY_DTYPE.itemsize
+        
+        self.path = path
+        self.keys = np.memmap(path, dtype=POSTCODE_KEY_DTYPE, mode="r",
+                              offset=16, shape=(count,))
+        self.lats = np.memmap(path, dtype="<f4", mode="r",
+                              offset=16 + key_bytes, shape=(count,))
+        self.lons = np.memmap(path, dtype="<f4", mode="r",
+                              offset=16 + key_bytes + 4 * count, shape=(count,))
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    def lookup(self, postcodes):
+        """Look up coordinates for many postcodes at once.
+        
+        Args:
+            postcodes: Iterable or Series of postcodes, in any spacing or case
+            
+        Returns:
+            Tuple of (lats, lons) float64 arrays, NaN where not found
+        """
+        queries = normalise_postcodes(postcodes)
+        lats = np.full(len(queries), np.nan)
+        lons = np.full(len(queries), np.nan)
+        if len(self.keys) == 0:
+            return lats, lons
+        
+        positions = np.searchsorted(self.keys, queries)
+        positions = np.minimum(positions, len(self.keys) - 1)
+        found = (self.keys[positions] == queries) & (queries != b"")
+        
+        lats[found] = self.lats[positions[found]]
+        lons[found] = self.lons[positions[found]]
+        return lats, lons
+    
+    def geocode_dataframe(self, df, postcode_column='postcode', inplace=True):
+        """Add lat and lon columns to a DataFrame from its postcodes.
+        
+        Args:
+            df: DataFrame with a postcode column (e.g. from process_address_dataframe)
+            postcode_column: Name of column containing postcodes
+            inplace: Add the columns to df itself (default), or to a copy
+            
+        Returns:
+            DataFrame with additional columns: lat, lon
+        """
+        if postcode_column not in df.columns:
+            logger.warning("Column '%s' not found", postcode_column)
+            return df
+        
+        if not inplace:
+            df = df.copy()
+        
+        df['lat'], df['lon'] = self.lookup(df[postcode_column])
+        
+        logger.info("Geocoded %d/%d postcodes", int(df['lat'].notna().sum()), len(df))
+        return df
@@ -0,0 +1,127 @@
+"""Durable crawl journal for resuming interrupted crawls.
+
+Every unit of work (an application URL, or a council/postcode search) is
+recorded in SQLite as pending, done or failed, together with its result,
+so a crawl that is killed part-way can be restarted and skip finished work.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    data TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+)
+"""
+
+
+class CrawlJournal:
+    """SQLite (WAL mode) record of crawl progress.
+
+    Each row is identified by a kind ("application" for detail URLs,
+    "postcode" for searches, "area" for area searches over the site's
+    result cap) and a key (the URL, or "council|postcode").
+    Results are stored as JSON.
+
+    Args:
+        path: SQLite database file (e.g. "data/output/crawl.db")
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+
+    def add_pending(self, kind, keys):
+        """Record keys as pending, leaving any existing entries untouched."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO journal (kind, key, status, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(kind, key, PENDING, now) for key in keys]
+            )
+
+    def status(self, kind, key):
+        """Return the status of a key, or None if it has never been recorded."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status FROM journal WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get(self, kind, key):
+        """Return the stored result of a done key, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM journal WHERE kind = ? AND key = ? AND status = ?",
+                (kind, key, DONE)
+            ).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def mark_done(self, kind, key, data=None):
+        """Record a key as done with its result."""
+        self._upsert(kind, key, DONE, json.dumps(data), None)
+
+    def mark_failed(self, kind, key, error=None):
+        """Record a failed attempt; failed keys are retried on the next run."""
+        self._upsert(kind, key, FAILED, None, str(error) if error else None)
+
+    def keys(self, kind, status=PENDING):
+        """Return all keys of a kind with the given status, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM journal WHERE kind = ? AND status = ? ORDER BY updated_at",
+                (kind, status)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def counts(self, kind):
+        """Return a dict of status -> number of keys for a kind."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM journal WHERE kind = ? GROUP BY status",
+                (kind,)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _upsert(self, kind, key, status, data, error):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO journal (kind, key, status, attempts, data, error, updated_at) "
+                "VALUES (?, ?, ?, 1, ?, ?, ?) "
+                "ON CONFLICT (kind, key) DO UPDATE SET "
+                "status = excluded.status, attempts = attempts + 1, "
+                "data = excluded.data, error = excluded.error, "
+                "updated_at = excluded.updated_at",
+                (kind, key, status, data, error, time.time())
+            )
@@ -0,0 +1,298 @@
+"""Counters, timers and histograms for profiling crawls.
+
+The scraper records into the shared `metrics` object: fetch latency,
+time spent sleeping or waiting on rate limiters, retries, 429s and
+pages/rows per site. A snapshot can be exported at any time:
+
+    >>> from planning_scraper.metrics import metrics, JsonLinesExporter
+    >>> metrics.export(JsonLinesExporter("data/output/metrics.jsonl"))
+    >>> print(metrics.summary())
+
+Metric names:
+
+    fetch_seconds             histogram  host, outcome (ok, not_modified)
+    rate_limit_wait_seconds   histogram  host; time waiting on a limiter
+    sleep_seconds             histogram  reason (pause, backoff)
+    pages_total               counter    host; pages fetched from the site
+    bytes_total               counter    host; bytes received for those pages
+    cache_hits_total          counter    host; pages served from a PageCache
+    rate_limited_total        counter    host; 429s and rate-limit pages
+    fetch_errors_total        counter    host
+    retries_total             counter    kind (application, comments)
+    searches_total            counter    council
+    search_overflows_total    counter    council; searches over the result cap
+    rows_total                counter    kind (application, comment, address)
+    failures_total            counter    kind (application)
+    refresh_changes_total     counter    applications changed since last seen
+    queue_tasks_total         counter    kind, outcome (done, failed, lost)
+    address_processing_seconds histogram  (process_address_dataframe)
+"""
+
+import json
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+PROMETHEUS_PREFIX = "planning_scraper_"
+
+
+class Histogram:
+    """Count, sum, min, max and bucketed distribution of observed values."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+        else:
+            self.bucket_counts[-1] += 1
+
+    def quantile(self, q):
+        """Estimate a quantile as the upper bound of the bucket it falls in."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.bucket_counts)),
+        }
+
+    def merge(self, data):
+        """Add in a histogram exported with to_dict()."""
+        if not data["count"]:
+            return
+        self.count += data["count"]
+        self.sum += data["sum"]
+        self.min = min(self.min, data["min"])
+        self.max = max(self.max, data["max"])
+        for i, count in enumerate(data["buckets"].values()):
+            self.bucket_counts[i] += count
+
+
+class Metrics:
+    """Thread-safe store of labelled counters and histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear all metrics and restart the run clock."""
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+            self.started_at = time.time()
+            self._start = time.monotonic()
+
+    def inc(self, name, value=1, **labels):
+        """Add value to a counter."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Record one value (e.g. seconds) in a histogram."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram()
+            self._histograms[key].observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Context manager that observes the seconds its block takes."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def elapsed(self):
+        """Seconds since the metrics were created or reset."""
+        return time.monotonic() - self._start
+
+    def snapshot(self):
+        """Return all metrics as a JSON-serialisable dict."""
+        with self._lock:
+            return {
+                "timestamp": time.time(),
+                "started_at": self.started_at,
+                "elapsed": self.elapsed(),
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                "histograms": [
+                    {"name": name, "labels": dict(labels), **histogram.to_dict()}
+                    for (name, labels), histogram in sorted(self._histograms.items())
+                ],
+            }
+
+    def merge(self, snapshot):
+        """Add in a snapshot from elsewhere (e.g. a worker process)."""
+        with self._lock:
+            for counter in snapshot["counters"]:
+                key = (counter["name"], _label_key(counter["labels"]))
+                self._counters[key] = self._counters.get(key, 0) + counter["value"]
+            for data in snapshot["histograms"]:
+                key = (data["name"], _label_key(data["labels"]))
+                if key not in self._histograms:
+                    self._histograms[key] = Histogram()
+                self._histograms[key].merge(data)
+
+    def export(self, *exporters):
+        """Send a snapshot to each exporter."""
+        snapshot = self.snapshot()
+        for exporter in exporters:
+            exporter.export(snapshot)
+
+    def summary(self):
+        """Return a human-readable end-of-run summary."""
+        return format_summary(self.snapshot())
+
+
+class JsonLinesExporter:
+    """Append each snapshot as one JSON line, for time series of a long crawl."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, snapshot):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(snapshot) + "\n")
+
+
+class PrometheusExporter:
+    """Write snapshots in the Prometheus text format.
+
+    Point node_exporter's textfile collector at `path` to scrape a running
+    crawl. The file is replaced atomically on each export.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, snapshot):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(format_prometheus(snapshot))
+        os.replace(tmp_path, self.path)
+
+
+class SummaryExporter:
+    """Write the human-readable summary to a stream (default: stderr)."""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def export(self, snapshot):
+        stream = self.stream or sys.stderr
+        stream.write(format_summary(snapshot) + "\n")
+        stream.flush()
+
+
+def format_prometheus(snapshot):
+    """Render a snapshot in the Prometheus text exposition format."""
+    lines = []
+    typed = set()
+
+    for counter in snapshot["counters"]:
+        name = PROMETHEUS_PREFIX + counter["name"]
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_prometheus_labels(counter['labels'])} {counter['value']}")
+
+    for histogram in snapshot["histograms"]:
+        name = PROMETHEUS_PREFIX + histogram["name"]
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, count in histogram["buckets"].items():
+            cumulative += count
+            labels = _prometheus_labels({**histogram["labels"], "le": bound})
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        labels = _prometheus_labels(histogram["labels"])
+        lines.append(f"{name}_sum{labels} {histogram['sum']}")
+        lines.append(f"{name}_count{labels} {histogram['count']}")
+
+    return "\n".join(lines) + "\n"
+
+
+def format_summary(snapshot):
+    """Render a snapshot as a short plain-text report."""
+    elapsed = snapshot["elapsed"]
+    lines = [f"Run time: {elapsed:.1f}s"]
+
+    for counter in snapshot["counters"]:
+        line = f"  {counter['name']}{_summary_labels(counter['labels'])}: {counter['value']:g}"
+        if counter["name"] == "rows_total" and elapsed > 0:
+            line += f" ({counter['value'] / elapsed:.2f}/s)"
+        lines.append(line)
+
+    for data in snapshot["histograms"]:
+        histogram = Histogram()
+        histogram.merge(data)
+        lines.append(
+            f"  {data['name']}{_summary_labels(data['labels'])}: "
+            f"n={data['count']} total={data['sum']:.2f} "
+            f"mean={data['sum'] / data['count']:.3f} "
+            f"p95<={histogram.quantile(0.95):.3f} max={data['max']:.3f}"
+        )
+
+    return "\n".join(lines)
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _summary_labels(labels):
+    if not labels:
+        return ""
+    return "[" + ", ".join(f"{key}={value}" for key, value in labels.items()) + "]"
+
+
+# Shared metrics for the package
+metrics = Metrics()
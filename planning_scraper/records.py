@@ -0,0 +1,180 @@
+"""Typed application records and compact DataFrames.
+
+Scrapers return applications as rows of strings, with np.nan for missing
+fields. Application holds one row in a slotted object, and
+applications_frame() turns many rows into a DataFrame with parsed dates
+and categorical columns for the enum-like fields:
+
+    >>> data = scrape_app_details(urls, engine="http")
+    >>> df = applications_frame(data)
+    >>> df[df["decision"] == "Refused"]
+"""
+
+from dataclasses import dataclass, fields
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+APPLICATION_COLUMNS = [
+    "reference",
+    "url",
+    "date_validated",
+    "address",
+    "description",
+    "decision",
+    "decision_date",
+    "app_type",
+    "actual_decision_level",
+    "expected_decision_level",
+]
+
+DATE_COLUMNS = ["date_validated", "decision_date"]
+
+# Columns with a small set of repeated values
+CATEGORICAL_COLUMNS = [
+    "decision",
+    "app_type",
+    "actual_decision_level",
+    "expected_decision_level",
+]
+
+# Idox shows dates like "Mon 02 Jan 2023"
+IDOX_DATE_FORMAT = "%a %d %b %Y"
+DATE_FORMATS = [IDOX_DATE_FORMAT, "%d %b %Y", "%d/%m/%Y"]
+
+
+@dataclass
+class Application:
+    """One scraped planning application.
+
+    Uses __slots__, so a record takes a fraction of the memory of the
+    equivalent dict. Missing fields are None.
+    """
+    __slots__ = tuple(APPLICATION_COLUMNS) + ("extra",)
+
+    reference: Optional[str]
+    url: Optional[str]
+    date_validated: Optional[str]
+    address: Optional[str]
+    description: Optional[str]
+    decision: Optional[str]
+    decision_date: Optional[str]
+    app_type: Optional[str]
+    actual_decision_level: Optional[str]
+    expected_decision_level: Optional[str]
+    extra: Optional[dict]
+
+    @classmethod
+    def from_dict(cls, row):
+        """Build a record from a scraper row, with NaN and empty values as None."""
+        return cls(**{
+            field.name: _none_if_missing(row.get(field.name)) for field in fields(cls)
+        })
+
+    def to_dict(self):
+        """Return the record as a dict, leaving out extra if it is None."""
+        row = {column: getattr(self, column) for column in APPLICATION_COLUMNS}
+        if self.extra is not None:
+            row["extra"] = self.extra
+        return row
+
+
+def _none_if_missing(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if isinstance(value, str) and not value.strip():
+        return None
+    return value
+
+
+def parse_dates(values):
+    """Parse scraped date strings into datetime64 in vectorised passes.
+
+    Only the distinct strings are parsed (a column of many applications
+    repeats the same few thousand dates), trying each format in
+    DATE_FORMATS on the values still unparsed.
+
+    Args:
+        values: Series or list of date strings (missing values allowed)
+
+    Returns:
+        datetime64 Series, NaT where a value is missing or unparseable
+    """
+    values = pd.Series(values, dtype=object)
+    codes, uniques = pd.factorize(values)
+
+    parsed = pd.Series(pd.NaT, index=range(len(uniques)), dtype="datetime64[ns]")
+    uniques = pd.Series(uniques, dtype=object).str.strip()
+    remaining = pd.Series(True, index=parsed.index)
+    for date_format in DATE_FORMATS:
+        if not remaining.any():
+            break
+        parsed[remaining] = pd.to_datetime(uniques[remaining], format=date_format, errors="coerce")
+        remaining &= parsed.isna()
+
+    # Missing values have code -1, which picks the NaT appended at the end
+    result = np.append(parsed.to_numpy(), np.datetime64("NaT", "ns"))[codes]
+    return pd.Series(result, index=values.index)
+
+
+def optimise_application_dtypes(df, inplace=False):
+    """Parse date columns and make the enum-like columns categorical.
+
+    Args:
+        df: DataFrame of applications (e.g. from iter_app_batches)
+        inplace: Modify df rather than returning a converted copy
+
+    Returns:
+        DataFrame with datetime64 DATE_COLUMNS and categorical
+        CATEGORICAL_COLUMNS (columns that are absent are skipped)
+    """
+    if not inplace:
+        df = df.copy()
+
+    for column in DATE_COLUMNS:
+        if column in df.columns:
+            df[column] = parse_dates(df[column]).to_numpy()
+
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            values = df[column].astype(object)
+            df[column] = values.where(values.notna() & (values != ""), None).astype("category")
+
+    return df
+
+
+def applications_frame(records):
+    """Build a typed DataFrame of applications.
+
+    Args:
+        records: Any of: the dict of lists returned by scrape_app_details,
+            an iterable of row dicts (iter_app_details) or Application
+            records, or a DataFrame
+
+    Returns:
+        DataFrame with APPLICATION_COLUMNS (plus "extra" if any record
+        has it), converted with optimise_application_dtypes
+    """
+    if isinstance(records, pd.DataFrame):
+        df = records.copy()
+    elif isinstance(records, dict):
+        df = pd.DataFrame(records)
+    else:
+        records = [
+            record.to_dict() if isinstance(record, Application) else record
+            for record in records
+        ]
+        df = pd.DataFrame.from_records(records, columns=_columns(records))
+
+    return optimise_application_dtypes(df, inplace=True)
+
+
+def _columns(rows):
+    """APPLICATION_COLUMNS, plus extra if any row has it."""
+    if any(row.get("extra") is not None for row in rows):
+        return APPLICATION_COLUMNS + ["extra"]
+    return APPLICATION_COLUMNS
@@ -0,0 +1,288 @@
+"""Priority-based re-scraping of applications within a request budget.
+
+Re-running scrape_app_details over a whole URL list spends most requests
+on applications that were decided long ago and will never change.
+RefreshScheduler keeps the last-seen state of each application in SQLite
+and works out which ones are worth fetching again:
+
+    1. URLs never scraped
+    2. undecided applications that are due, closest to their expected
+       decision date first (validated date + the statutory 8 or 13 weeks)
+    3. decided applications, only if decided_interval is set
+
+Each nightly run takes as many of these as the request budget allows:
+
+    >>> scheduler = RefreshScheduler("data/output/refresh.db")
+    >>> scheduler.add(urls)
+    >>> for row in scheduler.run(budget=2000, engine="http"):
+    ...     ...
+"""
+
+import heapq
+import json
+import math
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from .metrics import metrics
+from .records import DATE_FORMATS, Application
+
+
+DAY = 24 * 60 * 60
+
+# Statutory determination periods
+DETERMINATION_WEEKS = 8
+MAJOR_DETERMINATION_WEEKS = 13
+
+# Requests to scrape one application (summary and further info pages)
+REQUESTS_PER_APPLICATION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS applications (
+    url TEXT PRIMARY KEY,
+    reference TEXT,
+    decided INTEGER NOT NULL DEFAULT 0,
+    expected_decision REAL,
+    added_at REAL NOT NULL,
+    last_scraped REAL,
+    next_due REAL,
+    changed_at REAL,
+    scrapes INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    state TEXT
+)
+"""
+
+
+class RefreshScheduler:
+    """SQLite (WAL mode) store of application state that plans re-scrapes.
+
+    Undecided applications are due again after near_interval days while
+    within window_days of their expected decision date, overdue_interval
+    days once past it, and early_interval days before it. Failed scrapes
+    are retried after retry_interval days.
+
+    Args:
+        path: SQLite database file (e.g. "data/output/refresh.db")
+        decided_interval: Days before a decided application is checked
+            again, or None to never re-scrape decided applications
+        near_interval: Days between checks near the expected decision
+        early_interval: Days between checks well before it
+        overdue_interval: Days between checks once it has passed
+        window_days: Days either side of the expected decision date that
+            count as near it
+        retry_interval: Days before a failed scrape is retried
+    """
+
+    def __init__(self, path, decided_interval=None, near_interval=1, early_interval=7,
+                 overdue_interval=3, window_days=14, retry_interval=1):
+        self.path = path
+        self.decided_interval = decided_interval
+        self.near_interval = near_interval
+        self.early_interval = early_interval
+        self.overdue_interval = overdue_interval
+        self.window_days = window_days
+        self.retry_interval = retry_interval
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+
+    def add(self, urls, now=None):
+        """Track new application URLs; they are due immediately.
+
+        URLs already tracked are left untouched.
+        """
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO applications (url, added_at, next_due) VALUES (?, ?, ?)",
+                [(url, now, now) for url in urls]
+            )
+
+    def record(self, row, now=None):
+        """Store the result of scraping one application and schedule its next check.
+
+        Args:
+            row: Dict keyed by APPLICATION_COLUMNS, as yielded by
+                iter_app_details; a row without a reference counts as a
+                failed scrape
+            now: Scrape time (default: now)
+
+        Returns:
+            True if the application changed since it was last seen
+        """
+        now = time.time() if now is None else now
+        record = Application.from_dict(row)
+        url = record.url
+
+        with self._lock:
+            existing = self._conn.execute(
+                "SELECT state FROM applications WHERE url = ?", (url,)
+            ).fetchone()
+
+        if record.reference is None:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT INTO applications (url, added_at, next_due, failures) "
+                    "VALUES (?, ?, ?, 1) ON CONFLICT(url) DO UPDATE SET "
+                    "next_due = excluded.next_due, failures = failures + 1",
+                    (url, now, now + self.retry_interval * DAY)
+                )
+            return False
+
+        state = record.to_dict()
+        state.pop("extra", None)
+        previous = json.loads(existing[0]) if existing and existing[0] else None
+        changed = previous is not None and previous != state
+        if changed:
+            metrics.inc("refresh_changes_total")
+
+        decided = record.decision is not None or record.decision_date is not None
+        expected = expected_decision_date(record)
+        next_due = self._next_due(decided, expected, now)
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO applications (url, reference, decided, expected_decision, added_at, "
+                "last_scraped, next_due, changed_at, scrapes, state) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?) ON CONFLICT(url) DO UPDATE SET "
+                "reference = excluded.reference, decided = excluded.decided, "
+                "expected_decision = excluded.expected_decision, "
+                "last_scraped = excluded.last_scraped, next_due = excluded.next_due, "
+                "changed_at = COALESCE(excluded.changed_at, changed_at), "
+                "scrapes = scrapes + 1, failures = 0, state = excluded.state",
+                (url, record.reference, int(decided), expected, now, now, next_due,
+                 now if changed or previous is None else None, json.dumps(state))
+            )
+        return changed
+
+    def next_batch(self, budget, requests_per_app=REQUESTS_PER_APPLICATION, now=None):
+        """Pick the URLs to scrape within a request budget, most urgent first.
+
+        Args:
+            budget: Number of requests available for this run
+            requests_per_app: Requests one application scrape costs
+            now: Planning time (default: now)
+
+        Returns:
+            List of up to budget // requests_per_app URLs
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, decided, expected_decision, added_at, last_scraped "
+                "FROM applications WHERE next_due IS NOT NULL AND next_due <= ?", (now,)
+            ).fetchall()
+
+        queue = [(self._priority(row, now), row[0]) for row in rows]
+        return [url for _, url in heapq.nsmallest(budget // requests_per_app, queue)]
+
+    def run(self, budget, requests_per_app=REQUESTS_PER_APPLICATION, **kwargs):
+        """Scrape the next batch and record every result.
+
+        Args:
+            budget: Number of requests available for this run
+            requests_per_app: Requests one application scrape costs
+            **kwargs: Passed on to iter_app_details (engine, limiter, ...)
+
+        Yields:
+            Each scraped row, as iter_app_details does
+        """
+        from .scraper import iter_app_details
+
+        urls = self.next_batch(budget, requests_per_app)
+        for row in iter_app_details(urls, **kwargs):
+            self.record(row)
+            yield row
+
+    def state(self, url):
+        """Return the last-seen row of an application, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM applications WHERE url = ?", (url,)
+            ).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def counts(self, now=None):
+        """Return the number of tracked, undecided, decided and due applications."""
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*), SUM(decided = 0), SUM(decided = 1), "
+                "SUM(next_due IS NOT NULL AND next_due <= ?) FROM applications", (now,)
+            ).fetchone()
+        return dict(zip(("tracked", "undecided", "decided", "due"), (value or 0 for value in row)))
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _next_due(self, decided, expected, now):
+        """Return when an application should next be scraped (None = never)."""
+        if decided:
+            if self.decided_interval is None:
+                return None
+            return now + self.decided_interval * DAY
+        if expected is None:
+            return now + self.early_interval * DAY
+
+        days_to_decision = (expected - now) / DAY
+        if days_to_decision > self.window_days:
+            # Check early, but don't sleep through the start of the window
+            window_start = expected - self.window_days * DAY
+            return max(now + self.near_interval * DAY,
+                       min(now + self.early_interval * DAY, window_start))
+        if days_to_decision >= -self.window_days:
+            return now + self.near_interval * DAY
+        return now + self.overdue_interval * DAY
+
+    def _priority(self, row, now):
+        """Sort key for a due application; smaller is more urgent."""
+        _, decided, expected, added_at, last_scraped = row
+        if last_scraped is None:
+            return (0, added_at)
+        if decided:
+            return (2, last_scraped)
+        distance = abs(expected - now) / DAY if expected is not None else math.inf
+        return (1, distance, last_scraped)
+
+
+def expected_decision_date(record):
+    """Estimate when an undecided application is due a decision.
+
+    Args:
+        record: Application (or anything with date_validated and app_type)
+
+    Returns:
+        Timestamp in seconds, or None if the validated date can't be read
+    """
+    validated = parse_date(record.date_validated)
+    if validated is None:
+        return None
+    weeks = DETERMINATION_WEEKS
+    if record.app_type and "major" in record.app_type.lower():
+        weeks = MAJOR_DETERMINATION_WEEKS
+    return validated.timestamp() + weeks * 7 * DAY
+
+
+def parse_date(value):
+    """Parse one scraped date string with DATE_FORMATS; None if it can't be."""
+    if not isinstance(value, str):
+        return None
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), date_format)
+        except ValueError:
+            continue
+    return None
@@ -0,0 +1,189 @@
+"""Registry of supported councils and their per-site settings.
+
+The council CSV is parsed once per file and kept in memory, so looking up
+a council is a dict access. The file is re-read automatically when it
+changes on disk.
+
+Besides the required council and url columns, the CSV may have:
+
+    page_size         Results per page to request from searches (default:
+                      the largest the results page offers)
+    page_size_param   Form field for page_size (default: searchCriteria.resultsPerPage)
+    rate              Requests per second allowed for this council's site
+    selector_<name>   XPath override for one of DEFAULT_SELECTORS
+"""
+
+import csv
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .fetcher import (
+    SEARCH_INPUT_XPATH, SUMMARY_LINK_XPATH, NEXT_LINK_XPATH, RESULTS_COUNT_XPATH,
+    RESULT_ADDRESS_XPATH
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Environment variable that points the default registry at another file
+REGISTRY_ENV_VAR = "PLANNING_SCRAPER_COUNCILS"
+
+DEFAULT_PAGE_SIZE_PARAM = "searchCriteria.resultsPerPage"
+
+# XPath selectors for the Idox pages; they work for both engines
+DEFAULT_SELECTORS = {
+    "search_input": SEARCH_INPUT_XPATH,
+    "result_link": SUMMARY_LINK_XPATH,
+    "next_link": NEXT_LINK_XPATH,
+    "results_count": RESULTS_COUNT_XPATH,
+    "result_address": RESULT_ADDRESS_XPATH,
+}
+
+
+@dataclass
+class Council:
+    """Settings for one council's planning site."""
+    name: str
+    url: str
+    selectors: dict = field(default_factory=lambda: dict(DEFAULT_SELECTORS))
+    page_size: Optional[int] = None
+    page_size_param: str = DEFAULT_PAGE_SIZE_PARAM
+    rate: Optional[float] = None
+
+    def selector(self, name):
+        """Return the XPath for a page element (see DEFAULT_SELECTORS)."""
+        return self.selectors[name]
+
+
+class CouncilRegistry:
+    """In-memory council lookup backed by a CSV file.
+
+    Args:
+        path: Council CSV file
+        check_interval: Seconds between checks of the file for changes
+    """
+
+    def __init__(self, path, check_interval=2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._councils = {}
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def get(self, council):
+        """Return the Council for a name (case-insensitive).
+
+        Raises:
+            KeyError: If the council is not in the registry
+        """
+        self._maybe_reload()
+        key = council.lower().strip()
+        try:
+            return self._councils[key]
+        except KeyError:
+            raise KeyError(f"Unknown council '{council}' (not in {self.path})") from None
+
+    def __contains__(self, council):
+        self._maybe_reload()
+        return council.lower().strip() in self._councils
+
+    def names(self):
+        """Return the names of all registered councils."""
+        self._maybe_reload()
+        return list(self._councils)
+
+    def rates(self):
+        """Return a dict of council URL -> requests per second, for HostRateLimiter."""
+        self._maybe_reload()
+        return {c.url: c.rate for c in self._councils.values() if c.rate is not None}
+
+    def reload(self):
+        """Re-read the CSV file."""
+        with self._lock:
+            signature = self._file_signature()
+            with open(self.path, newline="") as f:
+                councils = [_parse_row(row) for row in csv.DictReader(f)]
+            self._councils = {c.name: c for c in councils}
+            self._signature = signature
+            self._checked_at = time.monotonic()
+
+    def _maybe_reload(self):
+        """Reload if the file has changed, checking at most every check_interval."""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        if self._file_signature() != self._signature:
+            logger.info("Council registry %s changed; reloading", self.path)
+            self.reload()
+
+    def _file_signature(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def default_registry_path():
+    """Return the council CSV used when no path is given.
+
+    This is $PLANNING_SCRAPER_COUNCILS if set, otherwise the project's
+    data/input/example_urls.csv (independent of the working directory).
+    """
+    return os.environ.get(REGISTRY_ENV_VAR) or os.path.join(
+        PROJECT_ROOT, "data", "input", "example_urls.csv"
+    )
+
+
+def get_registry(path=None):
+    """Return the shared CouncilRegistry for a CSV file, loading it on first use.
+
+    Args:
+        path: Council CSV file (default: default_registry_path())
+    """
+    path = os.path.abspath(path or default_registry_path())
+    with _registries_lock:
+        if path not in _registries:
+            _registries[path] = CouncilRegistry(path)
+        return _registries[path]
+
+
+def get_council(council, urls_csv=None):
+    """Return the Council settings for a council name.
+
+    Args:
+        council: Council name (e.g., "newham")
+        urls_csv: Council CSV file (default: default_registry_path())
+    """
+    return get_registry(urls_csv).get(council)
+
+
+def _parse_row(row):
+    """Build a Council from one CSV row, ignoring blank optional cells."""
+    row = {key.strip(): (value or "").strip() for key, value in row.items() if key}
+
+    selectors = dict(DEFAULT_SELECTORS)
+    selectors.update({
+        key[len("selector_"):]: value
+        for key, value in row.items() if key.startswith("selector_") and value
+    })
+
+    return Council(
+        name=row["council"].lower(),
+        url=row["url"],
+        selectors=selectors,
+        page_size=int(row["page_size"]) if row.get("page_size") else None,
+        page_size_param=row.get("page_size_param") or DEFAULT_PAGE_SIZE_PARAM,
+        rate=float(row["rate"]) if row.get("rate") else None,
+    )
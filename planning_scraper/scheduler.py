@@ -0,0 +1,424 @@
+"""Concurrent multi-council crawling with per-host politeness.
+
+Each council site gets its own token bucket, so councils are crawled in
+parallel while every individual site still sees a fixed request rate.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+
+logger = logging.getLogger(__name__)
+
+
+# One request every 3 seconds roughly matches the old inline random_sleep pauses
+DEFAULT_RATE = 1 / 3
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    Args:
+        rate: Tokens added per second (requests per second)
+        burst: Maximum tokens held, i.e. largest allowed burst of requests
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """Take tokens and return how long the caller must wait before using them.
+
+        Tokens may go negative, so concurrent callers queue up behind each
+        other instead of all waking at once.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            delay = max(0.0, -self._tokens / self.rate)
+            return max(delay, self._blocked_until - now)
+
+    def set_rate(self, rate):
+        """Change the refill rate, keeping the tokens accrued so far."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.rate = rate
+
+    def block(self, seconds):
+        """Hold back all requests for the next `seconds` seconds."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def acquire(self, tokens=1):
+        """Block until tokens are available.
+
+        Returns:
+            Seconds spent waiting
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class HostRateLimiter:
+    """Per-host request budget, one TokenBucket per site.
+
+    Args:
+        rate: Default requests per second for each host
+        burst: Default burst size for each host
+        rates: Optional dict of host (or URL) -> requests per second overrides
+        cooldown: Pause in seconds after a rate limit without Retry-After
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=1, rates=None, cooldown=60):
+        self.rate = rate
+        self.burst = burst
+        self.cooldown = cooldown
+        self.rates = {host_key(h): r for h, r in (rates or {}).items()}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url):
+        """Return the TokenBucket for a URL's host, creating it if needed."""
+        host = host_key(url)
+        with self._lock:
+            if host not in self._buckets:
+                rate = self.rates.get(host, self.rate)
+                self._buckets[host] = TokenBucket(rate, self.burst)
+            return self._buckets[host]
+
+    def acquire(self, url):
+        """Block until a request to url's host is allowed.
+
+        Returns:
+            Seconds spent waiting
+        """
+        return self.bucket(url).acquire()
+
+    def record(self, url, latency=None, rate_limited=False, retry_after=None,
+               error=False):
+        """Report the outcome of a request.
+
+        A fixed-rate limiter only reacts to rate limits, by pausing the host
+        for Retry-After seconds (or `cooldown` if the server gives none).
+        """
+        if rate_limited:
+            wait = retry_after if retry_after is not None else self.cooldown
+            logger.warning("Rate limited by %s; pausing %.0fs", host_key(url), wait)
+            self.bucket(url).block(wait)
+
+    def save(self):
+        """Persist learned state. Fixed-rate limiters have none."""
+
+    def close(self):
+        """Save learned state and release any resources."""
+        self.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AdaptiveRateLimiter(HostRateLimiter):
+    """Per-host limiter that tunes each site's rate with AIMD.
+
+    Every healthy response adds `increase` requests/second to the host's
+    rate. A 429, a rate-limit page, a server/network error or a response
+    much slower than the host's usual latency multiplies the rate by
+    `decrease`. Rate limits also pause the host for Retry-After seconds
+    (or `cooldown` if the server gives none).
+
+    Learned rates are loaded from and saved to `state_path` (JSON), so a
+    new run starts at the rate the last run settled on for each council.
+    They are saved on every rate limit, at most `save_interval` seconds
+    apart while requests are recorded, and on close() (or leaving a
+    `with` block).
+
+    Args:
+        rate: Starting requests per second for hosts with no saved state
+        burst: Burst size for each host
+        rates: Optional dict of host (or URL) -> starting rate overrides
+        min_rate: Lowest rate backoff will go to
+        max_rate: Highest rate increases will go to
+        increase: Additive increase per healthy response (requests/second)
+        decrease: Multiplicative decrease factor on congestion signals
+        latency_factor: Latency above this multiple of the host's moving
+            average counts as congestion
+        cooldown: Pause in seconds after a rate limit without Retry-After
+        state_path: Optional JSON file for learned per-host rates
+        save_interval: Seconds between saves of learned rates
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=1, rates=None, min_rate=1 / 60,
+                 max_rate=2.0, increase=0.01, decrease=0.5, latency_factor=3.0,
+                 cooldown=60, state_path=None, save_interval=60):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.state_path = state_path
+        self.save_interval = save_interval
+        self._latency = {}
+        self._saved_at = time.monotonic()
+
+        saved = self._load_state()
+        saved.update(rates or {})
+        super().__init__(rate, burst, saved, cooldown)
+
+    def record(self, url, latency=None, rate_limited=False, retry_after=None,
+               error=False):
+        """Adjust a host's rate from the outcome of one request.
+
+        Args:
+            url: URL that was requested
+            latency: Response time in seconds, if the request completed
+            rate_limited: True on HTTP 429 or a rate-limit page
+            retry_after: Seconds from a Retry-After header, if any
+            error: True on a network error or 5xx response
+        """
+        host = host_key(url)
+        bucket = self.bucket(url)
+
+        congested = rate_limited or error
+        if latency is not None and not congested:
+            average = self._latency.get(host)
+            if average is not None and latency > self.latency_factor * average:
+                congested = True
+            # Exponential moving average of healthy response times
+            self._latency[host] = latency if average is None else 0.8 * average + 0.2 * latency
+
+        if congested:
+            new_rate = max(self.min_rate, bucket.rate * self.decrease)
+        else:
+            new_rate = min(self.max_rate, bucket.rate + self.increase)
+        bucket.set_rate(new_rate)
+
+        with self._lock:
+            self.rates[host] = new_rate
+
+        if rate_limited:
+            super().record(url, rate_limited=True, retry_after=retry_after)
+            logger.info("Rate for %s lowered to %.3f req/s", host, new_rate)
+            self.save()
+        elif time.monotonic() - self._saved_at >= self.save_interval:
+            self.save()
+
+    def save(self):
+        """Write learned per-host rates to state_path (if set)."""
+        if not self.state_path:
+            return
+
+        tmp_path = f"{self.state_path}.tmp"
+        with self._lock:
+            with open(tmp_path, "w") as f:
+                json.dump(self.rates, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.state_path)
+            self._saved_at = time.monotonic()
+
+    def _load_state(self):
+        """Read saved per-host rates from state_path."""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path) as f:
+                return {host: float(rate) for host, rate in json.load(f).items()}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning("Ignoring unreadable rate state %s: %s", self.state_path, e)
+            return {}
+
+
+class SqliteRateLimiter(HostRateLimiter):
+    """Per-host request budget shared by every process that opens the same file.
+    
+    A HostRateLimiter only paces the process it lives in. This one keeps
+    each host's schedule in SQLite (GCRA: the time the next request is
+    due), so workers in different processes, or on hosts sharing the
+    database, together stay within each council's rate. Schedules use the
+    wall clock, so hosts sharing it need synchronised clocks.
+    
+    Per-host rates are stored in the database too, so they only need to
+    be given to one process: workers that open the file without rates
+    use the stored ones, and the latest rates given for a host win. Hosts
+    with no stored rate use this process's `rate`.
+    
+    Args:
+        path: SQLite database file (can be the SqliteWorkQueue database)
+        rate: Default requests per second for each host
+        burst: Requests allowed back to back after an idle spell
+        rates: Optional dict of host (or URL) -> requests per second
+            overrides, stored for every process sharing the file
+        cooldown: Pause in seconds after a rate limit without Retry-After
+    """
+    
+    def __init__(self, path, rate=DEFAULT_RATE, burst=1, rates=None, cooldown=60):
+        super().__init__(rate, burst, rates, cooldown)
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits "
+            "(host TEXT PRIMARY KEY, next_at REAL NOT NULL, interval REAL)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(rate_limits)")]
+        if "interval" not in columns:
+            # Databases from before rates were shared
+            self._conn.execute("ALTER TABLE rate_limits ADD COLUMN interval REAL")
+        for host, host_rate in self.rates.items():
+            self.set_rate(host, host_rate)
+    
+    def set_rate(self, url, rate):
+        """Store the requests per second for url's host, for every process sharing the file."""
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        host = host_key(url)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO rate_limits (host, next_at, interval) VALUES (?, 0, ?) "
+                "ON CONFLICT(host) DO UPDATE SET interval = excluded.interval",
+                (host, 1 / rate)
+            )
+            self.rates[host] = rate
+    
+    def reserve(self, url, blocked_for=0.0):
+        """Book the next request slot for url's host and return the wait before it."""
+        host = host_key(url)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT next_at, interval FROM rate_limits WHERE host = ?", (host,)
+                ).fetchone()
+                if row is not None and row[1] is not None:
+                    interval = row[1]
+                else:
+                    interval = 1 / self.rates.get(host, self.rate)
+                now = time.time()
+                due = max(row[0] if row else now, now)
+                if blocked_for:
+                    due = max(due, now + blocked_for)
+                    next_at = due
+                else:
+                    next_at = due + interval
+                self._conn.execute(
+                    "INSERT INTO rate_limits (host, next_at) VALUES (?, ?) "
+                    "ON CONFLICT(host) DO UPDATE SET next_at = excluded.next_at",
+                    (host, next_at)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return max(0.0, due - (self.burst - 1) * interval - now)
+    
+    def acquire(self, url):
+        """Block until a request to url's host is allowed.
+        
+        Returns:
+            Seconds spent waiting
+        """
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+    
+    def record(self, url, latency=None, rate_limited=False, retry_after=None,
+               error=False):
+        """Report the outcome of a request; rate limits pause the host for everyone."""
+        if rate_limited:
+            wait = retry_after if retry_after is not None else self.cooldown
+            logger.warning("Rate limited by %s; pausing %.0fs", host_key(url), wait)
+            self.reserve(url, blocked_for=wait)
+    
+    def close(self):
+        super().close()
+        self._conn.close()
+
+
+def host_key(url):
+    """Return the lowercase host of a URL (or the string itself if it has no scheme)."""
+    netloc = urlparse(url).netloc
+    return (netloc or url).lower()
+
+
+def crawl_councils(jobs, engine="http", os_type="mac", limiter=None,
+                   max_workers=None, urls_csv=None,
+                   max_retries=3, cache=None, journal=None):
+    """Search postcodes and scrape application details for several councils at once.
+
+    Each council runs in its own worker with its own client. Workers share
+    a HostRateLimiter, so different councils proceed in parallel while each
+    site is held to its own request rate.
+
+    Args:
+        jobs: Dict of council name -> list of postcodes
+        engine: "selenium" or "http"
+        os_type: "mac" or "linux"
+        limiter: HostRateLimiter or AdaptiveRateLimiter to share (if None, a
+            HostRateLimiter using the registry's per-council rates is created)
+        max_workers: Number of councils crawled at once (default: all)
+        urls_csv: Council registry CSV (default: the project's
+            data/input/example_urls.csv)
+        max_retries: Maximum retry attempts per application URL
+        cache: Optional PageCache shared by all councils
+        journal: Optional CrawlJournal so an interrupted crawl can resume
+
+    Returns:
+        Dict of council name -> scrape_app_details data dict
+    """
+    from .scraper import open_client, get_postcode_page, scrape_app_details
+    from .registry import get_registry
+
+    if limiter is None:
+        limiter = HostRateLimiter(rates=get_registry(urls_csv).rates())
+
+    def crawl_council(council, postcodes):
+        client = open_client(engine, os_type)
+        try:
+            urls = []
+            seen = set()
+            for postcode in postcodes:
+                for url in get_postcode_page(council, postcode, urls_csv=urls_csv,
+                                             driver=client, limiter=limiter,
+                                             journal=journal):
+                    if url not in seen:
+                        seen.add(url)
+                        urls.append(url)
+
+            logger.info("%s: found %d applications", council, len(urls))
+            return scrape_app_details(urls, max_retries=max_retries,
+                                      driver=client, limiter=limiter, cache=cache,
+                                      journal=journal)
+        finally:
+            client.quit()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers or max(1, len(jobs))) as executor:
+            futures = {
+                council: executor.submit(crawl_council, council, postcodes)
+                for council, postcodes in jobs.items()
+            }
+            return {council: future.result() for council, future in futures.items()}
+    finally:
+        limiter.save()
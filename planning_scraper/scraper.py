@@ -1,290 +1,1293 @@
+import hashlib
+import logging
 import time
 import random
 import re
+from urllib.parse import urlparse, parse_qs
 import pandas as pd
 import numpy as np
 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import WebDriverException, TimeoutException
+from selenium.common.exceptions import (
+    WebDriverException, TimeoutException, NoSuchElementException
+)
 
-from .driver import setup_driver, get_wait, random_sleep
-from .utils import get_council_url, check_rate_limit, is_missing, get_table_value
+from .driver import setup_driver, get_wait, random_sleep, page_bytes
+from .fetcher import (
+    HttpFetcher, FetchError, RateLimitError, TooManyResultsError, IncompleteSearchError,
+    parse_page, parse_html, search_form, form_url, summary_links, summary_results, next_page_url, parse_comments,
+    parse_results_count, results_count, page_size_options, COMMENTS_LIST_XPATH
+)
+from .utils import (
+    MESSAGE_XPATH, RATE_LIMIT_PHRASES, check_rate_limit, check_too_many_results, is_missing,
+    get_table_values, normalise_label
+)
+from .registry import get_council
+from .address import (
+    extract_postcode, normalise_postcode_area, postcode_area_level, parent_postcode_area
+)
+from .metrics import metrics
+from .records import APPLICATION_COLUMNS, applications_frame
+from .scheduler import host_key
 
 
-def get_postcode_page(council, postcode, os_type="mac"):
+logger = logging.getLogger(__name__)
+
+
+# Page engines accepted by open_client (and every function's engine argument)
+ENGINES = ("selenium", "http")
+
+# Journal value for areas the site refused to list ("area" kind)
+TOO_MANY_RESULTS = "too_many_results"
+
+# Reads a whole results page in one WebDriver call. Arguments: result link
+# XPath, results counter XPath, page size select name, page message XPath,
+# result address XPath (relative to the link), rate-limit phrases.
+HARVEST_RESULTS_SCRIPT = """
+var links = document.evaluate(arguments[0], document, null,
+                              XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var hrefs = [];
+var addresses = [];
+for (var i = 0; i < links.snapshotLength; i++) {
+    var link = links.snapshotItem(i);
+    var address = document.evaluate(arguments[4], link, null,
+                                    XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    hrefs.push(link.href);
+    addresses.push(address ? address.textContent.replace(/\\s+/g, " ").trim() : null);
+}
+var counter = document.evaluate(arguments[1], document, null,
+                                XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+var select = document.querySelector("select[name='" + arguments[2] + "']");
+var sizes = [];
+if (select) {
+    for (var j = 0; j < select.options.length; j++) {
+        sizes.push(select.options[j].value);
+    }
+}
+var messages = document.evaluate(arguments[3], document, null,
+                                 XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var text = "";
+for (var k = 0; k < messages.snapshotLength; k++) {
+    text += " " + messages.snapshotItem(k).textContent.toLowerCase();
+}
+text = text.replace(/\\s+/g, " ");
+var rateLimited = false;
+for (var p = 0; p < arguments[5].length; p++) {
+    rateLimited = rateLimited || text.indexOf(arguments[5][p]) >= 0;
+}
+return {
+    links: hrefs,
+    addresses: addresses,
+    count: counter ? counter.textContent : null,
+    page_sizes: sizes,
+    page_size: select ? select.value : null,
+    too_many: text.indexOf("too many results") >= 0,
+    rate_limited: rateLimited
+};
+"""
+
+# Selects a results page size and submits its form
+SET_PAGE_SIZE_SCRIPT = """
+var select = document.querySelector("select[name='" + arguments[0] + "']");
+select.value = arguments[1];
+select.form.submit();
+"""
+
+# Output column -> Idox table label, for the summary and further info pages
+SUMMARY_FIELDS = {
+    "reference": "Reference",
+    "date_validated": "Application Validated",
+    "address": "Address",
+    "description": "Proposal",
+    "decision": "Decision",
+    "decision_date": "Decision Issued Date",
+}
+DETAILS_FIELDS = {
+    "app_type": "Application Type",
+    "actual_decision_level": "Actual Decision Level",
+    "expected_decision_level": "Expected Decision Level",
+}
+
+# Label/value rows read by get_table_values; the selenium engine waits for
+# these rather than the whole page load
+TABLE_ROW_XPATH = "//th[following-sibling::td]"
+
+
+def open_client(engine="selenium", os_type="mac"):
+    """Create a page client for the chosen engine.
+    
+    Args:
+        engine: "selenium" (Chrome WebDriver) or "http" (HttpFetcher)
+        os_type: "mac" or "linux", used by the selenium engine
+        
+    Returns:
+        WebDriver or HttpFetcher instance; both are closed with quit()
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unsupported engine: {engine} (expected one of {', '.join(ENGINES)})")
+    if engine == "http":
+        return HttpFetcher()
+    return setup_driver(os_type)
+
+
+def load_page(client, url, limiter=None, cache=None, wait_for=None, refresh=False,
+              form=None, fields=None):
+    """Load a URL and return a page that get_table_value can read.
+    
+    Every page loaded is checked for rate-limit messages, which Idox
+    sometimes serves with a 200 status. When a limiter is given it paces
+    the request and is told the outcome (latency, rate limits, errors) so
+    an AdaptiveRateLimiter can tune the host's rate.
+    
+    When a cache is given, fresh cached pages are returned without any
+    request, and the HTTP engine revalidates stale ones with ETag or
+    Last-Modified so unchanged pages come back as a cheap 304. Every page
+    loaded is cached, except rate-limit pages; callers that find it isn't the page they expected
+    (e.g. a maintenance page) should cache.evict() it.
+    
+    Bytes transferred for each page are logged at debug level and
+    counted in the bytes_total metric.
+    
+    Args:
+        client: WebDriver or HttpFetcher instance
+        url: Page URL
+        limiter: Optional HostRateLimiter to wait on before the request
+        cache: Optional PageCache
+        wait_for: Optional XPath the selenium engine waits for before
+            reading the page (drivers use the eager page-load strategy,
+            so get() returns once the HTML is parsed)
+        refresh: Fetch the page even if it is cached (e.g. when retrying
+            after a bad page); the new copy is still cached
+        form: Optional lxml form (HTTP engine) to submit instead of
+            GETting url, which should be its form_url(); the response is
+            never cached
+        fields: Form fields overriding the form's current values
+        
+    Returns:
+        The driver itself (now showing url) or a parsed lxml page
+        
+    Raises:
+        RateLimitError: On HTTP 429 or a rate-limit page
+        FetchError, WebDriverException: If the page could not be loaded
+    """
+    host = host_key(url)
+    if form is not None:
+        cache = None
+    entry = cache.lookup(url) if cache is not None and not refresh else None
+    cached_body = cache.read(entry) if entry is not None else None
+    if cached_body is not None and cache.is_fresh(entry):
+        metrics.inc("cache_hits_total", host=host)
+        return parse_html(cached_body, url)
+    
+    if limiter is not None:
+        metrics.observe("rate_limit_wait_seconds", limiter.acquire(url), host=host)
+    
+    not_modified = False
+    start = time.monotonic()
+    try:
+        if form is not None:
+            response = client.form_request(form, fields)
+            received = _response_bytes(response)
+            page = parse_page(response)
+        elif isinstance(client, HttpFetcher):
+            headers = cache.validators(entry) if cached_body is not None else {}
+            response = client.request("GET", url, headers=headers)
+            not_modified = response.status_code == 304
+            received = _response_bytes(response)
+            if not_modified:
+                cache.touch(url)
+                page = parse_html(cached_body, url)
+            else:
+                page = parse_page(response)
+        else:
+            client.get(url)
+            if wait_for is not None:
+                _wait_for_element(client, wait_for)
+            received = page_bytes(client)
+            page = client
+    except RateLimitError as e:
+        metrics.inc("rate_limited_total", host=host)
+        if limiter is not None:
+            limiter.record(url, rate_limited=True, retry_after=e.retry_after)
+        raise
+    except (FetchError, WebDriverException) as e:
+        if '429' in str(e):
+            metrics.inc("rate_limited_total", host=host)
+            if limiter is not None:
+                limiter.record(url, rate_limited=True)
+            raise RateLimitError(f"429 Too Many Requests for {url}") from e
+        metrics.inc("fetch_errors_total", host=host)
+        if limiter is not None:
+            status = getattr(e, "status_code", None)
+            limiter.record(url, error=status is None or status >= 500)
+        raise
+    latency = time.monotonic() - start
+    metrics.observe("fetch_seconds", latency, host=host,
+                    outcome="not_modified" if not_modified else "ok")
+    metrics.inc("pages_total", host=host)
+    if received is not None:
+        metrics.inc("bytes_total", received, host=host)
+    logger.debug("Loaded %s (%s bytes, %.2fs)", url,
+                 "?" if received is None else received, latency)
+    
+    rate_limited = check_rate_limit(page)
+    if limiter is not None:
+        limiter.record(url, latency=latency, rate_limited=rate_limited)
+    if rate_limited:
+        metrics.inc("rate_limited_total", host=host)
+        raise RateLimitError(f"Rate-limit page returned for {url}")
+    
+    if cache is not None and not not_modified:
+        if isinstance(client, HttpFetcher):
+            cache.store(url, response.content, response.headers)
+        else:
+            cache.store(url, client.page_source)
+    
+    return page
+
+
+def _response_bytes(response):
+    """Bytes received for a response body, as sent (compressed) when known."""
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit():
+        return int(length)
+    return len(response.content)
+
+
+def _wait_for_element(driver, xpath, timeout=10):
+    """Wait for an element to be present; carry on with the page if it never is."""
+    try:
+        get_wait(driver, timeout).until(EC.presence_of_element_located((By.XPATH, xpath)))
+    except TimeoutException:
+        logger.debug("Timed out waiting for %s on %s", xpath, driver.current_url)
+
+
+def pause(limiter, min_seconds, max_seconds, reason="pause"):
+    """Sleep between requests unless a rate limiter is pacing them instead."""
+    if limiter is None:
+        with metrics.timer("sleep_seconds", reason=reason):
+            random_sleep(min_seconds, max_seconds)
+
+
+def backoff(limiter, error, min_seconds=60, max_seconds=120):
+    """Wait after a failed attempt, according to what went wrong.
+    
+    A limiter has already paused the host on a rate limit (honouring
+    Retry-After), so only callers without one sleep here: for Retry-After
+    if given, otherwise min_seconds-max_seconds. Other load failures wait
+    min_seconds-max_seconds without a limiter. Missing page content is
+    harmless and is retried after a short pause.
+    
+    Args:
+        limiter: HostRateLimiter or None
+        error: Exception raised by the failed attempt
+        min_seconds: Minimum fallback sleep
+        max_seconds: Maximum fallback sleep
+    """
+    if isinstance(error, RateLimitError):
+        if limiter is None:
+            with metrics.timer("sleep_seconds", reason="backoff"):
+                if error.retry_after is not None:
+                    time.sleep(error.retry_after)
+                else:
+                    random_sleep(min_seconds, max_seconds)
+    elif isinstance(error, (FetchError, WebDriverException)):
+        pause(limiter, min_seconds, max_seconds, reason="backoff")
+    else:
+        pause(limiter, 2, 5, reason="backoff")
+
+
+def get_postcode_page(council, postcode, os_type="mac", engine="selenium",
+                      urls_csv=None, driver=None, limiter=None, journal=None):
     """Get all planning application URLs for a postcode.
     
     Args:
         council: Council name (e.g., "newham")
         postcode: Postcode to search (e.g., "E13 0AG")
         os_type: "mac" or "linux"
+        engine: "selenium" or "http"
+        urls_csv: Council registry CSV (default: the project's
+            data/input/example_urls.csv); its selector and page_size
+            settings are applied to the search
+        driver: Optional WebDriver (e.g. leased from a DriverPool) or
+            HttpFetcher to reuse; it is left open. If None, a client for
+            engine is created and quit when done.
+        limiter: Optional HostRateLimiter that paces requests in place of
+            the fixed sleeps
+        journal: Optional CrawlJournal; a postcode already searched in an
+            earlier run returns its recorded URLs without searching again.
+            Only complete searches are recorded as done.
         
     Returns:
-        List of application URLs
+        List of application URLs. If paging through the results failed
+        part-way, the URLs collected so far are returned and the search
+        is journaled as failed, so it is run again on the next attempt.
+    """
+    journal_key = f"{council.lower().strip()}|{postcode}"
+    if journal is not None:
+        saved = journal.get("postcode", journal_key)
+        if saved is not None:
+            logger.info("Already searched postcode: %s (%d links)", postcode, len(saved))
+            return [url for url, _ in _saved_results(saved)]
+    
+    settings = get_council(council, urls_csv)
+    
+    owns_driver = driver is None
+    if owns_driver:
+        driver = open_client(engine, os_type)
+    
+    complete = True
+    try:
+        results = _search_results(driver, settings, postcode, limiter)
+    except TooManyResultsError as e:
+        logger.warning("%s", e)
+        results = None
+    except IncompleteSearchError as e:
+        logger.warning("%s", e)
+        results, complete = e.results, False
+    finally:
+        if owns_driver:
+            driver.quit()
+    
+    metrics.inc("searches_total", council=settings.name)
+    
+    if results is None:
+        if journal is not None:
+            journal.mark_failed("postcode", journal_key, "Postcode search failed")
+        return []
+    
+    if journal is not None:
+        if complete:
+            journal.mark_done("postcode", journal_key, results)
+        else:
+            journal.mark_failed("postcode", journal_key, "Search results incomplete")
+    return [url for url, _ in results]
+
+
+def search_postcode(driver, settings, postcode, limiter=None):
+    """Run one postcode search with either engine and return its URLs.
+    
+    Unlike get_postcode_page, failures are left to the caller (e.g. a
+    work queue that retries the search): nothing is journaled, and an
+    incomplete search raises instead of returning what it found.
+    
+    Args:
+        driver: WebDriver or HttpFetcher instance
+        settings: Council settings of the site to search (see get_council)
+        postcode: Postcode to search
+        limiter: Optional HostRateLimiter that paces requests in place of
+            the fixed sleeps
+    
+    Returns:
+        List of application URLs, or None if the search failed
+    
+    Raises:
+        TooManyResultsError: If the site refused to list the results
+        IncompleteSearchError: If paging through the results stopped
+            early (carries the results collected so far)
     """
-    driver = setup_driver(os_type)
+    results = _search_results(driver, settings, postcode, limiter)
+    return None if results is None else [url for url, _ in results]
+
+
+def _search_results(driver, settings, postcode, limiter=None):
+    """Like search_postcode, but returns (URL, address) pairs."""
+    if isinstance(driver, HttpFetcher):
+        return _search_postcode_http(driver, settings, postcode, limiter)
+    return _search_postcode_selenium(driver, settings, postcode, limiter)
+
+
+def _saved_results(saved):
+    """Return journaled search results as (URL, address) pairs.
+    
+    Searches are journaled as [URL, address] pairs; older journals hold
+    bare URLs, whose address is unknown (None).
+    """
+    return [tuple(item) if isinstance(item, list) else (item, None) for item in saved]
+
+
+def _search_postcode_selenium(driver, settings, postcode, limiter=None):
+    """Selenium-engine body of _search_results; returns None if the search fails."""
+    base_url = settings.url
     wait = get_wait(driver)
+    load_page(driver, base_url, limiter)
     
+    # Enter postcode
     try:
-        base_url = get_council_url(council)
-        driver.get(base_url)
+        input_field = wait.until(
+            EC.presence_of_element_located((By.XPATH, settings.selector("search_input")))
+        )
+        input_field.clear()
+        input_field.send_keys(postcode)
+        if settings.page_size:
+            # Ask for bigger results pages by adding the field to the form
+            driver.execute_script(
+                "var field = document.createElement('input');"
+                "field.type = 'hidden'; field.name = arguments[1]; field.value = arguments[2];"
+                "arguments[0].form.appendChild(field);",
+                input_field, settings.page_size_param, str(settings.page_size)
+            )
+        if limiter is not None:
+            limiter.acquire(base_url)
+        input_field.send_keys(Keys.RETURN)
+    except Exception as e:
+        logger.warning("Error finding postcode field: %s", e)
+        return None
+    
+    logger.info("Searched for postcode: %s", postcode)
+    
+    search_results = []
+    total = None
+    resized = False
+    
+    # Collect URLs from all pages
+    while True:
+        pause(limiter, 2, 4)
+        
+        # Links, result count and page sizes in one round trip
+        results = driver.execute_script(
+            HARVEST_RESULTS_SCRIPT, settings.selector("result_link"),
+            settings.selector("results_count"), settings.page_size_param, MESSAGE_XPATH,
+            settings.selector("result_address"), list(RATE_LIMIT_PHRASES)
+        )
+        if results["rate_limited"]:
+            error = RateLimitError(f"Rate-limit page returned for {postcode} search")
+            if search_results:
+                raise IncompleteSearchError(
+                    f"Stopped after {len(search_results)} results for {postcode}: {error}",
+                    search_results, total
+                ) from error
+            logger.warning("%s", error)
+            _record_rate_limit(limiter, base_url, error)
+            return None
+        
+        if not search_results:
+            if results["too_many"]:
+                raise TooManyResultsError(f"Too many results for {postcode}")
+            
+            total = parse_results_count(results["count"])
+            page_sizes = sorted(int(size) for size in results["page_sizes"] if size.isdigit())
+            current = int(results["page_size"]) if (results["page_size"] or "").isdigit() else None
+            page_size = _harvest_page_size(settings, page_sizes, current,
+                                           len(results["links"]), total)
+            if page_size and not resized:
+                resized = True
+                logger.debug("Switching to %d results per page", page_size)
+                if limiter is not None:
+                    limiter.acquire(base_url)
+                _submit_and_wait(driver, wait, SET_PAGE_SIZE_SCRIPT,
+                                 settings.page_size_param, str(page_size))
+                continue
         
-        # Enter postcode
+        search_results.extend(zip(results["links"], results["addresses"]))
+        
+        logger.info("Collected %d links (total: %d)", len(results["links"]), len(search_results))
+        
+        if total is not None and len(search_results) >= total:
+            break
+        
+        # Try to move to next page
         try:
-            input_field = wait.until(
-                EC.presence_of_element_located((By.ID, "simpleSearchString"))
-            )
-            input_field.clear()
-            input_field.send_keys(postcode)
-            input_field.send_keys(Keys.RETURN)
-        except Exception as e:
-            print(f"Error finding postcode field: {e}")
-            return []
+            next_button = driver.find_element(By.XPATH, settings.selector("next_link"))
+        except NoSuchElementException:
+            break
         
-        print(f"Searched for postcode: {postcode}")
+        if "disabled" in (next_button.get_attribute("class") or "").lower():
+            break
         
-        detail_urls = []
+        if limiter is not None:
+            limiter.acquire(base_url)
+        try:
+            _submit_and_wait(driver, wait, "arguments[0].click();", next_button)
+        except WebDriverException as e:
+            raise IncompleteSearchError(
+                f"Stopped after {len(search_results)} results for {postcode}: {e}",
+                search_results, total
+            ) from e
+    
+    _check_complete(postcode, search_results, total)
+    return search_results
+
+
+def _submit_and_wait(driver, wait, script, *args):
+    """Run a script that navigates and wait until the old page is gone."""
+    old_page = driver.find_element(By.TAG_NAME, "html")
+    driver.execute_script(script, *args)
+    wait.until(EC.staleness_of(old_page))
+
+
+def _harvest_page_size(settings, page_sizes, current, collected, total):
+    """Return a bigger results page size to switch to, or None.
+    
+    Only used when the council has no page_size configured: asks for the
+    largest size the results page offers if the results don't already fit
+    on the current page.
+    """
+    if settings.page_size or not page_sizes:
+        return None
+    if total is not None and total <= collected:
+        return None
+    largest = page_sizes[-1]
+    if largest <= max(current or 0, collected):
+        return None
+    return largest
+
+
+def _search_postcode_http(fetcher, settings, postcode, limiter=None):
+    """HTTP-engine body of _search_results; returns None if the search fails."""
+    base_url = settings.url
+    extra_fields = {}
+    if settings.page_size:
+        extra_fields[settings.page_size_param] = str(settings.page_size)
+    
+    # Both requests go through load_page, which paces them, counts them
+    # in the page metrics and checks for rate-limit pages
+    try:
+        form, field = search_form(load_page(fetcher, base_url, limiter),
+                                  settings.selector("search_input"))
+        page = load_page(fetcher, form_url(form), limiter, form=form,
+                         fields={field: postcode, **extra_fields})
+    except FetchError as e:
+        logger.warning("Error submitting postcode search: %s", e)
+        if isinstance(e, RateLimitError):
+            backoff(limiter, e)
+        return None
+    
+    logger.info("Searched for postcode: %s", postcode)
+    
+    if check_too_many_results(page):
+        raise TooManyResultsError(f"Too many results for {postcode}")
+    
+    total = results_count(page, settings.selector("results_count"))
+    page_sizes, current = page_size_options(page, settings.page_size_param)
+    page_size = _harvest_page_size(settings, page_sizes, current,
+                                   len(summary_links(page, settings.selector("result_link"))), total)
+    if page_size:
+        select = page.xpath(f"//select[@name='{settings.page_size_param}']")[0]
+        forms = list(select.iterancestors("form"))
+        try:
+            if forms:
+                logger.debug("Switching to %d results per page", page_size)
+                page = load_page(fetcher, form_url(forms[0]), limiter, form=forms[0],
+                                 fields={settings.page_size_param: str(page_size)})
+        except FetchError as e:
+            logger.warning("Error changing results page size: %s", e)
+            if isinstance(e, RateLimitError):
+                backoff(limiter, e)
+    
+    search_results = []
+    
+    while True:
+        page_results = summary_results(page, settings.selector("result_link"),
+                                       settings.selector("result_address"))
+        search_results.extend(page_results)
         
-        # Collect URLs from all pages
-        while True:
-            random_sleep(2, 4)
-            
-            # Collect links on current page
-            links = driver.find_elements(By.CSS_SELECTOR, "a.summaryLink")
-            page_urls = [link.get_attribute("href") for link in links]
-            detail_urls.extend(page_urls)
-            
-            print(f"Collected {len(page_urls)} links (total: {len(detail_urls)})")
+        logger.info("Collected %d links (total: %d)", len(page_results), len(search_results))
+        
+        if total is not None and len(search_results) >= total:
+            break
+        
+        next_url = next_page_url(page, settings.selector("next_link"))
+        if not next_url:
+            break
+        
+        pause(limiter, 2, 4)
+        try:
+            page = load_page(fetcher, next_url, limiter)
+        except FetchError as e:
+            raise IncompleteSearchError(
+                f"Stopped after {len(search_results)} results for {postcode}: {e}",
+                search_results, total
+            ) from e
+    
+    _check_complete(postcode, search_results, total)
+    return search_results
+
+
+def _check_complete(postcode, search_results, total):
+    """Raise IncompleteSearchError if fewer results were collected than the site reported."""
+    if total is not None and len(search_results) < total:
+        raise IncompleteSearchError(
+            f"Collected {len(search_results)} of {total} results for {postcode}",
+            search_results, total
+        )
+
+
+def _record_rate_limit(limiter, url, error):
+    """Count a rate limit found outside load_page and back off as its callers do."""
+    metrics.inc("rate_limited_total", host=host_key(url))
+    if limiter is not None:
+        limiter.record(url, rate_limited=True, retry_after=error.retry_after)
+    backoff(limiter, error)
+
+
+def application_key(url):
+    """Return an application URL's Idox keyVal, or the URL if it has none."""
+    return parse_qs(urlparse(url).query).get("keyVal", [url])[0]
+
+
+class AreaSearchPlan:
+    """Decide which postcode areas search_area queries, coarsest first.
+    
+    The requested postcodes, sectors and districts are arranged in a tree
+    (district -> sector -> postcode). A district or sector is searched in
+    one go if it was requested itself or covers at least min_group
+    requested areas; otherwise its requested children are searched
+    separately. When the site says an area has too many results, split()
+    returns the next level down. A coarser search also lists applications
+    in unrequested postcodes; includes() tells them apart.
+    
+    Args:
+        postcodes: Postcodes, postcode sectors ("E13 0") or districts ("E13")
+        min_group: Requested areas a coarser area must cover to be searched
+            in their place
+    """
+    
+    def __init__(self, postcodes, min_group=2):
+        self.min_group = min_group
+        self.requested = set()
+        self.children = {}
+        self.roots = set()
+        
+        for postcode in postcodes:
+            area = normalise_postcode_area(postcode)
+            if area is None:
+                # Not a postcode: search it as given and never coarsen it
+                area = " ".join(str(postcode).split())
+                if not area:
+                    continue
+                self.requested.add(area)
+                self.roots.add(area)
+                continue
             
-            # Try to move to next page
-            try:
-                next_button = driver.find_element(
-                    By.XPATH,
-                    "//a[normalize-space()='Next' or contains(@aria-label, 'Next')]"
-                )
-                
-                if "disabled" in next_button.get_attribute("class").lower():
-                    break
-                
-                driver.execute_script("arguments[0].click();", next_button)
-            except Exception:
-                break
+            self.requested.add(area)
+            parent = parent_postcode_area(area)
+            while parent is not None:
+                self.children.setdefault(parent, set()).add(area)
+                area, parent = parent, parent_postcode_area(parent)
+            self.roots.add(area)
         
-        return detail_urls
+        self._covered = {}
+    
+    def queries(self):
+        """Return the first areas to search."""
+        return [query for root in sorted(self.roots) for query in self._choose(root)]
+    
+    def split(self, area):
+        """Return narrower areas to search instead of one over the result cap.
+        
+        A district with no requested sectors is split into its ten
+        sectors. A postcode, or a sector with no requested postcodes,
+        can't be split and returns an empty list.
+        """
+        if area in self.children:
+            return [query for child in sorted(self.children[area]) for query in self._choose(child)]
+        if postcode_area_level(area) == "district":
+            return [f"{area} {sector}" for sector in range(10)]
+        return []
+    
+    def includes(self, postcode):
+        """Check whether a postcode falls in a requested area.
+        
+        Unknown postcodes (None) are included, since there is nothing to
+        rule them out by.
+        """
+        area = normalise_postcode_area(postcode)
+        if area is None:
+            return True
+        while area is not None:
+            if area in self.requested:
+                return True
+            area = parent_postcode_area(area)
+        return False
+    
+    def covered(self, area):
+        """Return the number of requested areas at or under area."""
+        if area not in self._covered:
+            self._covered[area] = (area in self.requested) + sum(
+                self.covered(child) for child in self.children.get(area, ())
+            )
+        return self._covered[area]
+    
+    def _choose(self, area):
+        if area in self.requested or self.covered(area) >= self.min_group:
+            return [area]
+        return [query for child in sorted(self.children[area]) for query in self._choose(child)]
+
+
+def search_area(council, postcodes, os_type="mac", engine="selenium", urls_csv=None,
+                driver=None, limiter=None, journal=None, min_group=2):
+    """Get the application URLs for many postcodes with as few searches as possible.
     
+    Neighbouring postcodes are searched together as their sector or
+    district (see AreaSearchPlan), falling back to narrower areas when the
+    site says a search has too many results. URLs are deduplicated by
+    application keyVal across the whole batch, so overlapping areas don't
+    produce repeated detail fetches. A sector or district search also
+    lists applications in postcodes that weren't requested; these are
+    dropped by the postcode in each result's address (results without a
+    recognisable postcode are kept).
+    
+    Args:
+        council: Council name (e.g., "newham")
+        postcodes: Postcodes, postcode sectors ("E13 0") or districts ("E13")
+        os_type: "mac" or "linux"
+        engine: "selenium" or "http"
+        urls_csv: Council registry CSV (default: the project's
+            data/input/example_urls.csv)
+        driver: Optional WebDriver or HttpFetcher to reuse; it is left open.
+            If None, a client for engine is created and quit when done.
+        limiter: Optional HostRateLimiter that paces requests in place of
+            the fixed sleeps
+        journal: Optional CrawlJournal; areas already searched in an
+            earlier run (by search_area or get_postcode_page) are not
+            searched again. Areas whose results couldn't all be paged
+            through are journaled as failed, but the URLs collected are
+            still returned.
+        min_group: Requested areas a sector or district must cover to be
+            searched in their place (1 always searches the coarsest area)
+        
+    Returns:
+        List of unique application URLs, in the order they were found
+    """
+    settings = get_council(council, urls_csv)
+    plan = AreaSearchPlan(postcodes, min_group)
+    
+    owns_driver = driver is None
+    if owns_driver:
+        driver = open_client(engine, os_type)
+    
+    unique_urls = {}
+    searches = 0
+    skipped = 0
+    pending = plan.queries()[::-1]
+    try:
+        while pending:
+            area = pending.pop()
+            journal_key = f"{council.lower().strip()}|{area}"
+            area_results = None
+            too_many = False
+            if journal is not None:
+                saved = journal.get("postcode", journal_key)
+                if saved is not None:
+                    area_results = _saved_results(saved)
+                too_many = journal.get("area", journal_key) == TOO_MANY_RESULTS
+            
+            if area_results is None and not too_many:
+                searches += 1
+                metrics.inc("searches_total", council=settings.name)
+                try:
+                    area_results = _search_results(driver, settings, area, limiter)
+                except TooManyResultsError:
+                    metrics.inc("search_overflows_total", council=settings.name)
+                    too_many = True
+                    if journal is not None:
+                        journal.mark_done("area", journal_key, TOO_MANY_RESULTS)
+                except IncompleteSearchError as e:
+                    logger.warning("%s", e)
+                    area_results = e.results
+                    if journal is not None:
+                        journal.mark_failed("postcode", journal_key, "Search results incomplete")
+                else:
+                    if area_results is None:
+                        if journal is not None:
+                            journal.mark_failed("postcode", journal_key, "Postcode search failed")
+                        continue
+                    if journal is not None:
+                        journal.mark_done("postcode", journal_key, area_results)
+            
+            if too_many:
+                narrower = plan.split(area)
+                if narrower:
+                    logger.info("Too many results for %s; searching %d narrower areas",
+                                area, len(narrower))
+                    pending.extend(narrower[::-1])
+                else:
+                    logger.warning("Too many results for %s and it can't be narrowed", area)
+                continue
+            
+            # Results of a coarser area are filtered back to the requested ones
+            coarsened = area not in plan.requested
+            for url, address in area_results:
+                if coarsened and not plan.includes(extract_postcode(address)):
+                    skipped += 1
+                    continue
+                unique_urls.setdefault(application_key(url), url)
     finally:
-        driver.quit()
+        if owns_driver:
+            driver.quit()
+    
+    logger.info("Searched %d areas for %d postcodes: %d unique applications "
+                "(%d results outside the requested areas dropped)",
+                searches, len(plan.requested), len(unique_urls), skipped)
+    return list(unique_urls.values())
 
 
-def scrape_app_details(urls, os_type="mac", max_retries=3):
+def scrape_app_details(urls, os_type="mac", max_retries=3, engine="selenium",
+                       driver=None, limiter=None, extra_fields=False, cache=None,
+                       journal=None):
     """Scrape application details from URLs.
     
     Args:
         urls: List of application URLs
         os_type: "mac" or "linux"
         max_retries: Maximum retry attempts per URL
+        engine: "selenium" or "http"
+        driver: Optional WebDriver (e.g. leased from a DriverPool) or
+            HttpFetcher to reuse; it is left open. If None, a client for
+            engine is created and quit when done.
+        limiter: Optional HostRateLimiter that paces requests in place of
+            the fixed sleeps
+        extra_fields: Also keep every other field shown on the summary and
+            details pages, as a dict per application in an "extra" column
+        cache: Optional PageCache; cached pages are reused instead of refetched
+        journal: Optional CrawlJournal. Each URL's row is recorded as soon as
+            it is scraped, and URLs done in an earlier run are not scraped
+            again (their recorded rows are returned instead).
         
     Returns:
         Dictionary with scraped data
     """
-    driver = setup_driver(os_type)
-    wait = get_wait(driver)
+    data = {column: [] for column in APPLICATION_COLUMNS}
+    if extra_fields:
+        data["extra"] = []
     
-    data = {
-        "reference": [],
-        "url": [],
-        "date_validated": [],
-        "address": [],
-        "description": [],
-        "decision": [],
-        "decision_date": [],
-        "app_type": [],
-        "actual_decision_level": [],
-        "expected_decision_level": []
-    }
+    for row in iter_app_details(urls, os_type, max_retries, engine, driver,
+                                limiter, extra_fields, cache, journal):
+        for column, values in data.items():
+            values.append(row[column])
+    
+    return data
+
+
+def iter_app_details(urls, os_type="mac", max_retries=3, engine="selenium",
+                     driver=None, limiter=None, extra_fields=False, cache=None,
+                     journal=None):
+    """Scrape application details, yielding one record at a time.
+    
+    Takes the same arguments as scrape_app_details, but urls may be any
+    iterable (including a generator) and nothing is accumulated, so memory
+    stays flat however many URLs are scraped.
+    
+    Yields:
+        Dict keyed by APPLICATION_COLUMNS (plus "extra" if requested);
+        fields are np.nan for URLs that could not be scraped
+    """
+    columns = APPLICATION_COLUMNS + (["extra"] if extra_fields else [])
+    total = len(urls) if hasattr(urls, "__len__") else "?"
+    
+    owns_driver = driver is None
+    if owns_driver:
+        driver = open_client(engine, os_type)
+    
+    if journal is not None and isinstance(urls, (list, tuple)):
+        journal.add_pending("application", urls)
     
     try:
         for i, url in enumerate(urls, start=1):
-            print(f"Scraping URL {i} of {len(urls)}: {url}")
+            if journal is not None:
+                row = journal.get("application", url)
+                if row is not None:
+                    logger.info("Skipping URL %d of %s (already done): %s", i, total, url)
+                    yield {column: row.get(column, np.nan) for column in columns}
+                    continue
+            
+            logger.info("Scraping URL %d of %s: %s", i, total, url)
             
-            success = False
+            cached = cache is not None and cache.has_fresh(url)
+            row = None
+            error = None
             
             for attempt in range(1, max_retries + 1):
                 try:
-                    print(f"  Attempt {attempt}/{max_retries}")
-                    
-                    # Scrape main page
-                    driver.get(url)
-                    
-                    # Get reference
-                    reference = get_table_value(driver, "Reference")
-                    
-                    if is_missing(reference):
-                        raise ValueError("Reference missing")
-                    
-                    # Get all main details
-                    date_validated = get_table_value(driver, "Application Validated")
-                    address = get_table_value(driver, "Address")
-                    description = get_table_value(driver, "Proposal")
-                    decision = get_table_value(driver, "Decision")
-                    decision_date = get_table_value(driver, "Decision Issued Date")
-                    
-                    print(f"  Scraped main page for {reference}")
-                    
-                    random_sleep(1.5, 5.0)
-                    
-                    # Scrape further info page
-                    try:
-                        further_url = url.replace("summary", "details")
-                        driver.get(further_url)
-                        random_sleep(1, 3)
-                        
-                        app_type = get_table_value(driver, "Application Type")
-                        actual_level = get_table_value(driver, "Actual Decision Level")
-                        expected_level = get_table_value(driver, "Expected Decision Level")
-                        
-                        print(f"  Scraped further info page for {reference}")
-                    except Exception as e:
-                        print(f"  Further info failed: {e}")
-                        app_type = np.nan
-                        actual_level = np.nan
-                        expected_level = np.nan
-                    
-                    # Store data
-                    data["reference"].append(reference)
-                    data["url"].append(url)
-                    data["date_validated"].append(date_validated)
-                    data["address"].append(address)
-                    data["description"].append(description)
-                    data["decision"].append(decision)
-                    data["decision_date"].append(decision_date)
-                    data["app_type"].append(app_type)
-                    data["actual_decision_level"].append(actual_level)
-                    data["expected_decision_level"].append(expected_level)
-                    
-                    success = True
+                    logger.debug("  Attempt %d/%d", attempt, max_retries)
+                    if attempt > 1:
+                        metrics.inc("retries_total", kind="application")
+                    row = scrape_application(driver, url, limiter, extra_fields, cache,
+                                             refresh=attempt > 1)
                     break
                 
                 except Exception as e:
-                    print(f"  Attempt {attempt} failed: {e}")
-                    random_sleep(60, 120)
+                    error = e
+                    logger.warning("  Attempt %d failed for %s: %s", attempt, url, e)
+                    backoff(limiter, e)
             
-            # If all attempts failed, append NaNs
-            if not success:
-                print(f"  All retries failed for {url}")
-                data["reference"].append(np.nan)
-                data["url"].append(url)
-                data["date_validated"].append(np.nan)
-                data["address"].append(np.nan)
-                data["description"].append(np.nan)
-                data["decision"].append(np.nan)
-                data["decision_date"].append(np.nan)
-                data["app_type"].append(np.nan)
-                data["actual_decision_level"].append(np.nan)
-                data["expected_decision_level"].append(np.nan)
+            # If all attempts failed, yield NaNs
+            if row is None:
+                logger.error("  All retries failed for %s", url)
+                metrics.inc("failures_total", kind="application")
+                if journal is not None:
+                    journal.mark_failed("application", url, error)
+                row = {"url": url}
+            else:
+                metrics.inc("rows_total", kind="application")
+                if journal is not None:
+                    journal.mark_done("application", url, row)
+            
+            yield {column: row.get(column, np.nan) for column in columns}
             
-            random_sleep(2, 8)
+            if not cached:
+                pause(limiter, 2, 8)
     
     finally:
-        driver.quit()
+        if owns_driver:
+            driver.quit()
+
+
+def iter_app_batches(urls, batch_size=500, sink=None, typed=False, **kwargs):
+    """Scrape application details in batches of DataFrames.
     
-    return data
+    Each batch can be processed downstream (e.g. with
+    process_address_dataframe) while the crawl carries on.
+    
+    Args:
+        urls: Iterable of application URLs
+        batch_size: Number of records per batch
+        sink: Optional CsvSink or ParquetSink; each batch is written to it
+            as soon as it is complete (the sink is not closed)
+        typed: Yield batches with parsed dates and categorical columns
+            (see records.applications_frame); the sink still gets the
+            scraped strings
+        **kwargs: Passed on to iter_app_details
+        
+    Yields:
+        DataFrame of up to batch_size records
+    """
+    batch = []
+    for row in iter_app_details(urls, **kwargs):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            frame = _write_batch(batch, sink)
+            yield applications_frame(frame) if typed else frame
+            batch = []
+    
+    if batch:
+        frame = _write_batch(batch, sink)
+        yield applications_frame(frame) if typed else frame
+
+
+def _write_batch(rows, sink):
+    """Turn records into a DataFrame, writing it to sink if given."""
+    frame = pd.DataFrame.from_records(rows)
+    if sink is not None:
+        sink.write_frame(frame)
+    return frame
+
+
+def scrape_application(driver, url, limiter=None, extra_fields=False, cache=None,
+                       refresh=False):
+    """Scrape the summary and further info pages of one application.
+    
+    Each page's table is read in a single pass with get_table_values.
+    
+    Args:
+        driver: WebDriver or HttpFetcher instance
+        url: Application summary URL
+        limiter: Optional HostRateLimiter that paces requests in place of
+            the fixed sleeps
+        extra_fields: Also return every other table field under "extra"
+        cache: Optional PageCache. If its keep_decided policy is on, pages
+            of applications with a decision are pinned and never refetched.
+            Pages without the expected table (error or maintenance pages)
+            are evicted so they aren't served again.
+        refresh: Refetch both pages even if they are cached
+        
+    Returns:
+        Dict keyed by APPLICATION_COLUMNS (plus "extra" if requested)
+        
+    Raises:
+        ValueError: If the summary page has no reference
+    """
+    further_url = url.replace("summary", "details")
+    cached = (cache is not None and not refresh
+              and cache.has_fresh(url) and cache.has_fresh(further_url))
+    
+    # Scrape main page
+    summary = get_table_values(load_page(driver, url, limiter, cache, TABLE_ROW_XPATH, refresh))
+    
+    reference = summary.get("reference", np.nan)
+    if is_missing(reference):
+        if cache is not None:
+            cache.evict(url)
+        raise ValueError("Reference missing")
+    
+    row = {"url": url}
+    row.update(_pick_fields(summary, SUMMARY_FIELDS))
+    
+    logger.debug("  Scraped main page for %s", reference)
+    
+    if not cached:
+        pause(limiter, 1.5, 5.0)
+    
+    # Scrape further info page
+    details = {}
+    try:
+        details = get_table_values(load_page(driver, further_url, limiter, cache,
+                                             TABLE_ROW_XPATH, refresh))
+        if not details and cache is not None:
+            cache.evict(further_url)
+        if not cached:
+            pause(limiter, 1, 3)
+        
+        logger.debug("  Scraped further info page for %s", reference)
+    except Exception as e:
+        logger.warning("  Further info failed for %s: %s", reference, e)
+    
+    row.update(_pick_fields(details, DETAILS_FIELDS))
+    
+    if cache is not None and cache.keep_decided and not is_missing(row["decision"]):
+        cache.mark_final(url)
+        if details:
+            cache.mark_final(further_url)
+    
+    if extra_fields:
+        known = {normalise_label(label) for label in SUMMARY_FIELDS.values()}
+        known.update(normalise_label(label) for label in DETAILS_FIELDS.values())
+        row["extra"] = {
+            key: value
+            for key, value in {**details, **summary}.items()
+            if key not in known
+        }
+    
+    return row
 
 
-def scrape_comments(driver, council, app_id, application_url, comments_saver=None):
+def _pick_fields(values, fields):
+    """Map get_table_values output onto output columns, NaN where absent."""
+    return {
+        column: values.get(normalise_label(label), np.nan)
+        for column, label in fields.items()
+    }
+
+
+def scrape_comments(driver, council, app_id, application_url, comments_saver=None,
+                    limiter=None, cache=None, known_ids=None, max_retries=5, complete=None):
     """Scrape comments from an application.
     
+    Comment IDs are stable content hashes (see comment_id), so the same
+    comment gets the same ID on every run. Idox lists comments newest
+    first, so if the last crawl of the application reached its oldest
+    comment, everything after the first already saved comment is known
+    too and the crawl stops there: refreshing an application only fetches
+    the pages with new comments. If the last crawl was cut short (an
+    error, a rate limit that didn't clear, or a page that wasn't a
+    comments list), the saved comments are skipped but paging carries on
+    until the oldest comment is reached.
+    
     Args:
-        driver: Active WebDriver instance
+        driver: Active WebDriver or HttpFetcher instance
         council: Council name
         app_id: Application ID
         application_url: Base URL of application
-        comments_saver: Optional object with insert_comment() method
+        comments_saver: Optional object with insert_comment() method. If
+            it also has comment_crawl_complete(app_id) and
+            mark_comment_crawl(app_id, complete) methods (like
+            SqliteCommentSink), whether each crawl reached the oldest
+            comment is recorded there.
+        limiter: Optional HostRateLimiter that paces requests in place of
+            the fixed sleeps
+        cache: Optional PageCache; cached comment pages are reused
+        known_ids: Optional set of comment IDs already saved for this
+            application. If None and comments_saver has a
+            known_comment_ids(app_id) method, that is used instead.
+        max_retries: Times a rate-limited page is retried before the
+            crawl gives up on the application
+        complete: Whether the crawl that saved known_ids reached the
+            oldest comment, so the crawl may stop at the first known one.
+            If None, comments_saver.comment_crawl_complete(app_id) is used
+            when available, otherwise False.
         
     Returns:
-        Number of comments scraped
+        Number of new comments scraped
     """
-    wait = get_wait(driver)
     comment_url = application_url.replace("summary", "neighbourComments")
+    tracks_crawls = (hasattr(comments_saver, "comment_crawl_complete")
+                     and hasattr(comments_saver, "mark_comment_crawl"))
+    
+    if known_ids is None and hasattr(comments_saver, "known_comment_ids"):
+        known_ids = comments_saver.known_comment_ids(app_id)
+    known_ids = known_ids or set()
+    if complete is None:
+        complete = tracks_crawls and comments_saver.comment_crawl_complete(app_id)
+    
+    if tracks_crawls and complete:
+        # Until this crawl finishes, new comments may sit above a gap
+        comments_saver.mark_comment_crawl(app_id, complete=False)
     
     page_number = 1
     number_comments = 0
     seen_comments = set()
+    reached_known = False
+    retries = 0
     
     while True:
         url = f"{comment_url}&neighbourCommentsPager.page={page_number}"
+        cached = cache is not None and cache.has_fresh(url)
         
         try:
-            driver.get(url)
-        except WebDriverException as e:
-            if '429' in str(e):
-                print(f"429 Too Many Requests on page {page_number}. Sleeping 5 min.")
-                time.sleep(300)
-                continue
-            else:
-                print(f"WebDriverException on page {page_number}: {e}")
+            comments = _load_comments(driver, url, limiter, cache)
+        except RateLimitError as e:
+            if retries >= max_retries:
+                logger.warning("Still rate limited on page %d after %d retries: %s",
+                               page_number, retries, e)
                 return number_comments
+            retries += 1
+            logger.warning("Rate limited on page %d: %s", page_number, e)
+            metrics.inc("retries_total", kind="comments")
+            backoff(limiter, e, 300, 300)
+            continue
+        except (WebDriverException, FetchError) as e:
+            logger.warning("%s on page %d: %s", type(e).__name__, page_number, e)
+            return number_comments
         
-        try:
-            comments = wait.until(
-                EC.presence_of_all_elements_located((By.CLASS_NAME, 'comment'))
-            )
-        except TimeoutException:
-            print(f"No comments on page {page_number}")
+        retries = 0
+        
+        if comments is None:
+            # e.g. a maintenance page: not the end of the list
+            logger.warning("Page %d is not a comments list", page_number)
+            if cache is not None:
+                cache.evict(url)
+            return number_comments
+        
+        if not comments:
+            logger.info("No comments on page %d", page_number)
             break
         
-        has_new_comments = False
+        has_unseen_comments = False
         
         for comment in comments:
-            try:
-                comment_text = comment.find_element(By.CLASS_NAME, 'comment-text').text.strip()
-            except:
-                comment_text = "None"
+            new_id = comment_id(app_id, comment)
             
-            # Check for duplicates
-            comment_hash = hash((app_id, comment_text))
-            if comment_hash in seen_comments:
+            # Check for duplicates (Idox repeats the last page past the end)
+            if new_id in seen_comments:
                 continue
             
-            seen_comments.add(comment_hash)
-            has_new_comments = True
-            
-            comment_id = f"{app_id}_{number_comments + 1}"
-            
-            try:
-                address = comment.find_element(By.CLASS_NAME, 'consultationAddress').text.strip()
-            except:
-                address = "None"
+            seen_comments.add(new_id)
+            has_unseen_comments = True
             
-            try:
-                stance = comment.find_element(By.CLASS_NAME, 'consultationStance').text.strip().strip("()")
-            except:
-                stance = "None"
-            
-            try:
-                date = comment.find_element(
-                    By.XPATH,
-                    './/h3[contains(text(), "Comment submitted date:")]'
-                ).text.replace("Comment submitted date:", "").strip()
-            except:
-                date = "None"
+            # Saved by an earlier run
+            if new_id in known_ids:
+                reached_known = True
+                continue
             
             if comments_saver:
                 comments_saver.insert_comment(
-                    council, comment_id, app_id,
-                    address, stance, date, comment_text
+                    council, new_id, app_id,
+                    comment["address"], comment["stance"], comment["date"], comment["text"]
                 )
             
             number_comments += 1
-            random_sleep(1, 2)
+            metrics.inc("rows_total", kind="comment")
+            if not cached:
+                pause(limiter, 1, 2)
+        
+        # After a complete crawl, everything from here on was saved already
+        if reached_known and complete:
+            logger.info("Reached previously saved comments on page %d", page_number)
+            break
         
-        if not has_new_comments:
-            print(f"No new comments on page {page_number}")
+        if not has_unseen_comments:
+            logger.info("No new comments on page %d", page_number)
             break
         
         page_number += 1
-        random_sleep(5, 10)
+        if not cached:
+            pause(limiter, 5, 10)
     
+    if tracks_crawls:
+        comments_saver.mark_comment_crawl(app_id, complete=True)
     return number_comments
+
+
+def comment_id(app_id, comment):
+    """Build a stable ID for a comment from its content.
+    
+    Unlike Python's hash(), which is salted per process, the SHA-1 of the
+    comment's address, date and text is the same on every run and doesn't
+    depend on where the comment appears in the list.
+    
+    Args:
+        app_id: Application ID
+        comment: Dict with address, date and text keys
+        
+    Returns:
+        ID string like "<app_id>_<16 hex chars>"
+    """
+    content = "\x1f".join(
+        " ".join(str(comment[field]).split())
+        for field in ("address", "date", "text")
+    )
+    digest = hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+    return f"{app_id}_{digest}"
+
+
+def _load_comments(driver, url, limiter=None, cache=None):
+    """Load a neighbourComments page and extract its comments.
+    
+    Args:
+        driver: WebDriver or HttpFetcher instance
+        url: Comments page URL
+        limiter: Optional HostRateLimiter to wait on before the request
+        cache: Optional PageCache
+        
+    Returns:
+        List of dicts with address, stance, date and text keys; empty past
+        the last comment, or None if the page isn't a comments list at all
+    """
+    page = load_page(driver, url, limiter, cache)
+    
+    if page is not driver:
+        # HTTP engine or a cached page: already parsed with lxml
+        comments = parse_comments(page)
+        if not comments and not page.xpath(COMMENTS_LIST_XPATH):
+            return None
+        return comments
+    
+    try:
+        elements = get_wait(driver).until(
+            EC.presence_of_all_elements_located((By.CLASS_NAME, 'comment'))
+        )
+    except TimeoutException:
+        return [] if driver.find_elements(By.XPATH, COMMENTS_LIST_XPATH) else None
+    
+    comments = []
+    
+    for comment in elements:
+        try:
+            comment_text = _collapse(comment.find_element(By.CLASS_NAME, 'comment-text').text)
+        except:
+            comment_text = "None"
+        
+        try:
+            address = _collapse(comment.find_element(By.CLASS_NAME, 'consultationAddress').text)
+        except:
+            address = "None"
+        
+        try:
+            stance = _collapse(comment.find_element(By.CLASS_NAME, 'consultationStance').text).strip("()")
+        except:
+            stance = "None"
+        
+        try:
+            date = _collapse(comment.find_element(
+                By.XPATH,
+                './/h3[contains(text(), "Comment submitted date:")]'
+            ).text.replace("Comment submitted date:", ""))
+        except:
+            date = "None"
+        
+        comments.append({
+            "text": comment_text,
+            "address": address,
+            "stance": stance,
+            "date": date,
+        })
+    
+    return comments
+
+
+def _collapse(text):
+    """Collapse runs of whitespace, as element_text does for the HTTP engine."""
+    return " ".join(text.split())
@@ -0,0 +1,319 @@
+"""Batched output sinks for scraped records.
+
+Sinks buffer records and write them in batches, so long crawls can be
+saved incrementally without holding every row in memory.
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+
+class RecordSink:
+    """Base class for sinks that buffer records and write them in batches.
+
+    Subclasses implement _write_frame(frame).
+
+    Args:
+        batch_size: Number of buffered records that triggers a write
+        flush_interval: Optional seconds after which buffered records are
+            written by the next write(), however few there are
+    """
+
+    def __init__(self, batch_size=1000, flush_interval=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def write(self, record):
+        """Buffer one record (dict), writing a batch once batch_size is reached."""
+        self._buffer.append(record)
+        overdue = (
+            self.flush_interval is not None
+            and time.monotonic() - self._last_flush >= self.flush_interval
+        )
+        if len(self._buffer) >= self.batch_size or overdue:
+            self.flush()
+
+    def write_frame(self, frame):
+        """Write a DataFrame of records straight away (after any buffered rows)."""
+        self.flush()
+        if len(frame):
+            self._write_frame(_serialise_nested(frame))
+            self.rows_written += len(frame)
+
+    def flush(self):
+        """Write any buffered records."""
+        self._last_flush = time.monotonic()
+        if self._buffer:
+            rows, self._buffer = self._buffer, []
+            self.write_frame(pd.DataFrame.from_records(rows))
+
+    def close(self):
+        """Flush buffered records and release the output."""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write_frame(self, frame):
+        raise NotImplementedError
+
+
+class CsvSink(RecordSink):
+    """Append records to a CSV file in batches.
+
+    The header is written only when the file is new or empty, so a crawl
+    can be resumed into the same file.
+
+    Args:
+        path: Output CSV path
+        batch_size: Number of buffered records that triggers a write
+        flush_interval: Optional seconds between writes of a part-full batch
+    """
+
+    def __init__(self, path, batch_size=1000, flush_interval=None):
+        super().__init__(batch_size, flush_interval)
+        self.path = path
+
+    def _write_frame(self, frame):
+        write_header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        frame.to_csv(self.path, mode="a", header=write_header, index=False)
+
+
+class ParquetSink(RecordSink):
+    """Write records to a Parquet file in batches (one row group per batch).
+
+    Requires pyarrow. The schema is fixed by the first batch; columns that
+    are empty in that batch are stored as strings.
+
+    Args:
+        path: Output Parquet path
+        batch_size: Number of buffered records that triggers a write
+        flush_interval: Optional seconds between writes of a part-full batch
+    """
+
+    def __init__(self, path, batch_size=1000, flush_interval=None):
+        super().__init__(batch_size, flush_interval)
+        self.path = path
+        self._writer = None
+
+    def _write_frame(self, frame):
+        pa, pq = _import_pyarrow()
+
+        # Missing values as None so all-missing columns aren't typed as float
+        frame = frame.astype(object).where(frame.notna(), None)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+
+        if self._writer is None:
+            schema = pa.schema([
+                pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+                for field in table.schema
+            ])
+            self._writer = pq.ParquetWriter(self.path, schema)
+
+        self._writer.write_table(table.cast(self._writer.schema))
+
+    def close(self):
+        super().close()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+COMMENT_COLUMNS = [
+    "council",
+    "comment_id",
+    "app_id",
+    "address",
+    "stance",
+    "date",
+    "comment_text",
+]
+
+
+class CommentSinkMixin:
+    """Adds the insert_comment() saver interface used by scrape_comments."""
+
+    def insert_comment(self, council, comment_id, app_id, address, stance, date, comment_text):
+        """Buffer one comment; it is written with the next batch."""
+        self.write(dict(zip(
+            COMMENT_COLUMNS,
+            (council, comment_id, app_id, address, stance, date, comment_text)
+        )))
+
+
+class SqliteCommentSink(CommentSinkMixin, RecordSink):
+    """Comment saver that writes to SQLite in batched transactions.
+
+    Each batch is one executemany upsert keyed on comment_id, so saving
+    the same comment twice (e.g. on a re-crawl) updates it in place.
+
+    The sink also records, per application, whether the last comment crawl
+    reached the oldest comment. scrape_comments only stops a re-crawl at
+    already saved comments when it did, so a crawl that was cut short is
+    finished on the next run.
+
+    Example:
+        >>> with SqliteCommentSink("data/output/comments.db") as saver:
+        ...     scrape_comments(driver, "newham", app_id, url, comments_saver=saver)
+
+    Args:
+        path: SQLite database file
+        batch_size: Number of buffered comments that triggers a write
+        flush_interval: Seconds between writes of a part-full batch
+    """
+
+    def __init__(self, path, batch_size=500, flush_interval=30):
+        super().__init__(batch_size, flush_interval)
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS comments ("
+                "comment_id TEXT PRIMARY KEY, council TEXT, app_id TEXT, "
+                "address TEXT, stance TEXT, date TEXT, comment_text TEXT)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS comments_app_id ON comments (app_id)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS comment_crawls ("
+                "app_id TEXT PRIMARY KEY, complete INTEGER NOT NULL, updated_at REAL NOT NULL)"
+            )
+        self._completed = set()
+
+    def _write_frame(self, frame):
+        columns = ", ".join(COMMENT_COLUMNS)
+        placeholders = ", ".join("?" for _ in COMMENT_COLUMNS)
+        updates = ", ".join(
+            f"{column} = excluded.{column}"
+            for column in COMMENT_COLUMNS if column != "comment_id"
+        )
+        frame = frame[COMMENT_COLUMNS].astype(object).where(frame[COMMENT_COLUMNS].notna(), None)
+        with self._conn:
+            self._conn.executemany(
+                f"INSERT INTO comments ({columns}) VALUES ({placeholders}) "
+                f"ON CONFLICT (comment_id) DO UPDATE SET {updates}",
+                frame.itertuples(index=False, name=None)
+            )
+
+    def known_comment_ids(self, app_id):
+        """Return the IDs of all comments saved (or buffered) for an application."""
+        rows = self._conn.execute(
+            "SELECT comment_id FROM comments WHERE app_id = ?", (app_id,)
+        ).fetchall()
+        known = {row[0] for row in rows}
+        known.update(r["comment_id"] for r in self._buffer if r["app_id"] == app_id)
+        return known
+
+    def comment_crawl_complete(self, app_id):
+        """Check whether the last comment crawl of an application reached its oldest comment."""
+        if app_id in self._completed:
+            return True
+        row = self._conn.execute(
+            "SELECT complete FROM comment_crawls WHERE app_id = ?", (app_id,)
+        ).fetchone()
+        return bool(row and row[0])
+
+    def mark_comment_crawl(self, app_id, complete):
+        """Record whether a comment crawl of an application reached its oldest comment.
+
+        Incomplete crawls are recorded straight away. Complete ones are
+        written with the next batch, after its comments, so an application
+        is never marked complete ahead of the comments it was crawled for.
+        """
+        if complete:
+            self._completed.add(app_id)
+            return
+        self._completed.discard(app_id)
+        self._set_crawl_status([app_id], False)
+
+    def flush(self):
+        # Taken first: write_frame() flushes again before writing the comments
+        completed, self._completed = self._completed, set()
+        super().flush()
+        if completed:
+            self._set_crawl_status(completed, True)
+
+    def _set_crawl_status(self, app_ids, complete):
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO comment_crawls (app_id, complete, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (app_id) DO UPDATE SET "
+                "complete = excluded.complete, updated_at = excluded.updated_at",
+                [(app_id, int(complete), now) for app_id in app_ids]
+            )
+
+    def close(self):
+        super().close()
+        self._conn.close()
+
+
+class ParquetCommentSink(CommentSinkMixin, ParquetSink):
+    """Comment saver that writes to a Parquet file in batches.
+
+    Parquet files can't be updated in place, so duplicates are dropped on
+    comment_id within one sink (i.e. one output file).
+
+    Args:
+        path: Output Parquet path
+        batch_size: Number of buffered comments that triggers a write
+        flush_interval: Seconds between writes of a part-full batch
+    """
+
+    def __init__(self, path, batch_size=5000, flush_interval=60):
+        super().__init__(path, batch_size, flush_interval)
+        self._seen_ids = set()
+
+    def write(self, record):
+        if record["comment_id"] in self._seen_ids:
+            return
+        self._seen_ids.add(record["comment_id"])
+        super().write(record)
+
+
+def _import_pyarrow():
+    """Import pyarrow lazily, as it is only needed for Parquet output."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet output requires pyarrow: pip install pyarrow") from e
+    return pyarrow, pyarrow.parquet
+
+
+def _serialise_nested(frame):
+    """Store dict/list values (e.g. the "extra" column) as JSON strings."""
+    nested = [
+        column for column in frame.columns
+        if frame[column].map(lambda value: isinstance(value, (dict, list))).any()
+    ]
+    if not nested:
+        return frame
+
+    frame = frame.copy()
+    for column in nested:
+        frame[column] = frame[column].map(
+            lambda value: json.dumps(value, default=_json_default)
+            if isinstance(value, (dict, list)) else value
+        )
+    return frame
+
+
+def _json_default(value):
+    """Encode numpy scalars that json can't handle natively."""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialise {type(value).__name__}")
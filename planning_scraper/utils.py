@@ -1,39 +1,97 @@
 import pandas as pd
 import numpy as np
+import re
 import time
 import random
 
+from .registry import get_council
 
-def get_council_url(council, urls_csv="data/input/example_urls.csv"):
-    """Get URL for a council from CSV file.
+
+def get_council_url(council, urls_csv=None):
+    """Get URL for a council from the council registry.
+    
+    The CSV is parsed once and cached (see registry.get_registry).
     
     Args:
         council: Council name (e.g., "newham")
-        urls_csv: Path to CSV file with council URLs
+        urls_csv: Path to CSV file with council URLs (default: the
+            project's data/input/example_urls.csv)
         
     Returns:
         URL string
     """
-    council = council.lower().strip()
-    url_df = pd.read_csv(urls_csv)
-    return url_df[url_df["council"] == council]["url"].values[0]
+    return get_council(council, urls_csv).url
+
+
+# Where Idox and the proxies in front of it put page-level messages: the
+# title, the main heading and Idox's message boxes. User-written content
+# (proposals, comments) never appears there.
+MESSAGE_XPATH = (
+    "//title | //h1"
+    " | //*[contains(concat(' ', normalize-space(@class), ' '), ' messagebox ')]"
+)
+
+# Text of the MESSAGE_XPATH elements in one WebDriver call
+MESSAGE_TEXT_SCRIPT = """
+var nodes = document.evaluate(arguments[0], document, null,
+                              XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var texts = [];
+for (var i = 0; i < nodes.snapshotLength; i++) {
+    texts.push(nodes.snapshotItem(i).textContent);
+}
+return texts.join(" ");
+"""
+
+RATE_LIMIT_PHRASES = ("too many requests", "rate limit", "temporarily blocked")
+
+
+def page_messages(driver):
+    """Return the lower-cased text of a page's title, main heading and message boxes.
+    
+    Args:
+        driver: WebDriver instance, or an lxml page from the HTTP engine
+        
+    Returns:
+        Message text with whitespace collapsed
+    """
+    if hasattr(driver, "xpath"):
+        text = " ".join(element.text_content() for element in driver.xpath(MESSAGE_XPATH))
+    else:
+        text = driver.execute_script(MESSAGE_TEXT_SCRIPT, MESSAGE_XPATH) or ""
+    return " ".join(text.lower().split())
 
 
 def check_rate_limit(driver):
     """Check if page shows rate limit message.
     
+    Only the page's title, main heading and message boxes are checked
+    (see page_messages), so an application whose proposal mentions a
+    footpath being "temporarily blocked" is not mistaken for one.
+    
     Args:
-        driver: WebDriver instance
+        driver: WebDriver instance, or an lxml page from the HTTP engine
         
     Returns:
         True if rate limited, False otherwise
     """
-    page_text = driver.page_source.lower()
-    return (
-        "too many requests" in page_text
-        or "rate limit" in page_text
-        or "temporarily blocked" in page_text
-    )
+    messages = page_messages(driver)
+    return any(phrase in messages for phrase in RATE_LIMIT_PHRASES)
+
+
+def check_too_many_results(driver):
+    """Check if a search page says the search matched too many results.
+    
+    Idox refuses to list searches over its result cap and asks for more
+    search parameters instead. Like check_rate_limit, only the page's
+    messages are checked, not the proposals in a results list.
+    
+    Args:
+        driver: WebDriver instance, or an lxml page from the HTTP engine
+        
+    Returns:
+        True if the search was over the cap, False otherwise
+    """
+    return "too many results" in page_messages(driver)
 
 
 def is_missing(value):
@@ -92,20 +150,67 @@ def get_table_value(driver, label):
     """Extract value from a table by label.
     
     Args:
-        driver: WebDriver instance
+        driver: WebDriver instance, or an lxml page from the HTTP engine
         label: Table header label text
         
     Returns:
         Table cell value or np.nan if not found
     """
+    xpath = f"//th[normalize-space()='{label}']/following-sibling::td"
+    
+    if hasattr(driver, "xpath"):
+        cells = driver.xpath(xpath)
+        value = " ".join(cells[0].text_content().split()) if cells else ""
+        return value if value else np.nan
+    
     from selenium.webdriver.common.by import By
     from selenium.common.exceptions import NoSuchElementException
     
     try:
-        value = driver.find_element(
-            By.XPATH,
-            f"//th[normalize-space()='{label}']/following-sibling::td"
-        ).text.strip()
+        value = driver.find_element(By.XPATH, xpath).text.strip()
         return value if value else np.nan
     except NoSuchElementException:
         return np.nan
+
+
+def normalise_label(label):
+    """Normalise a table label into a dict key.
+    
+    Example:
+        >>> normalise_label("Application Validated")
+        'application_validated'
+    """
+    return re.sub(r'[^a-z0-9]+', '_', label.lower()).strip('_')
+
+
+def get_table_values(driver):
+    """Extract every th/td pair on a page in one pass.
+    
+    Selenium pages are read with a single page_source call rather than one
+    find_element round trip per label.
+    
+    Args:
+        driver: WebDriver instance, or an lxml page from the HTTP engine
+        
+    Returns:
+        Dict of normalised label -> cell value (np.nan for empty cells).
+        If a label appears more than once the first value is kept.
+    """
+    from .fetcher import element_text
+    
+    if hasattr(driver, "xpath"):
+        page = driver
+    else:
+        from lxml import html as lxml_html
+        page = lxml_html.fromstring(driver.page_source)
+    
+    values = {}
+    for header in page.xpath("//th[following-sibling::td]"):
+        key = normalise_label(header.text_content())
+        if not key or key in values:
+            continue
+        cell = header.xpath("following-sibling::td[1]")[0]
+        value = element_text(cell)
+        values[key] = value if value else np.nan
+    
+    return values
@@ -0,0 +1,559 @@
+"""Durable, lease-based work queue for crawls spread over many workers.
+
+Postcode searches and application URLs are queued as tasks. A worker
+leases a task, which hides it from other workers for a visibility
+timeout, and completes or fails it when done. A worker that dies
+mid-task simply lets its lease expire and the task becomes visible
+again, so no work is lost; tasks are unique by (kind, key), so nothing
+is queued or scraped twice.
+
+SqliteWorkQueue keeps the queue in one SQLite file that any number of
+processes can share. Share it between machines only over a filesystem
+with working locks; MemoryWorkQueue is an in-process stand-in with the
+same interface, and other stores can subclass WorkQueue.
+
+    >>> queue = SqliteWorkQueue("data/output/queue.db")
+    >>> queue.add_postcodes("newham", postcodes)
+
+Then on every worker (process or host):
+
+    >>> limiter = SqliteRateLimiter("data/output/queue.db", rates=get_registry().rates())
+    >>> run_worker(SqliteWorkQueue("data/output/queue.db"), engine="http",
+    ...            limiter=limiter, sink=CsvSink(...))
+
+Postcode tasks queue an application task for every URL they find, and
+SqliteRateLimiter keeps each council's request rate global across all
+workers. Workers renew a task's lease while it is still fetching pages,
+so long searches are not handed out again.
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+from .metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+DEAD = "dead"
+
+POSTCODE = "postcode"
+APPLICATION = "application"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    visible_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_token TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (kind, key)
+);
+CREATE INDEX IF NOT EXISTS tasks_visible ON tasks (status, visible_at);
+"""
+
+
+class LeaseLostError(RuntimeError):
+    """The task's lease expired and it may already be running elsewhere."""
+
+
+@dataclass
+class Task:
+    """A leased unit of work.
+
+    Attributes:
+        id: Task id in the store
+        kind: "postcode" or "application"
+        key: Unique key within the kind ("council|postcode" or the URL)
+        payload: Dict of task arguments
+        attempts: Number of leases so far, including this one
+        lease_token: Proves the lease is still ours when completing
+        lease_expires: When the task becomes visible to other workers
+    """
+    id: int
+    kind: str
+    key: str
+    payload: dict
+    attempts: int
+    lease_token: str
+    lease_expires: float
+
+
+class WorkQueue:
+    """Interface of a lease-based work queue.
+
+    Subclasses store the tasks; this class adds the postcode/URL helpers
+    and the retry policy.
+
+    Args:
+        lease_seconds: Visibility timeout of a lease
+        max_attempts: Leases before a task is given up on (marked dead)
+        retry_delay: Seconds before a failed task is retried; doubled on
+            each further attempt
+    """
+
+    def __init__(self, lease_seconds=600, max_attempts=5, retry_delay=60):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def put(self, kind, tasks):
+        """Queue tasks, skipping keys already queued.
+
+        Args:
+            kind: Task kind
+            tasks: Iterable of (key, payload dict) pairs
+
+        Returns:
+            Number of tasks added
+        """
+        raise NotImplementedError
+
+    def lease(self, worker_id, kinds=None, lease_seconds=None):
+        """Lease the next visible task, or return None if there is none.
+
+        Args:
+            worker_id: Name of the leasing worker (for inspection)
+            kinds: Optional list of kinds to take
+            lease_seconds: Override of the queue's visibility timeout
+        """
+        raise NotImplementedError
+
+    def extend(self, task, seconds=None):
+        """Push back a lease's expiry; returns False if the lease was lost."""
+        raise NotImplementedError
+
+    def complete(self, task, result=None):
+        """Mark a leased task done with its result; returns False if the lease was lost."""
+        raise NotImplementedError
+
+    def fail(self, task, error=None, retry=True):
+        """Give a leased task back after an error.
+
+        It is retried after retry_delay (doubling per attempt) unless retry
+        is False or it has had max_attempts, in which case it is dead.
+
+        Returns:
+            False if the lease was lost
+        """
+        raise NotImplementedError
+
+    def counts(self):
+        """Return a dict of status -> number of tasks."""
+        raise NotImplementedError
+
+    def results(self, kind):
+        """Yield (key, result) for every done task of a kind."""
+        raise NotImplementedError
+
+    def add_postcodes(self, council, postcodes):
+        """Queue postcode searches for a council."""
+        return self.put(POSTCODE, (
+            (f"{council.lower().strip()}|{postcode}", {"council": council, "postcode": postcode})
+            for postcode in postcodes
+        ))
+
+    def add_urls(self, urls, council=None):
+        """Queue application detail scrapes."""
+        return self.put(APPLICATION, ((url, {"url": url, "council": council}) for url in urls))
+
+    def _after_failure(self, attempts, retry, now):
+        """Return (status, visible_at) for a task that failed its latest attempt."""
+        if not retry or attempts >= self.max_attempts:
+            return DEAD, now
+        return PENDING, now + self.retry_delay * 2 ** (attempts - 1)
+
+
+class SqliteWorkQueue(WorkQueue):
+    """WorkQueue in SQLite (WAL mode), safe to share between processes.
+
+    Leases are taken in an IMMEDIATE transaction, so two workers never
+    get the same task.
+
+    Args:
+        path: SQLite database file (e.g. "data/output/queue.db")
+        lease_seconds: Visibility timeout of a lease
+        max_attempts: Leases before a task is marked dead
+        retry_delay: Seconds before a failed task is retried (doubling)
+    """
+
+    def __init__(self, path, lease_seconds=600, max_attempts=5, retry_delay=60):
+        super().__init__(lease_seconds, max_attempts, retry_delay)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def put(self, kind, tasks):
+        now = time.time()
+        rows = [(kind, key, json.dumps(payload), PENDING, now, now, now) for key, payload in tasks]
+        with self._lock, self._transaction():
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tasks "
+                "(kind, key, payload, status, visible_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            return self._conn.total_changes - before
+
+    def lease(self, worker_id, kinds=None, lease_seconds=None):
+        lease_seconds = lease_seconds or self.lease_seconds
+        kind_filter, kind_args = "", []
+        if kinds:
+            kind_filter = f" AND kind IN ({', '.join('?' * len(kinds))})"
+            kind_args = list(kinds)
+
+        with self._lock, self._transaction():
+            while True:
+                now = time.time()
+                row = self._conn.execute(
+                    "SELECT id, kind, key, payload, attempts FROM tasks "
+                    f"WHERE status IN (?, ?) AND visible_at <= ?{kind_filter} "
+                    "ORDER BY visible_at, id LIMIT 1",
+                    [PENDING, LEASED, now, *kind_args]
+                ).fetchone()
+                if row is None:
+                    return None
+
+                task_id, kind, key, payload, attempts = row
+                if attempts >= self.max_attempts:
+                    # Its last lease expired without an answer
+                    self._conn.execute(
+                        "UPDATE tasks SET status = ?, error = ?, lease_token = NULL, "
+                        "updated_at = ? WHERE id = ?",
+                        (DEAD, "Lease expired on the last attempt", now, task_id)
+                    )
+                    continue
+
+                token = uuid.uuid4().hex
+                expires = now + lease_seconds
+                self._conn.execute(
+                    "UPDATE tasks SET status = ?, attempts = attempts + 1, visible_at = ?, "
+                    "lease_owner = ?, lease_token = ?, updated_at = ? WHERE id = ?",
+                    (LEASED, expires, worker_id, token, now, task_id)
+                )
+                return Task(task_id, kind, key, json.loads(payload), attempts + 1, token, expires)
+
+    def extend(self, task, seconds=None):
+        expires = time.time() + (seconds or self.lease_seconds)
+        if not self._update_leased(task, "visible_at = ?", (expires,)):
+            return False
+        task.lease_expires = expires
+        return True
+
+    def complete(self, task, result=None):
+        return self._update_leased(
+            task, "status = ?, result = ?, lease_token = NULL",
+            (DONE, json.dumps(result, default=str))
+        )
+
+    def fail(self, task, error=None, retry=True):
+        status, visible_at = self._after_failure(task.attempts, retry, time.time())
+        return self._update_leased(
+            task, "status = ?, visible_at = ?, error = ?, lease_token = NULL",
+            (status, visible_at, str(error) if error else None)
+        )
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM tasks GROUP BY status"
+            ).fetchall()
+        return {status: 0 for status in (PENDING, LEASED, DONE, DEAD)} | dict(rows)
+
+    def results(self, kind):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, result FROM tasks WHERE kind = ? AND status = ? ORDER BY id",
+                (kind, DONE)
+            ).fetchall()
+        for key, result in rows:
+            yield key, json.loads(result) if result is not None else None
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _update_leased(self, task, assignments, args):
+        """Update a task only while task's lease is still the current one."""
+        with self._lock, self._transaction():
+            cursor = self._conn.execute(
+                f"UPDATE tasks SET {assignments}, updated_at = ? "
+                "WHERE id = ? AND status = ? AND lease_token = ?",
+                (*args, time.time(), task.id, LEASED, task.lease_token)
+            )
+            return cursor.rowcount == 1
+
+    def _transaction(self):
+        return _ImmediateTransaction(self._conn)
+
+
+class _ImmediateTransaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back if the block raises."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, *exc):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+class MemoryWorkQueue(WorkQueue):
+    """In-process WorkQueue with the same semantics as SqliteWorkQueue.
+
+    A stand-in for tests and single-process crawls; tasks are lost when
+    the process exits.
+    """
+
+    def __init__(self, lease_seconds=600, max_attempts=5, retry_delay=60):
+        super().__init__(lease_seconds, max_attempts, retry_delay)
+        self._tasks = {}
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def put(self, kind, tasks):
+        added = 0
+        now = time.time()
+        with self._lock:
+            for key, payload in tasks:
+                if (kind, key) in self._keys:
+                    continue
+                task_id = len(self._tasks) + 1
+                self._keys[kind, key] = task_id
+                self._tasks[task_id] = {
+                    "kind": kind, "key": key, "payload": payload, "status": PENDING,
+                    "attempts": 0, "visible_at": now, "lease_token": None,
+                    "result": None, "error": None,
+                }
+                added += 1
+        return added
+
+    def lease(self, worker_id, kinds=None, lease_seconds=None):
+        lease_seconds = lease_seconds or self.lease_seconds
+        with self._lock:
+            now = time.time()
+            visible = [
+                (task["visible_at"], task_id) for task_id, task in self._tasks.items()
+                if task["status"] in (PENDING, LEASED) and task["visible_at"] <= now
+                and (not kinds or task["kind"] in kinds)
+            ]
+            for _, task_id in sorted(visible):
+                task = self._tasks[task_id]
+                if task["attempts"] >= self.max_attempts:
+                    task.update(status=DEAD, error="Lease expired on the last attempt",
+                                lease_token=None)
+                    continue
+                task.update(status=LEASED, attempts=task["attempts"] + 1,
+                            visible_at=now + lease_seconds, lease_token=uuid.uuid4().hex)
+                return Task(task_id, task["kind"], task["key"], task["payload"],
+                            task["attempts"], task["lease_token"], task["visible_at"])
+        return None
+
+    def extend(self, task, seconds=None):
+        expires = time.time() + (seconds or self.lease_seconds)
+        if not self._update_leased(task, visible_at=expires):
+            return False
+        task.lease_expires = expires
+        return True
+
+    def complete(self, task, result=None):
+        return self._update_leased(task, status=DONE, result=result, lease_token=None)
+
+    def fail(self, task, error=None, retry=True):
+        status, visible_at = self._after_failure(task.attempts, retry, time.time())
+        return self._update_leased(task, status=status, visible_at=visible_at,
+                                   error=str(error) if error else None, lease_token=None)
+
+    def counts(self):
+        counts = {status: 0 for status in (PENDING, LEASED, DONE, DEAD)}
+        with self._lock:
+            for task in self._tasks.values():
+                counts[task["status"]] += 1
+        return counts
+
+    def results(self, kind):
+        with self._lock:
+            done = [
+                (task["key"], task["result"]) for task in self._tasks.values()
+                if task["kind"] == kind and task["status"] == DONE
+            ]
+        yield from done
+
+    def _update_leased(self, task, **changes):
+        with self._lock:
+            stored = self._tasks.get(task.id)
+            if (stored is None or stored["status"] != LEASED
+                    or stored["lease_token"] != task.lease_token):
+                return False
+            stored.update(changes)
+            return True
+
+
+def default_worker_id():
+    """Return "hostname:pid", identifying a worker across machines."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_worker(queue, worker_id=None, engine="selenium", os_type="mac", limiter=None,
+               urls_csv=None, cache=None, sink=None, kinds=None, expand_searches=True,
+               idle_timeout=0, poll_interval=5, max_tasks=None):
+    """Lease and run tasks from a queue until it is empty.
+
+    Postcode tasks search the council's site; with expand_searches each
+    URL found is queued as an application task (deduplicated across all
+    workers by the queue). Application tasks scrape the summary and
+    further info pages. Failed tasks go back to the queue for a retry.
+
+    Args:
+        queue: WorkQueue shared with the other workers
+        worker_id: Name recorded on leases (default: hostname:pid)
+        engine: "selenium" or "http"
+        os_type: "mac" or "linux"
+        limiter: Rate limiter; use a SqliteRateLimiter on the shared
+            database to keep each council's rate global across workers
+            (if None, a HostRateLimiter using the registry's per-council
+            rates is created)
+        urls_csv: Council registry CSV
+        cache: Optional PageCache
+        sink: Optional RecordSink that application rows are written to
+            once their task is completed
+        kinds: Optional list of task kinds to work on
+        expand_searches: Queue the URLs found by postcode tasks
+        idle_timeout: Seconds to keep polling an empty queue (e.g. while
+            other workers may still queue URLs) before returning
+        poll_interval: Seconds between polls of an empty queue
+        max_tasks: Stop after this many tasks
+
+    Returns:
+        Dict of outcome -> number of tasks (done, failed, lost)
+    """
+    from .registry import get_registry
+    from .scheduler import HostRateLimiter
+    from .scraper import open_client
+
+    if limiter is None:
+        limiter = HostRateLimiter(rates=get_registry(urls_csv).rates())
+
+    worker_id = worker_id or default_worker_id()
+    outcomes = {"done": 0, "failed": 0, "lost": 0}
+    client = open_client(engine, os_type)
+    idle_since = None
+    try:
+        while max_tasks is None or sum(outcomes.values()) < max_tasks:
+            task = queue.lease(worker_id, kinds)
+            if task is None:
+                idle_since = idle_since or time.monotonic()
+                if time.monotonic() - idle_since >= idle_timeout:
+                    break
+                time.sleep(poll_interval)
+                continue
+            idle_since = None
+
+            outcome = _run_task(queue, task, client, limiter, urls_csv, cache, sink,
+                                expand_searches)
+            outcomes[outcome] += 1
+            metrics.inc("queue_tasks_total", kind=task.kind, outcome=outcome)
+    finally:
+        client.quit()
+
+    logger.info("Worker %s finished: %s", worker_id, outcomes)
+    return outcomes
+
+
+def _run_task(queue, task, client, limiter, urls_csv, cache, sink, expand_searches):
+    """Run one leased task and report it to the queue; returns its outcome."""
+    from .fetcher import TooManyResultsError
+    from .registry import get_council
+    from .scraper import scrape_application, search_postcode
+
+    limiter = _LeaseKeeper(queue, task, limiter)
+    try:
+        if task.kind == POSTCODE:
+            council = task.payload["council"]
+            result = search_postcode(client, get_council(council, urls_csv),
+                                     task.payload["postcode"], limiter)
+            if result is None:
+                raise RuntimeError("Postcode search failed")
+            if expand_searches:
+                queue.add_urls(result, council)
+        elif task.kind == APPLICATION:
+            result = scrape_application(client, task.payload["url"], limiter, cache=cache,
+                                        refresh=task.attempts > 1)
+        else:
+            raise ValueError(f"Unknown task kind: {task.kind}")
+    except Exception as e:
+        logger.warning("Task %s %s failed (attempt %d): %s", task.kind, task.key, task.attempts, e)
+        # A search over the result cap fails the same way every time
+        retry = not isinstance(e, TooManyResultsError)
+        return "failed" if queue.fail(task, e, retry=retry) else "lost"
+
+    if not queue.complete(task, result):
+        logger.warning("Lease on %s %s expired before it finished", task.kind, task.key)
+        return "lost"
+    if sink is not None and task.kind == APPLICATION:
+        sink.write(result)
+    return "done"
+
+
+class _LeaseKeeper:
+    """Rate limiter wrapper that renews a task's lease before each request.
+
+    Every request of a task goes through the limiter, so a task that is
+    still fetching pages keeps its lease however long it runs, while a
+    worker stuck on one request lets it expire.
+
+    Args:
+        queue: WorkQueue the task was leased from
+        task: The leased Task
+        limiter: Rate limiter to delegate to
+    """
+
+    def __init__(self, queue, task, limiter):
+        self.queue = queue
+        self.task = task
+        self.limiter = limiter
+
+    def acquire(self, url):
+        """Renew the lease once half of it has gone, then wait on the limiter.
+
+        Raises:
+            LeaseLostError: If the lease expired and the task was handed out again
+        """
+        if self.task.lease_expires - time.time() < self.queue.lease_seconds / 2:
+            if not self.queue.extend(self.task):
+                raise LeaseLostError(f"Lease on {self.task.kind} {self.task.key} was lost")
+            logger.debug("Renewed lease on %s %s", self.task.kind, self.task.key)
+        return self.limiter.acquire(url)
+
+    def __getattr__(self, name):
+        return getattr(self.limiter, name)
@@ -0,0 +1,47 @@
+"""Shared fixtures: a local Idox stand-in site and a registry CSV pointing at it."""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+from idox_server import IdoxStandIn  # noqa: E402
+from planning_scraper import scraper  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def no_pauses(monkeypatch):
+    """Skip the politeness pauses and backoffs so tests run quickly."""
+    monkeypatch.setattr(scraper, "pause", lambda *args, **kwargs: None)
+    monkeypatch.setattr(scraper, "backoff", lambda *args, **kwargs: None)
+
+
+@pytest.fixture
+def make_site():
+    """Start IdoxStandIn sites with the given options; they are stopped afterwards."""
+    sites = []
+
+    def start(**options):
+        site = IdoxStandIn(**options)
+        site.start()
+        sites.append(site)
+        return site
+
+    yield start
+    for site in sites:
+        site.stop()
+
+
+@pytest.fixture
+def urls_csv(tmp_path):
+    """Return a function that writes a registry CSV for a stand-in site."""
+    def write(site, council="standin"):
+        path = tmp_path / "urls.csv"
+        path.write_text(f"council,url\n{council},{site.url}\n")
+        return str(path)
+
+    return write
+
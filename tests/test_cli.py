@@ -0,0 +1,29 @@
+"""Tests for the command-line batch runner."""
+
+import sqlite3
+
+from planning_scraper import cli
+
+
+def test_comment_rerun_stops_at_saved_comments(make_site, tmp_path):
+    site = make_site(comments_per_app=20)
+    apps = sorted(site.applications, key=lambda app: app["comment_count"])[-3:]
+    jobs = tmp_path / "jobs.txt"
+    jobs.write_text("".join(
+        f"{site.url}/applicationDetails.do?activeTab=summary&keyVal={app['key_val']}\n"
+        for app in apps
+    ))
+    output = str(tmp_path / "comments.db")
+    argv = ["comments", str(jobs), "-o", output, "-w", "1", "--rate", "1000"]
+
+    assert cli.main(argv) == 0
+    with sqlite3.connect(output) as conn:
+        saved = conn.execute("SELECT COUNT(*) FROM comments").fetchone()[0]
+        complete = conn.execute("SELECT COUNT(*) FROM comment_crawls WHERE complete").fetchone()[0]
+    assert saved == sum(app["comment_count"] for app in apps)
+    assert complete == len(apps)
+
+    # Each application's first page is all saved comments, so it stops there
+    before = site.stats["requests"]
+    assert cli.main(argv) == 0
+    assert site.stats["requests"] - before == len(apps)
@@ -0,0 +1,33 @@
+"""Tests for the lxml page helpers used by the HTTP engine."""
+
+import pytest
+from lxml import html as lxml_html
+
+from planning_scraper.fetcher import element_text, parse_comments
+
+
+@pytest.mark.parametrize("markup, expected", [
+    ("<p>I object.<br>Too tall.</p>", "I object. Too tall."),
+    ("<div><p>One</p><p>two</p>three</div>", "One two three"),
+    ("<td>An <b>emph</b>asised\n  word<!-- note --></td>", "An emphasised word"),
+    ("<span>  plain\xa0text </span>", "plain text"),
+])
+def test_element_text_breaks_words_like_a_browser(markup, expected):
+    assert element_text(lxml_html.fragment_fromstring(markup)) == expected
+
+
+def test_parse_comments_keeps_line_breaks_as_spaces():
+    page = lxml_html.fromstring(
+        '<div id="comments"><div class="comment">'
+        '<h3>Comment submitted date: Mon 01 Jan 2024</h3>'
+        '<p class="consultationAddress">1 High Street,<br>London E13 0AA</p>'
+        '<p class="consultationStance">(Objects)</p>'
+        '<p class="comment-text">I object.<br>Too tall.</p>'
+        '</div></div>'
+    )
+    assert parse_comments(page) == [{
+        "text": "I object. Too tall.",
+        "address": "1 High Street, London E13 0AA",
+        "stance": "Objects",
+        "date": "Mon 01 Jan 2024",
+    }]
@@ -0,0 +1,175 @@
+"""Tests for the vectorised address processing."""
+
+import numpy as np
+import pandas as pd
+
+from planning_scraper import geolocator
+from planning_scraper.geolocator import (
+    WHITESPACE_CHARS, PostcodeIndex, SpatialIndex, build_postcode_index, calculate_distance,
+    clean_address, cluster_addresses, extract_postcode, haversine, normalise_postcodes, parse_address,
+    process_address_dataframe
+)
+
+
+ADDRESSES = [
+    "12 High Street, Stratford, London E13 0AG",
+    "12\xa0High Street,\xa0Stratford,\xa0London\xa0E13\xa00AG",
+    "7 Mill Lane\n,\xa0Peckham , London se15\xa04st\xa0",
+    "3\x0bChurch Lane, , Brixton,London SW2 1RW",
+    "5\x1fStation Road,\x1fForest Gate\x1f, London E7\u20099AB",
+    None,
+]
+
+
+def test_process_address_dataframe_matches_row_wise_helpers_with_unicode_spaces():
+    result = process_address_dataframe(pd.DataFrame({"address": ADDRESSES}))
+
+    for row, address in zip(result.itertuples(), ADDRESSES):
+        if address is None:
+            assert pd.isna(row.postcode)
+            assert row.cleaned_address == ""
+            continue
+        parsed = parse_address(address)
+        assert row.postcode == extract_postcode(address)
+        assert row.street == parsed.street
+        assert row.city == parsed.city
+        assert row.cleaned_address == clean_address(address)
+
+
+def test_non_breaking_spaces_give_the_same_address():
+    result = process_address_dataframe(pd.DataFrame({"address": ADDRESSES[:2]}))
+
+    assert result.loc[0, "postcode"] == result.loc[1, "postcode"] == "E13 0AG"
+    assert result.loc[0, "city"] == result.loc[1, "city"]
+    assert result.loc[0, "cleaned_address"] == result.loc[1, "cleaned_address"]
+
+
+def test_whitespace_chars_are_everything_python_counts_as_whitespace():
+    assert WHITESPACE_CHARS == "".join(chr(c) for c in range(0x110000) if chr(c).isspace())
+
+
+def test_normalise_postcodes_removes_unicode_spaces():
+    keys = normalise_postcodes(["E13 0AG", "e13\xa00ag", "E13\u20090AG ", "not a postcode", None])
+    assert list(keys) == [b"E130AG", b"E130AG", b"E130AG", b"", b""]
+
+
+def test_postcode_index_looks_up_postcodes_in_any_spacing(tmp_path):
+    csv_path = tmp_path / "postcodes.csv"
+    csv_path.write_text(
+        "pcds,lat,long\n"
+        "E13 0AG,51.52,0.02\n"
+        "SE15 4ST,51.47,-0.06\n"
+        "ZZ99 9ZZ,99.999999,0\n"
+        "E13 0AG,1.0,1.0\n"
+    )
+    index_path = str(tmp_path / "postcodes.idx")
+    assert build_postcode_index(str(csv_path), index_path) == 2
+
+    lats, lons = PostcodeIndex(index_path).lookup(["se15\xa04st", "E13 0AG", "ZZ99 9ZZ", None])
+    np.testing.assert_allclose(lats[:2], [51.47, 51.52], atol=1e-5)
+    np.testing.assert_allclose(lons[:2], [-0.06, 0.02], atol=1e-5)
+    assert np.isnan(lats[2:]).all()
+
+
+def test_public_names_are_exported():
+    assert [name for name in geolocator.__all__ if not hasattr(geolocator, name)] == []
+    assert {"Address", "extract_postcode", "parse_address", "validate_postcode"} <= set(geolocator.__all__)
+
+
+def random_points(n, seed=0, missing=True):
+    """Points scattered over Greater London, optionally with some missing coordinates."""
+    rng = np.random.default_rng(seed)
+    lats = rng.uniform(51.3, 51.7, n)
+    lons = rng.uniform(-0.5, 0.3, n)
+    if missing:
+        lats[::97] = np.nan
+    return lats, lons
+
+
+# Inside the data, on its edge and well outside it
+QUERIES = [(51.5413, 0.0088), (51.3, -0.5), (51.5, -0.1278), (52.2, 0.1218)]
+
+
+def test_spatial_index_radius_query_matches_brute_force():
+    lats, lons = random_points(2000)
+    index = SpatialIndex(lats, lons, labels=np.arange(2000) + 100, cell_size_km=0.5)
+    assert len(index) == np.isfinite(lats).sum()
+
+    for lat, lon in QUERIES:
+        for radius in (0.1, 0.5, 2.0, 10.0):
+            distances = haversine(lat, lon, lats, lons)
+            expected = np.flatnonzero(distances <= radius) + 100
+
+            labels, found = index.query_radius(lat, lon, radius)
+            assert sorted(labels) == sorted(expected)
+            assert np.all(np.diff(found) >= 0)
+            np.testing.assert_allclose(found, distances[labels - 100])
+
+
+def test_spatial_index_knn_query_matches_brute_force():
+    lats, lons = random_points(2000, seed=1)
+    index = SpatialIndex(lats, lons, cell_size_km=0.25)
+    valid = np.isfinite(lats)
+
+    for lat, lon in QUERIES:
+        distances = np.where(valid, haversine(lat, lon, lats, lons), np.inf)
+        for k in (1, 5, 50):
+            labels, found = index.query_knn(lat, lon, k)
+            np.testing.assert_allclose(found, np.sort(distances)[:k])
+            np.testing.assert_allclose(distances[labels], found)
+
+    labels, _ = index.query_knn(51.5, 0.0, 10 ** 6)
+    assert len(labels) == valid.sum()
+    assert len(SpatialIndex([], []).query_knn(51.5, 0.0, 3)[0]) == 0
+
+
+def test_spatial_index_from_dataframe_returns_index_labels():
+    df = pd.DataFrame({"lat": [51.5413, 51.5420, np.nan, 51.60],
+                       "lon": [0.0088, 0.0090, 0.0, 0.01]}, index=["a", "b", "c", "d"])
+    index = SpatialIndex.from_dataframe(df)
+
+    labels, _ = index.query_radius(51.5413, 0.0088, 1.0)
+    assert list(labels) == ["a", "b"]
+    assert list(index.query_knn(51.5413, 0.0088, 3)[0]) == ["a", "b", "d"]
+
+
+def test_haversine_matches_the_scalar_distance():
+    lats, lons = random_points(20, seed=2, missing=False)
+    expected = [calculate_distance(51.5, -0.12, lat, lon) for lat, lon in zip(lats, lons)]
+    np.testing.assert_allclose(haversine(51.5, -0.12, lats, lons), expected)
+
+
+def test_cluster_addresses_groups_the_same_property():
+    clusters = cluster_addresses([
+        "Flat 1, 2 High St, London E13 0AG",
+        "1/2 High Street London E13 0AG",
+        "FLAT 1 2 HIGH STREET LONDON E130AG",
+        "2 High St, London E13 0AG",
+        "Flat 1, 2 High St, London SW2 1RW",
+        "5 Mill Lane",
+        "5 mill ln",
+        "5 Mill Road",
+        None,
+        "  ",
+    ])
+
+    assert list(clusters[:3]) == [0, 0, 0]
+    # A different number or postcode is a different property
+    assert len(set(clusters[:5])) == 3
+    # Without a postcode only the same numbers and words match
+    assert clusters[5] == clusters[6] != clusters[7]
+    assert list(clusters[8:]) == [-1, -1]
+    assert sorted(set(clusters[:8])) == list(range(5))
+
+
+def test_cluster_addresses_threshold_and_block_size():
+    addresses = pd.Series([
+        "2 High Street, Stratford, London E13 0AG",
+        "2 High St, London E13 0AG",
+        "2 High Street London E13 0AG",
+    ], index=[10, 20, 30])
+
+    assert len(set(cluster_addresses(addresses))) == 1
+    assert len(set(cluster_addresses(addresses, threshold=1.0))) == 2
+    # Oversized blocks only merge identical words
+    assert list(cluster_addresses(addresses, max_block_size=2)) == [0, 1, 1]
@@ -0,0 +1,103 @@
+"""Tests for the priority refresh scheduler."""
+
+from datetime import datetime, timedelta
+
+from planning_scraper.refresh import DAY, RefreshScheduler
+
+
+NOW = datetime(2024, 6, 3, 12).timestamp()
+
+
+def validated(days_ago):
+    """Idox-style validated date that many days before NOW."""
+    return (datetime.fromtimestamp(NOW) - timedelta(days=days_ago)).strftime("%a %d %b %Y")
+
+
+def row(url, days_ago=None, decision=None, app_type="Full Planning Permission", **fields):
+    return {
+        "url": url, "reference": f"REF-{url}", "app_type": app_type, "decision": decision,
+        "date_validated": validated(days_ago) if days_ago is not None else None, **fields,
+    }
+
+
+def test_new_urls_come_first_then_undecided_closest_to_their_decision(tmp_path):
+    with RefreshScheduler(str(tmp_path / "refresh.db"), near_interval=0, early_interval=0,
+                          overdue_interval=0) as scheduler:
+        # Expected decisions 8 weeks after validation: 2 and 10 days away, 40 days past,
+        # and a major application (13 weeks) 35 days away
+        for url, days_ago in (("soon", 54), ("later", 46), ("overdue", 96)):
+            scheduler.add([url], now=NOW - DAY)
+            scheduler.record(row(url, days_ago), now=NOW - DAY)
+        scheduler.record(row("major", 56, app_type="Major Development"), now=NOW - DAY)
+        scheduler.add(["new"], now=NOW)
+
+        assert scheduler.next_batch(10, now=NOW) == ["new", "soon", "later", "major", "overdue"]
+        assert scheduler.next_batch(5, now=NOW) == ["new", "soon"]
+        assert scheduler.counts(now=NOW) == {"tracked": 5, "undecided": 5, "decided": 0, "due": 5}
+
+
+def test_next_check_depends_on_the_expected_decision_date(tmp_path):
+    scheduler = RefreshScheduler(str(tmp_path / "refresh.db"), near_interval=1, early_interval=7,
+                                 overdue_interval=3, window_days=14)
+    scheduler.record(row("near", 50), now=NOW)
+    scheduler.record(row("early", 0), now=NOW)
+    scheduler.record(row("window", 40), now=NOW)
+    scheduler.record(row("overdue", 90), now=NOW)
+    scheduler.record(row("undated"), now=NOW)
+
+    def due(days):
+        return set(scheduler.next_batch(100, now=NOW + days * DAY))
+
+    assert due(0.5) == set()
+    assert due(1) == {"near"}
+    # Due at the start of its window rather than a full early_interval later
+    assert due(2) == {"near", "window"}
+    assert due(3) == {"near", "window", "overdue"}
+    assert due(6.9) == {"near", "window", "overdue"}
+    assert due(7) == {"near", "window", "overdue", "early", "undated"}
+    scheduler.close()
+
+
+def test_decided_applications_are_only_rechecked_with_an_interval(tmp_path):
+    scheduler = RefreshScheduler(str(tmp_path / "never.db"))
+    scheduler.record(row("decided", 90, decision="Granted"), now=NOW)
+    assert scheduler.next_batch(100, now=NOW + 365 * DAY) == []
+    assert scheduler.counts(now=NOW)["decided"] == 1
+    scheduler.close()
+
+    scheduler = RefreshScheduler(str(tmp_path / "monthly.db"), decided_interval=30)
+    scheduler.record(row("decided", 90, decision="Granted"), now=NOW)
+    assert scheduler.next_batch(100, now=NOW + 29 * DAY) == []
+    assert scheduler.next_batch(100, now=NOW + 30 * DAY) == ["decided"]
+    scheduler.close()
+
+
+def test_failed_scrapes_are_retried_and_changes_detected(tmp_path):
+    with RefreshScheduler(str(tmp_path / "refresh.db"), retry_interval=2) as scheduler:
+        scheduler.add(["app"], now=NOW)
+        assert not scheduler.record({"url": "app", "reference": None}, now=NOW)
+        assert scheduler.next_batch(100, now=NOW + DAY) == []
+        assert scheduler.next_batch(100, now=NOW + 2 * DAY) == ["app"]
+
+        assert not scheduler.record(row("app", 20), now=NOW + 2 * DAY)
+        assert not scheduler.record(row("app", 20), now=NOW + 3 * DAY)
+        assert scheduler.record(row("app", 20, decision="Refused"), now=NOW + 4 * DAY)
+        assert scheduler.state("app")["decision"] == "Refused"
+        assert scheduler.state("unknown") is None
+
+
+def test_run_scrapes_the_next_batch_and_records_it(make_site, tmp_path):
+    site = make_site()
+    base = f"{site.url}/applicationDetails.do?activeTab=summary&keyVal="
+    urls = [base + app["key_val"] for app in site.applications[:6]]
+
+    with RefreshScheduler(str(tmp_path / "refresh.db")) as scheduler:
+        scheduler.add(urls)
+        rows = list(scheduler.run(budget=8, engine="http"))
+
+        references = {base + app["key_val"]: app["reference"] for app in site.applications}
+        scraped = {scraped["url"] for scraped in rows}
+        assert len(scraped) == 4
+        assert all(scheduler.state(url)["reference"] == references[url] for url in scraped)
+        # Scraped applications aren't due again straight away
+        assert set(scheduler.next_batch(100)) == set(urls) - scraped
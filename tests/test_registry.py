@@ -0,0 +1,78 @@
+"""Tests for the cached council registry."""
+
+import os
+
+import pytest
+
+from planning_scraper.registry import (
+    DEFAULT_PAGE_SIZE_PARAM, DEFAULT_SELECTORS, REGISTRY_ENV_VAR, CouncilRegistry,
+    default_registry_path, get_registry
+)
+
+
+NEWHAM = "https://pa.newham.gov.uk/online-applications"
+LAMBETH = "https://planning.lambeth.gov.uk/online-applications"
+
+
+def write_csv(path, text):
+    path.write_text(text)
+    # Make every rewrite visible, however quickly it follows the last
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    return str(path)
+
+
+def test_optional_columns_and_case_insensitive_lookup(tmp_path):
+    path = write_csv(tmp_path / "urls.csv", (
+        "council,url,page_size,rate,selector_next_link\n"
+        f" Newham ,{NEWHAM},100,0.5,//a[@rel='next']\n"
+        f"lambeth,{LAMBETH},,,\n"
+    ))
+    registry = CouncilRegistry(path)
+
+    newham = registry.get("NEWHAM ")
+    assert (newham.name, newham.url, newham.page_size, newham.rate) == ("newham", NEWHAM, 100, 0.5)
+    assert newham.selector("next_link") == "//a[@rel='next']"
+    assert newham.selector("search_input") == DEFAULT_SELECTORS["search_input"]
+
+    lambeth = registry.get("Lambeth")
+    assert (lambeth.page_size, lambeth.rate) == (None, None)
+    assert lambeth.page_size_param == DEFAULT_PAGE_SIZE_PARAM
+    assert lambeth.selectors == DEFAULT_SELECTORS
+
+    assert "newham" in registry and "hackney" not in registry
+    assert registry.rates() == {NEWHAM: 0.5}
+    with pytest.raises(KeyError, match="hackney"):
+        registry.get("hackney")
+
+
+def test_registry_reloads_when_the_file_changes(tmp_path):
+    csv_path = tmp_path / "urls.csv"
+    path = write_csv(csv_path, f"council,url,rate\nnewham,{NEWHAM},0.5\n")
+    registry = CouncilRegistry(path, check_interval=0)
+    assert registry.names() == ["newham"]
+
+    write_csv(csv_path, f"council,url,rate\nnewham,{NEWHAM},1\nlambeth,{LAMBETH},0.25\n")
+    assert registry.names() == ["newham", "lambeth"]
+    assert registry.rates() == {NEWHAM: 1.0, LAMBETH: 0.25}
+
+
+def test_registry_checks_the_file_at_most_every_interval(tmp_path):
+    csv_path = tmp_path / "urls.csv"
+    path = write_csv(csv_path, f"council,url\nnewham,{NEWHAM}\n")
+    registry = CouncilRegistry(path, check_interval=3600)
+
+    write_csv(csv_path, f"council,url\nlambeth,{LAMBETH}\n")
+    assert registry.names() == ["newham"]
+    registry.reload()
+    assert registry.names() == ["lambeth"]
+
+
+def test_get_registry_shares_one_registry_per_file(tmp_path, monkeypatch):
+    path = write_csv(tmp_path / "urls.csv", f"council,url\nnewham,{NEWHAM}\n")
+    monkeypatch.chdir(tmp_path)
+    assert get_registry("urls.csv") is get_registry(path)
+
+    monkeypatch.setenv(REGISTRY_ENV_VAR, path)
+    assert default_registry_path() == path
+    assert get_registry() is get_registry(path)
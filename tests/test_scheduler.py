@@ -0,0 +1,163 @@
+"""Tests for the per-host rate limiters."""
+
+import json
+import sqlite3
+import time
+
+import pytest
+
+from planning_scraper.scheduler import (
+    AdaptiveRateLimiter, HostRateLimiter, SqliteRateLimiter, TokenBucket, crawl_councils
+)
+
+
+URL = "https://planning.example.gov.uk/online-applications/"
+
+
+def saved_rates(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_token_bucket_allows_a_burst_then_queues_callers():
+    bucket = TokenBucket(rate=10, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    # Later callers queue behind each other instead of all waking at once
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+    bucket.set_rate(100)
+    assert bucket.reserve() == pytest.approx(0.03, abs=0.01)
+
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_token_bucket_block_holds_back_requests():
+    bucket = TokenBucket(rate=1000, burst=5)
+    bucket.block(0.5)
+    assert bucket.reserve() == pytest.approx(0.5, abs=0.05)
+
+
+def test_host_limiter_paces_each_host_separately():
+    limiter = HostRateLimiter(rate=1000, rates={URL: 2})
+    other = "https://other.example.gov.uk/online-applications/search.do"
+
+    assert limiter.bucket(URL + "applicationDetails.do") is limiter.bucket(URL.upper())
+    assert limiter.bucket(URL).rate == 2
+    assert limiter.bucket(other).rate == 1000
+
+    limiter.acquire(URL)
+    assert limiter.bucket(URL).reserve() == pytest.approx(0.5, abs=0.05)
+    assert limiter.bucket(other).reserve() == 0
+
+    # A rate limit pauses only that host
+    limiter.record(other, rate_limited=True, retry_after=30)
+    assert limiter.bucket(other).reserve() == pytest.approx(30, abs=0.1)
+    limiter.record(URL, latency=0.1, error=True)
+    assert limiter.bucket(URL).rate == 2
+
+
+def test_crawl_councils_crawls_each_council_with_the_shared_limiter(make_site, tmp_path):
+    sites = {"standin": make_site(seed=1), "other": make_site(seed=2)}
+    registry = tmp_path / "urls.csv"
+    registry.write_text("council,url\n" + "".join(
+        f"{council},{site.url}\n" for council, site in sites.items()
+    ))
+    jobs = {council: site.postcodes[:2] for council, site in sites.items()}
+
+    limiter = HostRateLimiter(rate=1000)
+    results = crawl_councils(jobs, limiter=limiter, urls_csv=str(registry))
+
+    for council, site in sites.items():
+        expected = {app["reference"] for app in site.applications
+                    if app["postcode"] in jobs[council]}
+        assert set(results[council]["reference"]) == expected
+
+
+def test_adaptive_rates_are_saved_on_close(tmp_path):
+    path = str(tmp_path / "rates.json")
+    with AdaptiveRateLimiter(rate=0.5, state_path=path, save_interval=3600) as limiter:
+        for _ in range(5):
+            limiter.record(URL, latency=0.1)
+        assert not (tmp_path / "rates.json").exists()
+
+    assert saved_rates(path)["planning.example.gov.uk"] == limiter.rates["planning.example.gov.uk"]
+    assert AdaptiveRateLimiter(state_path=path).rates == limiter.rates
+
+
+def test_adaptive_rates_are_saved_every_interval(tmp_path):
+    path = str(tmp_path / "rates.json")
+    limiter = AdaptiveRateLimiter(rate=0.5, state_path=path, save_interval=0)
+    limiter.record(URL, latency=0.1)
+    limiter.record(URL, latency=0.1)
+
+    assert saved_rates(path)["planning.example.gov.uk"] > 0.5
+
+
+def test_adaptive_rate_halves_and_saves_on_rate_limit(tmp_path):
+    path = str(tmp_path / "rates.json")
+    limiter = AdaptiveRateLimiter(rate=0.5, state_path=path, save_interval=3600)
+    limiter.record(URL, rate_limited=True, retry_after=0)
+
+    assert saved_rates(path)["planning.example.gov.uk"] == 0.25
+
+
+def test_sqlite_rates_are_shared_with_processes_that_open_the_file(tmp_path):
+    path = str(tmp_path / "queue.db")
+    SqliteRateLimiter(path, rates={URL: 2}).close()
+
+    with SqliteRateLimiter(path, rate=1000) as limiter:
+        assert limiter.reserve(URL) == 0
+        assert limiter.reserve(URL) == pytest.approx(0.5, abs=0.05)
+        # Hosts with no stored rate use the process default
+        assert limiter.reserve("https://other.example.gov.uk/") == 0
+        assert limiter.reserve("https://other.example.gov.uk/") < 0.05
+
+    # The latest rate given for a host wins
+    other = "https://other.example.gov.uk/"
+    SqliteRateLimiter(path, rates={other: 0.1}).close()
+    SqliteRateLimiter(path, rates={other: 4}).close()
+    with SqliteRateLimiter(path) as limiter:
+        time.sleep(0.1)
+        assert limiter.reserve(other) == 0
+        assert limiter.reserve(other) == pytest.approx(0.25, abs=0.05)
+
+
+def test_sqlite_limiter_upgrades_databases_without_stored_rates(tmp_path):
+    path = str(tmp_path / "queue.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE rate_limits (host TEXT PRIMARY KEY, next_at REAL NOT NULL)")
+        conn.execute("INSERT INTO rate_limits VALUES ('planning.example.gov.uk', 0)")
+
+    with SqliteRateLimiter(path, rates={URL: 4}) as limiter:
+        assert limiter.reserve(URL) == 0
+        assert limiter.reserve(URL) == pytest.approx(0.25, abs=0.05)
+
+
+def test_sqlite_limiter_paces_every_instance_on_the_file(tmp_path):
+    path = str(tmp_path / "queue.db")
+    first = SqliteRateLimiter(path, rate=10, burst=2)
+    second = SqliteRateLimiter(path, rate=10, burst=2)
+
+    # The burst and the pacing after it are shared by both instances
+    assert first.reserve(URL) == 0
+    assert second.reserve(URL) == 0
+    assert first.reserve(URL) == pytest.approx(0.1, abs=0.02)
+    assert second.reserve(URL) == pytest.approx(0.2, abs=0.02)
+    first.close()
+    second.close()
+
+
+def test_sqlite_limiter_rate_limit_pauses_the_host_for_everyone(tmp_path):
+    path = str(tmp_path / "queue.db")
+    other = "https://other.example.gov.uk/"
+    with SqliteRateLimiter(path, rate=1000, cooldown=20) as first, \
+            SqliteRateLimiter(path, rate=1000) as second:
+        first.record(URL, rate_limited=True, retry_after=5)
+        assert second.reserve(URL) == pytest.approx(5, abs=0.1)
+        assert second.reserve(other) == 0
+
+        # Without Retry-After the pause is the reporting instance's cooldown
+        first.record(other, rate_limited=True)
+        assert second.reserve(other) == pytest.approx(20, abs=0.1)
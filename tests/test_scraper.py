@@ -0,0 +1,214 @@
+"""Regression tests for crawl recovery, run against the IdoxStandIn site."""
+
+import sqlite3
+
+import pytest
+from lxml import html as lxml_html
+
+from planning_scraper.cache import PageCache
+from planning_scraper.fetcher import HttpFetcher
+from planning_scraper.journal import CrawlJournal
+from planning_scraper.metrics import metrics
+from planning_scraper.scraper import (
+    application_key, get_postcode_page, open_client, scrape_app_details, scrape_comments, search_area
+)
+from planning_scraper.sinks import SqliteCommentSink
+from planning_scraper.utils import check_rate_limit
+
+
+def summary_url(site, app):
+    return f"{site.url}/applicationDetails.do?activeTab=summary&keyVal={app['key_val']}"
+
+
+def test_interrupted_comment_crawl_is_finished_on_the_next_run(make_site, tmp_path):
+    site = make_site(comments_per_app=20)
+    app = max(site.applications, key=lambda app: app["comment_count"])
+    app_id, url = app["key_val"], summary_url(site, app)
+    path = str(tmp_path / "comments.db")
+
+    with HttpFetcher() as fetcher, SqliteCommentSink(path) as sink:
+        # Every other request is a 429: the crawl stops after the newest page
+        site.rate_limit_every = 2
+        first = scrape_comments(fetcher, "standin", app_id, url, sink, max_retries=0)
+        assert 0 < first < app["comment_count"]
+        assert not sink.comment_crawl_complete(app_id)
+
+        site.rate_limit_every = 0
+        second = scrape_comments(fetcher, "standin", app_id, url, sink)
+        assert first + second == app["comment_count"]
+        assert sink.comment_crawl_complete(app_id)
+
+        # Once complete, a re-crawl stops at the first page of known comments
+        before = site.stats["requests"]
+        assert scrape_comments(fetcher, "standin", app_id, url, sink) == 0
+        assert site.stats["requests"] - before == 1
+
+    with sqlite3.connect(path) as conn:
+        saved = conn.execute("SELECT COUNT(*) FROM comments WHERE app_id = ?", (app_id,)).fetchone()
+    assert saved[0] == app["comment_count"]
+
+
+def test_rate_limit_page_mid_comment_crawl_is_not_the_end(make_site, tmp_path):
+    site = make_site(comments_per_app=20)
+    app = max(site.applications, key=lambda app: app["comment_count"])
+    app_id, url = app["key_val"], summary_url(site, app)
+    render_comments = site.render_comments
+    blocked = {2}
+
+    def rate_limited_comments(app, page):
+        if page in blocked:
+            return site.render_message("Too many requests, please try again later")
+        return render_comments(app, page)
+
+    site.render_comments = rate_limited_comments
+    cache = PageCache(str(tmp_path / "cache"))
+
+    # A 200-status rate-limit page, with no limiter to spot it
+    with HttpFetcher() as fetcher, SqliteCommentSink(str(tmp_path / "comments.db")) as sink:
+        first = scrape_comments(fetcher, "standin", app_id, url, sink, cache=cache,
+                                max_retries=1)
+        assert first == 10
+        assert not sink.comment_crawl_complete(app_id)
+
+        blocked.clear()
+        second = scrape_comments(fetcher, "standin", app_id, url, sink, cache=cache)
+        assert first + second == app["comment_count"]
+        assert sink.comment_crawl_complete(app_id)
+
+
+def test_page_that_is_not_a_comments_list_leaves_the_crawl_incomplete(make_site, tmp_path):
+    site = make_site(comments_per_app=20)
+    app = max(site.applications, key=lambda app: app["comment_count"])
+    app_id, url = app["key_val"], summary_url(site, app)
+    render_comments = site.render_comments
+    site.render_comments = lambda app, page: (
+        site.render_message("Down for maintenance") if page == 2 else render_comments(app, page)
+    )
+
+    with HttpFetcher() as fetcher, SqliteCommentSink(str(tmp_path / "comments.db")) as sink:
+        assert scrape_comments(fetcher, "standin", app_id, url, sink) == 10
+        assert not sink.comment_crawl_complete(app_id)
+
+        site.render_comments = render_comments
+        assert scrape_comments(fetcher, "standin", app_id, url, sink) == app["comment_count"] - 10
+        assert sink.comment_crawl_complete(app_id)
+
+
+def test_transient_error_page_is_not_cached(make_site, tmp_path):
+    site = make_site()
+    render_summary = site.render_summary
+    calls = []
+
+    def flaky_summary(app):
+        calls.append(app["key_val"])
+        if len(calls) == 1:
+            return site.render_message("Down for maintenance")
+        return render_summary(app)
+
+    site.render_summary = flaky_summary
+    app = site.applications[0]
+    cache = PageCache(str(tmp_path / "cache"))
+
+    data = scrape_app_details([summary_url(site, app)], engine="http", cache=cache)
+    assert list(data["reference"]) == [app["reference"]]
+    assert len(calls) == 2
+
+    # The good page was cached, so a second run doesn't fetch it again
+    data = scrape_app_details([summary_url(site, app)], engine="http", cache=cache)
+    assert list(data["reference"]) == [app["reference"]]
+    assert len(calls) == 2
+
+
+def test_rate_limit_mid_pagination_is_journaled_as_failed(make_site, urls_csv, tmp_path):
+    site = make_site(apps_per_postcode=250, postcodes=["E13 0AA"])
+    registry = urls_csv(site)
+    journal = CrawlJournal(str(tmp_path / "journal.db"))
+
+    # Search form, search, page size switch, then a 429 on results page 2
+    site.rate_limit_every = 4
+    urls = get_postcode_page("standin", "E13 0AA", engine="http", urls_csv=registry,
+                             journal=journal)
+    assert 0 < len(urls) < 250
+    assert journal.counts("postcode") == {"failed": 1}
+
+    site.rate_limit_every = 0
+    urls = get_postcode_page("standin", "E13 0AA", engine="http", urls_csv=registry,
+                             journal=journal)
+    assert len(set(urls)) == 250
+    assert journal.counts("postcode") == {"done": 1}
+    journal.close()
+
+
+def test_search_requests_are_counted_in_page_metrics(make_site, urls_csv):
+    site = make_site(apps_per_postcode=250, postcodes=["E13 0AA"])
+    registry = urls_csv(site)
+    metrics.reset()
+
+    before = site.stats["requests"]
+    assert len(get_postcode_page("standin", "E13 0AA", engine="http", urls_csv=registry)) == 250
+    requests = site.stats["requests"] - before
+
+    # Search form, search, page size switch and every further results page
+    counters = {counter["name"]: counter["value"] for counter in metrics.snapshot()["counters"]}
+    fetches = [data for data in metrics.snapshot()["histograms"] if data["name"] == "fetch_seconds"]
+    assert counters["pages_total"] == requests
+    assert sum(data["count"] for data in fetches) == requests
+    assert counters["bytes_total"] > 0
+
+
+def test_rate_limited_search_is_journaled_as_failed(make_site, urls_csv, tmp_path):
+    site = make_site()
+    registry = urls_csv(site)
+    journal = CrawlJournal(str(tmp_path / "journal.db"))
+    postcode = site.postcodes[0]
+    render_results = site.render_results
+    site.render_results = lambda session, page: site.render_message("Too many requests")
+
+    # A 200-status rate-limit page in place of the search results
+    assert get_postcode_page("standin", postcode, engine="http", urls_csv=registry,
+                             journal=journal) == []
+    assert journal.counts("postcode") == {"failed": 1}
+
+    site.render_results = render_results
+    urls = get_postcode_page("standin", postcode, engine="http", urls_csv=registry,
+                             journal=journal)
+    assert len(urls) == sum(app["postcode"] == postcode for app in site.applications)
+    assert journal.counts("postcode") == {"done": 1}
+    journal.close()
+
+
+def test_rate_limit_phrases_in_page_content_are_ignored(make_site):
+    site = make_site()
+    app = site.applications[0]
+    app["description"] = "Footpath temporarily blocked; too many requests for parking."
+
+    with HttpFetcher() as fetcher:
+        page = fetcher.get_page(summary_url(site, app))
+    assert not check_rate_limit(page)
+
+    data = scrape_app_details([summary_url(site, app)], engine="http", max_retries=1)
+    assert list(data["description"]) == [app["description"]]
+
+    message = lxml_html.fromstring(site.render_message("Too many requests, please try later"))
+    assert check_rate_limit(message)
+
+
+def test_area_search_drops_unrequested_postcodes(make_site, urls_csv):
+    site = make_site()
+    requested = site.postcodes[0:2] + site.postcodes[5:7]
+
+    before = site.stats["requests"]
+    urls = search_area("standin", requested, engine="http", urls_csv=urls_csv(site))
+    searches = site.stats["requests"] - before
+
+    postcodes = {app["key_val"]: app["postcode"] for app in site.applications}
+    found = [postcodes[application_key(url)] for url in urls]
+    assert set(found) == set(requested)
+    assert len(found) == sum(app["postcode"] in requested for app in site.applications)
+    # Searched as two sectors rather than four postcodes
+    assert searches < 4 * 2
+
+
+def test_open_client_rejects_unknown_engines():
+    with pytest.raises(ValueError, match="selenium, http"):
+        open_client("playwright")
@@ -0,0 +1,106 @@
+"""Tests for the batched record and comment sinks."""
+
+import json
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from planning_scraper.sinks import CsvSink, ParquetCommentSink, ParquetSink, SqliteCommentSink
+
+
+def records(start, stop):
+    return [{"reference": f"24/{i:05d}/FUL", "pages": np.int64(i), "extra": {"ward": f"W{i}"}}
+            for i in range(start, stop)]
+
+
+def test_csv_sink_writes_in_batches_and_resumes_into_the_same_file(tmp_path):
+    path = str(tmp_path / "applications.csv")
+    with CsvSink(path, batch_size=3) as sink:
+        for record in records(0, 4):
+            sink.write(record)
+        # One full batch written, one record still buffered
+        assert sink.rows_written == 3
+        assert len(pd.read_csv(path)) == 3
+    assert sink.rows_written == 4
+
+    with CsvSink(path) as sink:
+        sink.write_frame(pd.DataFrame(records(4, 6)))
+
+    saved = pd.read_csv(path)
+    assert list(saved["reference"]) == [record["reference"] for record in records(0, 6)]
+    assert json.loads(saved.loc[5, "extra"]) == {"ward": "W5"}
+
+
+def test_sink_flushes_a_part_full_batch_after_the_interval(tmp_path):
+    path = str(tmp_path / "applications.csv")
+    sink = CsvSink(path, batch_size=100, flush_interval=0)
+    sink.write(records(0, 1)[0])
+    assert sink.rows_written == 1
+    sink.close()
+
+
+def test_parquet_sink_keeps_the_first_batch_schema(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "applications.parquet")
+    with ParquetSink(path, batch_size=2) as sink:
+        sink.write({"reference": "24/00001/FUL", "decision": None})
+        sink.write({"reference": "24/00002/FUL", "decision": None})
+        sink.write({"reference": "24/00003/FUL", "decision": "Granted"})
+
+    table = pq.read_table(path)
+    assert pq.ParquetFile(path).num_row_groups == 2
+    assert str(table.schema.field("decision").type) == "string"
+    assert table.column("decision").to_pylist() == [None, None, "Granted"]
+
+
+def comment(comment_id, text, app_id="APP1"):
+    return ("standin", comment_id, app_id, "1 High St", "Objection", "01/02/2024", text)
+
+
+def test_sqlite_comment_sink_upserts_comments_by_id(tmp_path):
+    path = str(tmp_path / "comments.db")
+    with SqliteCommentSink(path, batch_size=2) as sink:
+        sink.insert_comment(*comment("c1", "first"))
+        sink.insert_comment(*comment("c2", "second"))
+        # The same comment in a later batch and twice in one batch
+        sink.insert_comment(*comment("c1", "edited"))
+        sink.insert_comment(*comment("c3", "third", app_id="APP2"))
+        sink.insert_comment(*comment("c3", "third again", app_id="APP2"))
+        assert sink.known_comment_ids("APP2") == {"c3"}
+
+    with SqliteCommentSink(path) as sink:
+        sink.insert_comment(*comment("c2", "second"))
+        assert sink.known_comment_ids("APP1") == {"c1", "c2"}
+
+    with sqlite3.connect(path) as conn:
+        rows = dict(conn.execute("SELECT comment_id, comment_text FROM comments").fetchall())
+    assert rows == {"c1": "edited", "c2": "second", "c3": "third again"}
+
+
+def test_sqlite_comment_crawl_is_marked_complete_with_its_comments(tmp_path):
+    path = str(tmp_path / "comments.db")
+    with SqliteCommentSink(path, batch_size=100, flush_interval=None) as sink:
+        sink.insert_comment(*comment("c1", "first"))
+        sink.mark_comment_crawl("APP1", complete=True)
+        assert sink.comment_crawl_complete("APP1")
+
+        # Not on disk until the comments are
+        with SqliteCommentSink(path) as other:
+            assert not other.comment_crawl_complete("APP1")
+
+    with SqliteCommentSink(path) as sink:
+        assert sink.comment_crawl_complete("APP1")
+        sink.mark_comment_crawl("APP1", complete=False)
+        assert not sink.comment_crawl_complete("APP1")
+
+
+def test_parquet_comment_sink_drops_duplicate_comments(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "comments.parquet")
+    with ParquetCommentSink(path, batch_size=2) as sink:
+        for comment_id in ("c1", "c2", "c1", "c3", "c2"):
+            sink.insert_comment(*comment(comment_id, comment_id))
+
+    assert pq.read_table(path).column("comment_id").to_pylist() == ["c1", "c2", "c3"]
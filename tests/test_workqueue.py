@@ -0,0 +1,135 @@
+"""Tests for the lease-based work queues and the worker loop."""
+
+import time
+
+import pytest
+
+from planning_scraper.scheduler import HostRateLimiter
+from planning_scraper.scraper import application_key
+from planning_scraper.workqueue import (
+    APPLICATION, DEAD, DONE, PENDING, POSTCODE, LeaseLostError, MemoryWorkQueue, SqliteWorkQueue,
+    _LeaseKeeper, run_worker
+)
+
+
+URL = "https://planning.example.gov.uk/online-applications/"
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def make_queue(request, tmp_path):
+    """Return a function that opens a work queue of each kind."""
+    def make(**options):
+        if request.param == "sqlite":
+            return SqliteWorkQueue(str(tmp_path / "queue.db"), **options)
+        return MemoryWorkQueue(**options)
+
+    return make
+
+
+def test_tasks_are_unique_by_key(make_queue):
+    queue = make_queue()
+    assert queue.add_postcodes("Newham", ["E13 0AG", "E13 0AH"]) == 2
+    assert queue.add_postcodes("newham ", ["E13 0AG"]) == 0
+    assert queue.add_urls([URL, URL]) == 1
+    assert queue.counts()[PENDING] == 3
+
+
+def test_expired_lease_is_handed_out_again(make_queue):
+    queue = make_queue(lease_seconds=0.2)
+    queue.add_urls([URL])
+
+    first = queue.lease("a")
+    assert first.attempts == 1
+    assert queue.lease("b") is None
+
+    time.sleep(0.3)
+    second = queue.lease("b")
+    assert second.id == first.id
+    assert second.attempts == 2
+
+    # The first worker's lease is no longer the current one
+    assert not queue.complete(first, "stale")
+    assert not queue.extend(first)
+    assert queue.complete(second, "fresh")
+    assert list(queue.results(APPLICATION)) == [(URL, "fresh")]
+
+
+def test_extended_lease_is_not_handed_out(make_queue):
+    queue = make_queue(lease_seconds=0.2)
+    queue.add_urls([URL])
+
+    task = queue.lease("a")
+    time.sleep(0.1)
+    assert queue.extend(task, seconds=1)
+    time.sleep(0.2)
+    assert queue.lease("b") is None
+    assert queue.complete(task)
+
+
+def test_failed_task_is_dead_after_max_attempts(make_queue):
+    queue = make_queue(max_attempts=2, retry_delay=0)
+    queue.add_urls([URL])
+
+    assert queue.fail(queue.lease("a"), "first")
+    assert queue.counts()[PENDING] == 1
+    assert queue.fail(queue.lease("a"), "second")
+    assert queue.counts()[DEAD] == 1
+    assert queue.lease("a") is None
+
+
+def test_task_whose_last_lease_expires_is_dead(make_queue):
+    queue = make_queue(lease_seconds=0.1, max_attempts=1)
+    queue.add_urls([URL])
+
+    assert queue.lease("a") is not None
+    time.sleep(0.2)
+    assert queue.lease("b") is None
+    assert queue.counts()[DEAD] == 1
+
+
+def test_failure_without_retry_is_dead(make_queue):
+    queue = make_queue(retry_delay=0)
+    queue.add_urls([URL])
+
+    assert queue.fail(queue.lease("a"), "Too many results", retry=False)
+    assert queue.counts()[DEAD] == 1
+
+
+def test_lease_keeper_renews_the_lease_between_requests(make_queue):
+    queue = make_queue(lease_seconds=0.4)
+    queue.add_urls([URL])
+    task = queue.lease("a")
+    keeper = _LeaseKeeper(queue, task, HostRateLimiter(rate=1000))
+
+    # Fetching for longer than the lease keeps the task
+    for _ in range(6):
+        time.sleep(0.1)
+        keeper.acquire(URL)
+    assert queue.lease("b") is None
+
+    # Once the lease has expired and been taken, the next request stops the task
+    time.sleep(0.5)
+    assert queue.lease("b") is not None
+    with pytest.raises(LeaseLostError):
+        keeper.acquire(URL)
+
+
+def test_workers_search_postcodes_and_scrape_the_urls_they_find(make_site, urls_csv, tmp_path):
+    site = make_site()
+    registry = urls_csv(site)
+    postcodes = site.postcodes[:3]
+    queue = SqliteWorkQueue(str(tmp_path / "queue.db"))
+    queue.add_postcodes("standin", postcodes)
+
+    limiter = HostRateLimiter(rate=1000)
+    outcomes = run_worker(queue, engine="http", limiter=limiter, urls_csv=registry)
+
+    wanted = {app["key_val"]: app for app in site.applications if app["postcode"] in postcodes}
+    assert outcomes == {"done": len(postcodes) + len(wanted), "failed": 0, "lost": 0}
+    assert queue.counts()[DONE] == len(postcodes) + len(wanted)
+    assert len(list(queue.results(POSTCODE))) == len(postcodes)
+
+    rows = {application_key(url): row for url, row in queue.results(APPLICATION)}
+    assert rows.keys() == wanted.keys()
+    assert all(rows[key]["reference"] == app["reference"] for key, app in wanted.items())
+    queue.close()